@@ -0,0 +1,793 @@
+# coding=UTF-8
+import argparse
+import collections
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import summary_generator
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+"""
+ Benchmark for the summarizer on synthetic reviews.
+
+ Every document is run through the stages of highlight_doc one by one and each stage is timed:
+
+    sentence_tokenizer            - split the document into sentences
+    rank_sentences                - rank all sentences (the O(n^2) part)
+    select_best_sentences         - select the best sentence of every paragraph
+    summary_generator             - build the summary (includes select_best_sentences again)
+    add_highligt_tags_to_summary  - highlight the query words
+
+ The report has throughput (docs/s, sentences/s), p50/p99 latency of every stage, peak memory, and is
+ written as JSON so results of two commits can be compared:
+
+    python benchmark.py --documents 50 --sentences 40 --output before.json
+    python benchmark.py --documents 50 --sentences 40 --output after.json --compare before.json
+
+ --rankers runs the corpus once per ranker (see summary_generator.RANKERS) and reports their throughput,
+ rank_sentences latency and how often they pick the same best sentence of a paragraph as the first one:
+
+    python benchmark.py --documents 50 --sentences 40 --rankers degree,pagerank,lsa
+
+ --cold-start measures what a short lived worker pays: the time to import summary_generator and the latency
+ of the first and second highlight_doc call, each in a new interpreter, plus the slowest imports reported by
+ python -X importtime:
+
+    python benchmark.py --cold-start --runs 10
+
+ Faster engines must keep the ranks and summaries of the original summarizer. tests/golden_ranks.json has the ranks
+ and summaries of synthetic reviews of 10 to 1000 sentences recorded with the pairwise engine. --check-golden
+ compares every engine (BACKENDS) and summary selection (SELECTIONS) with it, --record-golden writes it again
+ (only when the reference behavior changes on purpose):
+
+    python benchmark.py --check-golden tests/golden_ranks.json
+    python benchmark.py --record-golden golden.json --golden-sizes 10,100,1000,10000
+
+ --scaling ranks documents of 1250 to 10000 sentences and fits how the ranking time grows (sentences ^ exponent).
+ It fails when an engine grows faster than its COMPLEXITY_BOUNDS:
+
+    python benchmark.py --scaling --engines inverted,minhash
+
+ Both exit with status 1 when a check fails.
+"""
+
+STAGES = ['sentence_tokenizer', 'rank_sentences', 'select_best_sentences', 'summary_generator', 'add_highligt_tags_to_summary']
+
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'ka', 'le', 'mi', 'no', 'pu', 'ra', 'se', 'ti', 'vo', 'za', 'sh', 'tr', 'pl']
+
+FILLER_WORDS = ['the', 'a', 'and', 'was', 'it', 'we', 'of', 'to', 'very', 'so']
+
+
+##//////////////////////////////////////////////////////
+## Synthetic corpus
+##//////////////////////////////////////////////////////
+
+class CorpusGenerator(object):
+
+    """
+     Generates synthetic reviews. Content words are drawn from a vocabulary with a Zipf like distribution,
+     so a few words are shared by many sentences like in real reviews, and stop words are mixed in.
+    """
+
+    def __init__(self, vocabulary_size=2000, words_per_sentence=12, seed=0):
+        self.random = random.Random(seed)
+        self.words_per_sentence = words_per_sentence
+        self.vocabulary = self._vocabulary(vocabulary_size)
+        weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+        total = sum(weights)
+        self._cumulative = []
+        running = 0
+        for weight in weights:
+            running += weight / total
+            self._cumulative.append(running)
+
+    def _vocabulary(self, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(self.random.choice(SYLLABLES) for _ in range(self.random.randint(2, 4))))
+        return sorted(words)
+
+    def word(self):
+        index = self._bisect(self.random.random())
+        return self.vocabulary[index]
+
+    def _bisect(self, value):
+        low, high = 0, len(self._cumulative) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if self._cumulative[middle] < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def sentence(self):
+        words = []
+        for _ in range(max(1, int(self.random.gauss(self.words_per_sentence, self.words_per_sentence / 4)))):
+            words.append(self.random.choice(FILLER_WORDS) if self.random.random() < 0.3 else self.word())
+        return words[0].capitalize() + ' ' + ' '.join(words[1:]) + self.random.choice(['.', '.', '.', '!', '?'])
+
+    def document(self, paragraphs=3, sentences_per_paragraph=8):
+
+        """
+         A review with the given number of paragraphs and sentences per paragraph (string)
+        """
+        return '\n\n'.join(' '.join(self.sentence() for _ in range(sentences_per_paragraph)) for _ in range(paragraphs))
+
+    def query(self, length=3):
+
+        """
+         A query of frequent vocabulary words (string)
+        """
+        return ' '.join(self.vocabulary[self._bisect(self.random.random() / 4)] for _ in range(length))
+
+
+##//////////////////////////////////////////////////////
+## Benchmark
+##//////////////////////////////////////////////////////
+
+def percentile(values, fraction):
+
+    """
+     Nearest rank percentile of a list of numbers (float)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_documents(summarizer, documents):
+
+    """
+     The method runs every (doc, query) through the stages of highlight_doc and times every stage
+
+    Returns:
+
+    A dictionary of stage name -> list of seconds per document, and the number of sentences seen (tuple)
+    """
+    timer = time.perf_counter
+    timings = dict((stage, []) for stage in STAGES)
+    timings['total'] = []
+    sentence_count = 0
+
+    for doc, query in documents:
+        start = timer()
+        sentences = summarizer.sentence_tokenizer(doc)
+        tokenized = timer()
+        ranks = summarizer.rank_sentences(sentences)
+        ranked = timer()
+        for paragraph in summarizer.paragragh_generator(doc):
+            summarizer.select_best_sentences(paragraph, ranks, 1)
+        selected = timer()
+        summary = summarizer.summary_generator(doc, query, ranks)
+        summarized = timer()
+        summarizer.add_highligt_tags_to_summary(summary, query)
+        highlighted = timer()
+
+        timings['sentence_tokenizer'].append(tokenized - start)
+        timings['rank_sentences'].append(ranked - tokenized)
+        timings['select_best_sentences'].append(selected - ranked)
+        timings['summary_generator'].append(summarized - selected)
+        timings['add_highligt_tags_to_summary'].append(highlighted - summarized)
+        # select_best_sentences is already part of summary_generator
+        timings['total'].append(highlighted - start - (selected - ranked))
+        sentence_count += len(sentences)
+
+    return timings, sentence_count
+
+
+def run_benchmark(documents=20, paragraphs=3, sentences=8, vocabulary=2000, words=12, query_length=3, seed=0,
+                  ranking_engine='auto', repeat=1, ranker='degree'):
+
+    """
+     The method generates a synthetic corpus, runs it through the summarizer and builds the report
+
+    Args:
+
+    documents - Number of documents (integer)
+
+    paragraphs - Paragraphs per document (integer)
+
+    sentences - Sentences per paragraph (integer)
+
+    vocabulary - Number of distinct content words (integer)
+
+    words - Average words per sentence (integer)
+
+    query_length - Words per query (integer)
+
+    seed - Random seed, the same seed gives the same corpus (integer)
+
+    ranking_engine - Ranking engine of DocumentSummarizer (string)
+
+    repeat - Number of times the corpus is summarized (integer)
+
+    ranker - Ranker of DocumentSummarizer (string)
+
+    Returns:
+
+    The report (dictionary)
+    """
+    corpus = generate_corpus(documents, paragraphs, sentences, vocabulary, words, query_length, seed)
+    summarizer = summary_generator.DocumentSummarizer(ranking_engine=ranking_engine, ranker=ranker)
+
+    timings = dict((stage, []) for stage in STAGES + ['total'])
+    sentence_count = 0
+    for _ in range(repeat):
+        run_timings, run_sentences = run_documents(summarizer, corpus)
+        for stage, values in run_timings.items():
+            timings[stage].extend(values)
+        sentence_count += run_sentences
+    if tracemalloc is not None:
+        # tracemalloc slows every allocation down, the peak is taken in a pass of its own which isn't timed
+        tracemalloc.start()
+        run_documents(summarizer, corpus)
+        peak_memory, peak_memory_source = tracemalloc.get_traced_memory()[1], 'tracemalloc'
+        tracemalloc.stop()
+    elif resource is not None:
+        # ru_maxrss is in kilobytes on Linux
+        peak_memory, peak_memory_source = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, 'ru_maxrss'
+    else:
+        peak_memory, peak_memory_source = None, None
+
+    total_seconds = sum(timings['total'])
+    return {
+        'parameters': {
+            'documents': documents, 'paragraphs': paragraphs, 'sentences': sentences, 'vocabulary': vocabulary,
+            'words': words, 'query_length': query_length, 'seed': seed, 'ranking_engine': ranking_engine,
+            'repeat': repeat, 'ranker': ranker,
+        },
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'commit': git_commit()},
+        'throughput': {
+            'docs_per_second': len(timings['total']) / total_seconds if total_seconds else None,
+            'sentences_per_second': sentence_count / total_seconds if total_seconds else None,
+        },
+        'stages': dict((stage, {'p50': percentile(values, 0.5), 'p99': percentile(values, 0.99),
+                                'mean': sum(values) / len(values) if values else 0.0})
+                       for stage, values in timings.items()),
+        'peak_memory_bytes': peak_memory,
+        'peak_memory_source': peak_memory_source,
+    }
+
+
+def generate_corpus(documents=20, paragraphs=3, sentences=8, vocabulary=2000, words=12, query_length=3, seed=0):
+
+    """
+     The synthetic (doc, query) pairs of run_benchmark (list)
+    """
+    generator = CorpusGenerator(vocabulary, words, seed)
+    return [(generator.document(paragraphs, sentences), generator.query(query_length)) for _ in range(documents)]
+
+
+def compare_rankers(rankers, **options):
+
+    """
+     The method runs the benchmark once per ranker. Agreement is the fraction of best paragraph sentences which
+     are the same as the ones of the first ranker
+
+    Args:
+
+    rankers - Names of the rankers, the first one is the reference (list)
+
+    options - Keyword arguments for run_benchmark
+
+    Returns:
+
+    Throughput, rank_sentences latency and agreement of every ranker (dictionary)
+    """
+    corpus_options = dict((name, options[name]) for name in ('documents', 'paragraphs', 'sentences', 'vocabulary',
+                                                              'words', 'query_length', 'seed') if name in options)
+    corpus = generate_corpus(**corpus_options)
+    reference = None
+    comparison = {}
+    for ranker in rankers:
+        report = run_benchmark(ranker=ranker, **options)
+        summarizer = summary_generator.DocumentSummarizer(ranking_engine=options.get('ranking_engine', 'auto'), ranker=ranker)
+        best = [prepared.best_sentences for prepared in summarizer.prepare_documents([doc for doc, _ in corpus])]
+        if reference is None:
+            reference = best
+        same = sum(len(set(a) & set(b)) for a, b in zip(reference, best))
+        total = sum(len(a) for a in reference)
+        comparison[ranker] = {
+            'throughput': report['throughput'],
+            'rank_sentences': report['stages']['rank_sentences'],
+            'agreement': same / total if total else 1.0,
+        }
+    return comparison
+
+
+COLD_START_SCRIPT = """
+import json, sys, time
+request = json.loads(sys.stdin.read())
+start = time.perf_counter()
+import summary_generator
+imported = time.perf_counter()
+summarizer = summary_generator.DocumentSummarizer()
+summarizer.highlight_doc(request['doc'], request['query'])
+first_call = time.perf_counter()
+summarizer.highlight_doc(request['doc'], request['query'])
+second_call = time.perf_counter()
+print(json.dumps({'import': imported - start, 'first_call': first_call - imported, 'second_call': second_call - first_call,
+                  'scipy_imported': 'scipy' in sys.modules}))
+"""
+
+
+def importtime(module='summary_generator', env=None):
+
+    """
+     The import of a module in a new interpreter, measured with python -X importtime
+
+    Returns:
+
+    Cumulative microseconds of the module and the list of (module, cumulative microseconds) of everything it
+    imported, slowest first (tuple)
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True).stderr
+    # Modules imported by module are listed, indented, just before it
+    imports = []
+    for line in output.splitlines():
+        fields = line.split('|')
+        if not line.startswith('import time:') or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2][1:]
+        if name.startswith(' '):
+            imports.append((name.strip(), int(fields[1])))
+        elif name == module:
+            return int(fields[1]), sorted(imports, key=lambda item: -item[1])
+        else:
+            imports = []
+    return None, []
+
+
+def cold_start(runs=5, paragraphs=3, sentences=8, seed=0):
+
+    """
+     The method measures the cold start of the summarizer: every run starts a new interpreter which imports
+     summary_generator and summarizes one synthetic document twice. Bytecode is written by a first run that is
+     not measured, like on a deployed worker.
+
+    Returns:
+
+    The report (dictionary)
+    """
+    generator = CorpusGenerator(seed=seed)
+    request = json.dumps({'doc': generator.document(paragraphs, sentences), 'query': generator.query()})
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    measurements = []
+    for run in range(runs + 1):
+        output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], input=request, env=env, cwd=directory,
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        if run:
+            measurements.append(json.loads(output))
+
+    total, imports = importtime(env=env)
+    report = {
+        'parameters': {'runs': runs, 'paragraphs': paragraphs, 'sentences': sentences, 'seed': seed},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'commit': git_commit()},
+        'importtime': {'summary_generator_us': total, 'slowest_imports_us': imports[:10]},
+        'scipy_imported': any(m['scipy_imported'] for m in measurements),
+    }
+    for name in ('import', 'first_call', 'second_call'):
+        values = [m[name] for m in measurements]
+        report[name + '_seconds'] = {'p50': percentile(values, 0.5), 'max': max(values)}
+    return report
+
+
+##//////////////////////////////////////////////////////
+## Golden outputs and scaling
+##//////////////////////////////////////////////////////
+
+# Sizes (sentences) of the documents of the golden file in tests/, and of the scaling runs
+GOLDEN_SIZES = [10, 100, 1000]
+SCALING_SIZES = [1250, 2500, 5000, 10000]
+
+# Reference summarizer of the golden file: the original per pair engine. Documents longer than
+# PAIRWISE_LIMIT sentences are recorded with the inverted engine without frequent term cap, which scores
+# the same pairs in the same order
+PAIRWISE_LIMIT = 2000
+
+
+def reference_summarizer(sentences):
+
+    """
+     The exact summarizer recording the golden ranks of a document with this number of sentences (DocumentSummarizer)
+    """
+    engine = 'pairwise' if sentences <= PAIRWISE_LIMIT else 'inverted'
+    return summary_generator.DocumentSummarizer(ranking_engine=engine, approximate_threshold=None,
+                                                frequent_term_cap=None, duplicates=None)
+
+
+# Backends checked against the golden file: summarizer options and the maximum relative rank error
+# (largest rank difference / largest rank). Exact engines only differ by floating point rounding
+BACKENDS = collections.OrderedDict([
+    ('inverted', ({'ranking_engine': 'inverted', 'approximate_threshold': None}, 1e-9)),
+    ('inverted-capped', ({'ranking_engine': 'inverted', 'approximate_threshold': None, 'frequent_term_cap': 50}, 1e-9)),
+    ('inverted-no-duplicates', ({'ranking_engine': 'inverted', 'approximate_threshold': None, 'duplicates': None}, 1e-9)),
+    ('sparse', ({'ranking_engine': 'sparse', 'approximate_threshold': None}, 1e-9)),
+    ('sparse-capped', ({'ranking_engine': 'sparse', 'approximate_threshold': None, 'frequent_term_cap': 50}, 1e-9)),
+    ('sparse-threads', ({'ranking_engine': 'sparse', 'approximate_threshold': None, 'threads': 2, 'parallel_threshold': 1}, 1e-9)),
+    ('minhash', ({'ranking_engine': 'minhash', 'approximate_threshold': None}, 0.2)),
+])
+
+# Summaries selected from the golden ranks by other code paths, they must equal the golden summary
+SELECTIONS = ['dictionary', 'streaming', 'spans']
+
+# Maximum growth exponent of the ranking time (seconds ~ sentences ^ exponent) on the synthetic corpus. Its Zipf
+# vocabulary makes most pairs of sentences share a word, so only the engines which cap frequent terms and MinHash
+# grow slower than the number of pairs
+COMPLEXITY_BOUNDS = {'pairwise': 2.3, 'sparse': 1.6, 'inverted': 1.6, 'minhash': 1.3}
+
+
+def golden_document(sentences, seed=0):
+
+    """
+     The synthetic review of the golden file with this number of sentences, in paragraphs of 10, and its query (tuple)
+    """
+    generator = CorpusGenerator(seed=seed + sentences)
+    paragraphs = max(1, sentences // 10)
+    return generator.document(paragraphs, sentences // paragraphs), generator.query()
+
+
+def record_golden(path, sizes=GOLDEN_SIZES, seed=0):
+
+    """
+     The method ranks and summarizes the golden documents with the reference summarizer and writes the ranks and
+     summaries as JSON. The SHA-1 of every document is kept to notice when the generator changes.
+
+    Returns:
+
+    The golden outputs (dictionary)
+    """
+    documents = []
+    for sentences in sizes:
+        doc, query = golden_document(sentences, seed)
+        summarizer = reference_summarizer(sentences)
+        prepared = summarizer.prepare_document(doc)
+        documents.append({
+            'sentences': sentences,
+            'sha1': summary_generator.RankCache.key(doc),
+            'query': query,
+            'ranks': list(prepared.document.ranks),
+            'summary': prepared.highlight(query),
+        })
+    golden = {'seed': seed, 'documents': documents}
+    with open(path, 'w') as f:
+        json.dump(golden, f, indent=0)
+        f.write('\n')
+    return golden
+
+
+def relative_error(ranks, reference):
+
+    """
+     Largest difference of two lists of ranks relative to the largest reference rank (float)
+    """
+    scale = max([abs(rank) for rank in reference] or [0.0]) or 1.0
+    return max([abs(a - b) for a, b in zip(ranks, reference)] or [0.0]) / scale
+
+
+def check_golden(golden, backends=None, selections=None, max_sentences=None):
+
+    """
+     The method runs every backend and selection on the golden documents and compares them with the golden
+     ranks and summaries. Exact backends must give the golden summary, approximate ones (tolerance above 1e-6)
+     only ranks within tolerance and within the error bound they report.
+
+    Args:
+
+    golden - Golden outputs, see record_golden (dictionary)
+
+    backends - Names of BACKENDS to check, all by default (list)
+
+    selections - Names of SELECTIONS to check, all by default (list)
+
+    max_sentences - Skip the larger golden documents (integer)
+
+    Returns:
+
+    One result per backend and document: backend, sentences, error, tolerance, bound (the error bound reported by
+    approximate engines), summary_equal and ok (list)
+    """
+    results = []
+    for expected in golden['documents']:
+        sentences = expected['sentences']
+        if max_sentences is not None and sentences > max_sentences:
+            continue
+        doc, query = golden_document(sentences, golden['seed'])
+        if summary_generator.RankCache.key(doc) != expected['sha1']:
+            raise ValueError("The golden document of %d sentences changed, record the golden file again" % sentences)
+
+        for name in (backends if backends is not None else BACKENDS):
+            options, tolerance = BACKENDS[name]
+            if options['ranking_engine'] == 'sparse' and not summary_generator.load_scipy():
+                continue
+            summarizer = summary_generator.DocumentSummarizer(**options)
+            prepared = summarizer.prepare_document(doc)
+            error = relative_error(prepared.document.ranks, expected['ranks'])
+            # Approximate engines report a bound of the error of every rank, relative like error
+            bound = None
+            if summarizer.ranking_error is not None:
+                bound = summarizer.ranking_error['error_bound'] / (max([abs(rank) for rank in expected['ranks']] or [0.0]) or 1.0)
+            summary_equal = prepared.highlight(query) == expected['summary']
+            results.append({'backend': name, 'sentences': sentences, 'error': error, 'tolerance': tolerance,
+                            'bound': bound, 'summary_equal': summary_equal,
+                            'ok': len(prepared.document) == len(expected['ranks']) and error <= tolerance
+                                  and (bound is None or error <= bound) and (summary_equal or tolerance > 1e-6)})
+
+        for name in (selections if selections is not None else SELECTIONS):
+            summary = select_summary(name, doc, query, expected['ranks'])
+            results.append({'backend': name, 'sentences': sentences, 'error': 0.0, 'tolerance': 0.0, 'bound': None,
+                            'summary_equal': summary == expected['summary'], 'ok': summary == expected['summary']})
+    return results
+
+
+def select_summary(selection, doc, query, ranks):
+
+    """
+     The highlighted summary of doc selected from the golden ranks by another code path (string)
+        'dictionary' - summary_generator with the sentences ranks dictionary of rank_sentences
+        'streaming'  - StreamingSummarizer with a window covering the whole document, which ranks like the golden engine
+        'spans'      - highlight_spans rendered by SummarySpans.render
+    """
+    summarizer = summary_generator.DocumentSummarizer()
+    starts, ends, paragraph_ids = summarizer.sentence_offsets(doc)
+    document = summary_generator.CompactDocument(doc, starts, ends, paragraph_ids, ranks)
+    if selection == 'dictionary':
+        summary = summarizer.summary_generator(doc, query, document.ranks_dictionary(summarizer.format_sentence))
+        return summarizer.add_highligt_tags_to_summary(summary, query)
+    if selection == 'streaming':
+        # StreamingSummarizer ranks the sentences itself, with this window its ranks are the golden degree ranks
+        streaming = summary_generator.StreamingSummarizer(summarizer, window=len(ranks) + 1)
+        return streaming.highlight(io.StringIO(doc), query)
+    if selection == 'spans':
+        return summary_generator.PreparedDocument(summarizer, document).spans(query).render()
+    raise ValueError("Unknown selection: %s" % selection)
+
+
+def growth_exponent(sizes, values):
+
+    """
+     Least squares slope of log(value) over log(size): values grow like size ^ exponent (float)
+    """
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-9)) for value in values]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+            / sum((x - mean_x) ** 2 for x in xs))
+
+
+def scaling(engines=('inverted', 'minhash'), sizes=SCALING_SIZES, repeat=3, seed=0, **options):
+
+    """
+     The method ranks synthetic documents of growing size with every engine and fits the growth of the ranking
+     time (best of repeat runs) and of the number of scored sentence pairs
+
+    Args:
+
+    engines - Ranking engines (list)
+
+    sizes - Number of sentences of the documents (list)
+
+    repeat - Runs per document, the fastest one is kept (integer)
+
+    options - Other DocumentSummarizer options
+
+    Returns:
+
+    sizes, seconds, similarity_pairs, time_exponent, pairs_exponent, bound and ok of every engine (dictionary)
+    """
+    documents = []
+    for sentences in sizes:
+        doc, _ = golden_document(sentences, seed)
+        starts, ends, _ = summary_generator.DocumentSummarizer().sentence_offsets(doc)
+        documents.append([doc[start:end] for start, end in zip(starts, ends)])
+
+    report = {}
+    for engine in engines:
+        if engine == 'sparse' and not summary_generator.load_scipy():
+            continue
+        summarizer = summary_generator.DocumentSummarizer(ranking_engine=engine, approximate_threshold=None, **options)
+        seconds = []
+        pairs = []
+        for sentences in documents:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                summarizer.sentence_scores(sentences)
+                times.append(time.perf_counter() - start)
+            seconds.append(min(times))
+            pairs.append(summarizer.similarity_pairs)
+        exponent = growth_exponent(sizes, seconds)
+        report[engine] = {
+            'sizes': list(sizes),
+            'seconds': seconds,
+            'similarity_pairs': pairs,
+            'time_exponent': exponent,
+            'pairs_exponent': growth_exponent(sizes, pairs),
+            'bound': COMPLEXITY_BOUNDS.get(engine),
+            'ok': engine not in COMPLEXITY_BOUNDS or exponent <= COMPLEXITY_BOUNDS[engine],
+        }
+    return report
+
+
+def check_threshold(threshold, engine='auto', repeat=3, seed=0, **options):
+
+    """
+     The method ranks a synthetic document just above approximate_threshold with the exact engine and with minhash,
+     ok is True when the approximate path is the faster one, so the threshold is worth setting
+
+    Args:
+
+    threshold - approximate_threshold of DocumentSummarizer (integer)
+
+    engine - ranking_engine used below the threshold (string)
+
+    repeat - Runs per engine, the fastest one is kept (integer)
+
+    options - Other DocumentSummarizer options
+
+    Returns:
+
+    sentences, exact_engine, exact_seconds, approximate_seconds, speedup and ok (dictionary)
+    """
+    # A few sentences of the synthetic document may be merged by the tokenizer, so some more are generated
+    doc, _ = golden_document(threshold + threshold // 10 + 10, seed)
+    starts, ends, _ = summary_generator.DocumentSummarizer().sentence_offsets(doc)
+    sentences = [doc[start:end] for start, end in zip(starts, ends)][:threshold + 1]
+
+    seconds = {}
+    engines = {}
+    for path, approximate_threshold in (('exact', None), ('approximate', threshold)):
+        summarizer = summary_generator.DocumentSummarizer(ranking_engine=engine, approximate_threshold=approximate_threshold,
+                                                          **options)
+        engines[path] = summarizer.engine_for(len(sentences))
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            summarizer.sentence_scores(sentences)
+            times.append(time.perf_counter() - start)
+        seconds[path] = min(times)
+    return {
+        'sentences': len(sentences),
+        'exact_engine': engines['exact'],
+        'approximate_engine': engines['approximate'],
+        'exact_seconds': seconds['exact'],
+        'approximate_seconds': seconds['approximate'],
+        'speedup': seconds['exact'] / seconds['approximate'] if seconds['approximate'] else None,
+        'ok': seconds['approximate'] < seconds['exact'],
+    }
+
+
+def git_commit():
+
+    """
+     Current git commit of the repository, or None (string)
+    """
+    try:
+        with open('/dev/null', 'w') as devnull:
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=devnull).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(baseline, report):
+
+    """
+     p50 latency ratio (report / baseline) of every stage, below 1 means faster (dictionary)
+    """
+    ratios = {}
+    for stage, values in report['stages'].items():
+        old = baseline.get('stages', {}).get(stage, {}).get('p50')
+        if old:
+            ratios[stage] = values['p50'] / old
+    return ratios
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Benchmark the summarizer on synthetic reviews')
+    parser.add_argument('--documents', type=int, default=20, help='Number of documents (default 20)')
+    parser.add_argument('--paragraphs', type=int, default=3, help='Paragraphs per document (default 3)')
+    parser.add_argument('--sentences', type=int, default=8, help='Sentences per paragraph (default 8)')
+    parser.add_argument('--vocabulary', type=int, default=2000, help='Distinct content words (default 2000)')
+    parser.add_argument('--words', type=int, default=12, help='Average words per sentence (default 12)')
+    parser.add_argument('--query-length', type=int, default=3, help='Words per query (default 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0)')
+    parser.add_argument('--engine', default='auto', help='Ranking engine (default auto)')
+    parser.add_argument('--repeat', type=int, default=1, help='Times the corpus is summarized (default 1)')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON report of a previous run to compare p50 latencies with')
+    parser.add_argument('--ranker', default='degree', help='Ranker (default degree)')
+    parser.add_argument('--rankers', help='Comma separated rankers to compare, the first one is the reference')
+    parser.add_argument('--cold-start', action='store_true', help='Measure import time and first call latency instead')
+    parser.add_argument('--runs', type=int, default=5, help='Interpreters started by --cold-start (default 5)')
+    parser.add_argument('--check-golden', metavar='PATH', help='Compare every engine with the golden ranks and summaries')
+    parser.add_argument('--record-golden', metavar='PATH', help='Record the golden ranks and summaries of the reference engine')
+    parser.add_argument('--golden-sizes', default=','.join(str(size) for size in GOLDEN_SIZES),
+                        help='Sentences of the recorded golden documents (default %(default)s)')
+    parser.add_argument('--scaling', action='store_true', help='Fit the growth of the ranking time of every engine')
+    parser.add_argument('--scaling-sizes', default=','.join(str(size) for size in SCALING_SIZES),
+                        help='Sentences of the --scaling documents (default %(default)s)')
+    parser.add_argument('--engines', default='inverted,minhash', help='Engines of --scaling (default inverted,minhash)')
+    parser.add_argument('--check-threshold', type=int, metavar='SENTENCES',
+                        help='Fail unless minhash ranks faster than --engine just above this approximate_threshold')
+    args = parser.parse_args(argv)
+
+    if args.cold_start:
+        write_report(cold_start(args.runs, args.paragraphs, args.sentences, args.seed), args.output)
+        return
+
+    if args.record_golden:
+        record_golden(args.record_golden, [int(size) for size in args.golden_sizes.split(',')], args.seed)
+        return
+
+    if args.check_golden:
+        with open(args.check_golden) as f:
+            results = check_golden(json.load(f))
+        write_report({'golden': results}, args.output)
+        return 0 if all(result['ok'] for result in results) else 1
+
+    if args.scaling:
+        report = scaling(args.engines.split(','), [int(size) for size in args.scaling_sizes.split(',')], args.repeat, args.seed)
+        write_report({'scaling': report}, args.output)
+        return 0 if all(engine['ok'] for engine in report.values()) else 1
+
+    if args.check_threshold is not None:
+        report = check_threshold(args.check_threshold, args.engine, args.repeat, args.seed)
+        write_report({'threshold': report}, args.output)
+        return 0 if report['ok'] else 1
+
+    report = run_benchmark(args.documents, args.paragraphs, args.sentences, args.vocabulary, args.words,
+                           args.query_length, args.seed, args.engine, args.repeat, args.ranker)
+    if args.rankers:
+        report['rankers'] = compare_rankers(args.rankers.split(','), documents=args.documents, paragraphs=args.paragraphs,
+                                            sentences=args.sentences, vocabulary=args.vocabulary, words=args.words,
+                                            query_length=args.query_length, seed=args.seed,
+                                            ranking_engine=args.engine, repeat=args.repeat)
+    if args.compare:
+        with open(args.compare) as f:
+            report['p50_ratio_to_baseline'] = compare_reports(json.load(f), report)
+
+    write_report(report, args.output)
+
+
+def write_report(report, path=None):
+
+    """
+     Write a report as JSON to a file, or to stdout when path is None
+    """
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        with open(path, 'w') as f:
+            f.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
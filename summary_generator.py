@@ -1,6 +1,24 @@
 # coding=UTF-8
-from __future__ import division
+import array
+import collections
+import hashlib
+import heapq
+import json
+import math
+import random
 import re
+import struct
+import sys
+import threading
+import time
+import zlib
+
+# Modules which are slow to import and only needed by some features (argparse, gzip, mmap, multiprocessing,
+# socket) are imported where they are used, so short lived workers start fast.
+# NumPy and SciPy are only imported when a vectorized engine or ranker is used, see load_scipy()
+np = None
+sparse = None
+_scipy_missing = False
 
 # This is a simple text highlighting and summarization algorithm 
 # Created By :  PavanKumar PC
@@ -54,16 +72,744 @@ import re
  3. The graph built can be used with different Centality measures like 
         a. Degree centrality (node with high degree is considered)
         b. Eigen vector Centality 
+
+ Degree centrality is the default ranker. PageRank (eigenvector centrality) and LSA are available as
+ PageRankRanker and LSARanker, see DocumentSummarizer(ranker=...).
  
 """
 
 
+# Clock used for stage timings
+timer = time.perf_counter
+
+
+class DeadlineExceeded(Exception):
+
+    """
+     Raised inside the ranking loops when the time budget of a summary is spent, see DocumentSummarizer.prepare_document.
+     When it is raised while the document is split, offsets has the (starts, ends, paragraph_ids) split so far
+    """
+
+    def __init__(self, message, offsets=None):
+        Exception.__init__(self, message)
+        self.offsets = offsets
+
+
+def load_scipy():
+
+    """
+     Import NumPy and SciPy the first time a vectorized engine or ranker needs them, so short lived processes
+     which don't use them don't pay for the import.
+
+    Returns:
+
+    True when NumPy and SciPy are installed (boolean)
+    """
+    global np, sparse, _scipy_missing
+    if sparse is None and not _scipy_missing:
+        try:
+            import numpy
+            from scipy import sparse as scipy_sparse
+        except ImportError:
+            _scipy_missing = True
+        else:
+            np, sparse = numpy, scipy_sparse
+    return sparse is not None
+
+
+##//////////////////////////////////////////////////////
+## Tokenizer
+##//////////////////////////////////////////////////////
+
+# a list of stop words to be removed. More words can be added to the list
+STOP_WORDS = frozenset(['a','able','about','across','after','all','almost','also','am','among','an','and','any','are','as','at','be','because','been','but','by','can','cannot','could','dear','did','do','does','either','else','ever','every',
+                'for','from','get','got','had','has','have','he','her','hers','him','his',
+                'how','however','i','if','in','into','is','it','its','just','least','let',
+                'like','likely','may','me','might','most','must','my','neither','no','nor',
+                'not','of','off','often','on','only','or','other','our','own','rather','said',
+                'say','says','she','should','since','so','some','than','that','the','their',
+                'them','then','there','these','they','this','tis','to','too','twas','us',
+                'wants','was','we','were','what','when','where','which','while','who',
+                'whom','why','will','with','would','yet','you','your'])
+
+SENTENCE_ENDERS = re.compile(r"""
+    # Split sentences on whitespace between them.
+    (?:               # Group for two positive lookbehinds.
+      (?<=[.!?])      # Either an end of sentence punct,
+    | (?<=[.!?]['"])  # or end of sentence punct and quote.
+    )                 # End group of two positive lookbehinds.
+    (?<!  Mr\.   )    # Don't end sentence on "Mr."
+    (?<!  Mrs\.  )    # Don't end sentence on "Mrs."
+    (?<!  Jr\.   )    # Don't end sentence on "Jr."
+    (?<!  Dr\.   )    # Don't end sentence on "Dr."
+    (?<!  Prof\. )    # Don't end sentence on "Prof."
+    (?<!  Sr\.   )    # Don't end sentence on "Sr."
+    \s+               # Split on whitespace between sentences.
+    """,
+    re.IGNORECASE | re.VERBOSE)
+
+# A word is a run of letters/digits, optionally joined by apostrophes (Ex: city's, didn't)
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*", re.UNICODE)
+
+NON_WORD_PATTERN = re.compile(r'\W+')
+
+
+class Tokenizer(object):
+
+    """
+     Splits text into sentences and tokens. The stop word table and the regular expressions are built once,
+     and the token set of every sentence is memoized until clear() is called for the next document.
+    """
+
+    def __init__(self, stop_words=STOP_WORDS, sentence_enders=SENTENCE_ENDERS, word_pattern=WORD_PATTERN):
+        self.stop_words = frozenset(w.lower() for w in stop_words)
+        self.sentence_enders = sentence_enders
+        self.word_pattern = word_pattern
+        self._token_cache = {}
+        self._query_cache = {}
+
+    def clear(self):
+
+        """
+         Forget the memoized token sets. Called when a new document is ranked.
+        """
+        self._token_cache.clear()
+        self._query_cache.clear()
+
+    def split_sentences(self, text):
+
+        """
+         Split a document or paragraph into sentences (list)
+        """
+        return self.sentence_enders.split(text)
+
+    def sentence_spans(self, text, offset=0):
+
+        """
+         The (start, end) offsets of the sentences split_sentences gives, shifted by offset (list)
+        """
+        spans = []
+        start = 0
+        for match in self.sentence_enders.finditer(text):
+            spans.append((offset + start, offset + match.start()))
+            start = match.end()
+        spans.append((offset + start, offset + len(text)))
+        return spans
+
+    def remove_stop_words(self, words):
+
+        """
+         Remove stop words from a list of words (list)
+        """
+        stop_words = self.stop_words
+        return [w for w in words if w.lower() not in stop_words]
+
+    def tokens(self, sentence):
+
+        """
+         Lower cased words of a sentence which are not stop words. The result is memoized per sentence (frozenset)
+        """
+        tokens = self._token_cache.get(sentence)
+        if tokens is None:
+            tokens = self.tokenize(sentence)
+            self._token_cache[sentence] = tokens
+        return tokens
+
+    def tokenize(self, sentence):
+
+        """
+         The tokens of a sentence without memoizing them, for streams which would fill the cache (frozenset)
+        """
+        stop_words = self.stop_words
+        return frozenset(w for w in (w.lower() for w in self.word_pattern.findall(sentence)) if w not in stop_words)
+
+    def query_words(self, query):
+
+        """
+         Words of the query which are not stop words, in query order and case. The result is memoized per query (list)
+        """
+        words = self._query_cache.get(query)
+        if words is None:
+            words = self.remove_stop_words(query.split())
+            self._query_cache[query] = words
+        return words
+
+
+##//////////////////////////////////////////////////////
+## Highlighter
+##//////////////////////////////////////////////////////
+
+def _trie_pattern(words):
+    # Regex alternation with common prefixes factored out (Ex: pizza, pizzeria -> pizz(?:a|eria)), so matching
+    # at a position costs the length of the match instead of the number of words
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' not in node and len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if '' in node else '')
+
+    return build(trie)
+
+
+class Highlighter(object):
+
+    """
+     Adds highlight tags around query words in one scan of the text. The words are compiled once into a
+     single regular expression which only matches whole words, and a run of query words separated by
+     single spaces (Ex: deep dish pizza) gets one pair of tags.
+    """
+
+    def __init__(self, words, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]', ignore_case=False):
+        self.start_tag = start_tag
+        self.end_tag = end_tag
+        words = [w for w in words if w]
+        if words:
+            word = r'(?<!\w)' + _trie_pattern(words) + r'(?!\w)'
+            self.pattern = re.compile(word + '(?: ' + word + ')*', re.UNICODE | (re.IGNORECASE if ignore_case else 0))
+        else:
+            self.pattern = None
+
+    def spans(self, text, start=0, end=None):
+
+        """
+         (start, end) offsets of the highlighted runs in text, or in text[start:end] without copying it (list)
+        """
+        if self.pattern is None:
+            return []
+        return [m.span() for m in self.pattern.finditer(text, start, len(text) if end is None else end)]
+
+    def highlight(self, text):
+
+        """
+         The text with highlight tags added around the query words (string)
+        """
+        if self.pattern is None:
+            return text
+        start_tag, end_tag = self.start_tag, self.end_tag
+        return self.pattern.sub(lambda m: start_tag + m.group(0) + end_tag, text)
+
+
+##//////////////////////////////////////////////////////
+## MinHash LSH
+##//////////////////////////////////////////////////////
+
+class MinHashLSH(object):
+
+    """
+     Finds the pairs of sentences which probably share tokens, without comparing every pair (needs NumPy).
+
+     Every token set gets a MinHash signature of bands x rows hash values. The signature is cut into bands and two
+     sentences become a candidate pair when all rows of at least one band are equal. Two sentences with Jaccard
+     similarity J are found with probability 1 - (1 - J^rows)^bands.
+
+     This is the accuracy/speed knob: more bands or fewer rows find more pairs (more accurate, slower), fewer bands
+     or more rows find fewer pairs (faster). threshold() gives the similarity found with probability 1/2.
+
+     The cost is bounded whatever the document: signatures and bands are computed with NumPy for all sentences at
+     once, a band lists the pairs of its buckets of at most max_bucket sentences, so a sentence gets at most
+     max_candidates() candidates, and every sentence is compared with sample_size sampled sentences in one sparse
+     matrix product.
+
+        bands - Number of bands (integer)
+        rows - Hash values per band (integer)
+        max_bucket - Bands shared by more sentences than this are skipped, so boilerplate sentences don't bring
+                     back the n^2 cost (integer)
+        sample_size - Number of sentences sampled to estimate the overlaps LSH did not find, every sentence is
+                      compared with the same sample. 0 counts them as 0, then ranks can only be too low (integer)
+        error_sample - Number of sentences whose exact rank is computed to report the measured error (integer)
+        confidence - Probability with which every rank is within the reported error bound (float)
+        seed - Seed of the hash functions and of the samples (integer)
+    """
+
+    # Hash values fit in 31 bits, so a * value + b is computed by NumPy in 64 bit integers without overflow
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, bands=32, rows=2, max_bucket=16, sample_size=256, error_sample=32, confidence=0.95, seed=1):
+        self.bands = bands
+        self.rows = rows
+        self.max_bucket = max_bucket
+        self.sample_size = sample_size
+        self.error_sample = error_sample
+        self.confidence = confidence
+        self.seed = seed
+        generator = random.Random(seed)
+        self._hash_functions = [(generator.randrange(1, self.PRIME), generator.randrange(0, self.PRIME))
+                                for _ in range(bands * rows)]
+
+    def threshold(self):
+
+        """
+         Jaccard similarity which is found with probability 1/2 (float)
+        """
+        return (1 - 0.5 ** (1 / self.bands)) ** (1 / self.rows)
+
+    def max_candidates(self):
+
+        """
+         Maximum number of candidate pairs of a sentence (integer)
+        """
+        return self.bands * (self.max_bucket - 1)
+
+    def signatures(self, token_sets):
+
+        """
+         MinHash signature of every token set, in the rows of an array of n x (bands * rows) hash values, and
+         whether every token set has tokens (tuple of numpy arrays). Empty sets get PRIME in every column.
+        """
+        prime = self.PRIME
+        vocabulary = {}
+        indices = []
+        indptr = [0]
+        for tokens in token_sets:
+            for token in tokens:
+                indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            indptr.append(len(indices))
+        # crc32 is stable between processes, unlike hash(). Columns are in the order of vocabulary
+        values = np.array([zlib.crc32(token.encode('utf-8')) for token in vocabulary], dtype=np.int64) % prime
+        a = np.array([a for a, _ in self._hash_functions], dtype=np.int64)
+        b = np.array([b for _, b in self._hash_functions], dtype=np.int64)
+        token_hashes = (values[:, None] * a + b) % prime
+
+        indptr = np.array(indptr, dtype=np.int64)
+        tokenized = np.diff(indptr) > 0
+        signatures = np.full((len(token_sets), len(a)), prime, dtype=np.int64)
+        if indices:
+            # Rows without tokens are left out, so the segment of a row ends where the next non empty row starts
+            signatures[tokenized] = np.minimum.reduceat(token_hashes[np.array(indices, dtype=np.int64)],
+                                                        indptr[:-1][tokenized], axis=0)
+        return signatures, tokenized
+
+    def candidate_pairs(self, token_sets, check_deadline=None):
+
+        """
+         The pairs of token sets which share a band, each pair once with i < j, as two arrays of i and j sorted by
+         i then j (tuple of numpy arrays). A token set is in at most max_candidates() pairs.
+
+            check_deadline - Function called between bands, which raises when the time budget is spent
+        """
+        n = len(token_sets)
+        signatures, tokenized = self.signatures(token_sets)
+        ids = np.flatnonzero(tokenized)
+        rows = self.rows
+        encoded = []
+        for band in range(self.bands):
+            if check_deadline is not None:
+                check_deadline()
+            keys = np.zeros(len(ids), dtype=np.uint64)
+            for row in range(band * rows, (band + 1) * rows):
+                keys = (keys << np.uint64(31)) ^ signatures[ids, row].astype(np.uint64)
+            # Stable sort: the members of a bucket stay in sentence order, so i < j below
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            members = ids[order]
+            first = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            sizes = np.diff(np.append(first, len(keys)))
+            bucket_end = np.repeat(first + sizes, sizes)
+            positions = np.flatnonzero(np.repeat((sizes > 1) & (sizes <= self.max_bucket), sizes))
+            # Pairs of members at distance 1, 2, ... in their bucket
+            distance = 1
+            while len(positions):
+                positions = positions[positions + distance < bucket_end[positions]]
+                encoded.append(members[positions] * n + members[positions + distance])
+                distance += 1
+        pairs = np.sort(np.concatenate(encoded)) if encoded else np.array([], dtype=np.int64)
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+        return pairs // max(n, 1), pairs % max(n, 1)
+
+
+def simhash(tokens, token_hashes=None):
+
+    """
+     64 bit SimHash of a token set: bit b is set when more tokens have bit b set in their hash than not. Token sets
+     which share most tokens get hashes which differ in few bits (integer)
+
+        token_hashes - Cache of the hash bits of every token, shared by the sentences of a document (dictionary)
+    """
+    if token_hashes is None:
+        token_hashes = {}
+    columns = []
+    for token in tokens:
+        bits = token_hashes.get(token)
+        if bits is None:
+            # blake2b is stable between processes, unlike hash(). Bits are kept as +1/-1 votes, lowest bit first
+            value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+            bits = token_hashes[token] = [1 if value >> bit & 1 else -1 for bit in range(64)]
+        columns.append(bits)
+    return sum(1 << bit for bit, votes in enumerate(zip(*columns)) if sum(votes) > 0)
+
+
+def duplicate_groups(token_sets, max_distance=None):
+
+    """
+     Groups the sentences which are duplicates after normalization: sentences with the same tokens (case, punctuation
+     and stop words removed, Ex: "Highly recommend!" and "highly recommend.") have the same similarity with every
+     other sentence, so they are ranked once. With max_distance, sentences whose SimHash differs in at most max_distance
+     bits from the first sentence of a group are near duplicates and join it too.
+
+     Near duplicates are found without comparing every pair: the 64 bits are cut into max_distance + 1 blocks and
+     two hashes within max_distance bits are equal on at least one block, so only sentences sharing a block are compared.
+
+     Every sentence joins the group of the first sentence it duplicates, in document order, so the groups are deterministic.
+
+    Args:
+
+    token_sets - Tokens of every sentence (list)
+
+    max_distance - Maximum number of different SimHash bits of near duplicates, None for exact duplicates only (integer)
+
+    Returns:
+
+    (representatives, group_of, multiplicity): the index of the first sentence of every group, the group of every
+    sentence and the number of sentences of every group (tuple)
+    """
+    representatives = []
+    group_of = []
+    multiplicity = []
+    groups = {}
+    token_hashes = {}
+    blocks = None
+    if max_distance is not None:
+        size = -(-64 // (max_distance + 1))
+        blocks = [(start, (1 << min(size, 64 - start)) - 1) for start in range(0, 64, size)]
+        buckets = collections.defaultdict(list)
+        hashes = []
+
+    for i, tokens in enumerate(token_sets):
+        group = groups.get(tokens)
+        if group is None and blocks is not None and tokens:
+            value = simhash(tokens, token_hashes)
+            for block, (start, mask) in enumerate(blocks):
+                for candidate in buckets[block, value >> start & mask]:
+                    if bin(value ^ hashes[candidate]).count('1') <= max_distance and (group is None or candidate < group):
+                        group = candidate
+            if group is None:
+                for block, (start, mask) in enumerate(blocks):
+                    buckets[block, value >> start & mask].append(len(representatives))
+                hashes.append(value)
+            else:
+                groups[tokens] = group
+        elif blocks is not None and group is None:
+            hashes.append(None)
+        if group is None:
+            group = groups[tokens] = len(representatives)
+            representatives.append(i)
+            multiplicity.append(0)
+        group_of.append(group)
+        multiplicity[group] += 1
+    return representatives, group_of, multiplicity
+
+
+##//////////////////////////////////////////////////////
+## Rankers
+##//////////////////////////////////////////////////////
+
+class Ranker(object):
+
+    """
+     Computes the rank of every sentence of a document. A ranker is given to DocumentSummarizer(ranker=...),
+     rank_sentences and prepare_document then use it. Subclasses implement scores(); documents_scores() can be
+     overridden to rank many documents with one batch of linear algebra.
+    """
+
+    name = None
+
+    def scores(self, summarizer, sentences):
+
+        """
+         Rank of every sentence, in the same order as sentences (list)
+        """
+        raise NotImplementedError
+
+    def documents_scores(self, summarizer, documents_sentences):
+
+        """
+         The scores of every document, see DocumentSummarizer.documents_scores (list)
+        """
+        return [summarizer.sentence_scores(sentences) for sentences in documents_sentences]
+
+
+class DegreeRanker(Ranker):
+
+    """
+     Degree centrality, the original rank: the sum of the similarity scores of a sentence with every other
+     sentence. It is computed by the summarizer's ranking_engine.
+    """
+
+    name = 'degree'
+
+    def scores(self, summarizer, sentences):
+        return summarizer.degree_scores(sentences)
+
+    def documents_scores(self, summarizer, documents_sentences):
+        return summarizer.degree_documents_scores(documents_sentences)
+
+
+class PageRankRanker(Ranker):
+
+    """
+     Eigenvector centrality (TextRank): the PageRank of every sentence in the graph of sentences weighted by
+     their similarity scores. A sentence ranks high when it is similar to other high rank sentences, not only
+     to many sentences. Computed by power iteration on the sparse similarity matrix (needs NumPy and SciPy).
+
+        damping - Probability to follow an edge instead of jumping to a random sentence (float)
+        tol - Iteration stops when the ranks of every document change less than this (L1 norm) (float)
+        max_iter - Maximum number of iterations (integer)
+
+     Many documents are ranked with one block diagonal matrix, so every iteration is one sparse product for
+     the whole batch. The number of iterations of the last call is kept in iterations.
+    """
+
+    name = 'pagerank'
+
+    def __init__(self, damping=0.85, tol=1.0e-6, max_iter=100):
+        self.damping = damping
+        self.tol = tol
+        self.max_iter = max_iter
+        self.iterations = 0
+
+    def scores(self, summarizer, sentences):
+        return self.documents_scores(summarizer, [sentences])[0]
+
+    def documents_scores(self, summarizer, documents_sentences):
+        sizes = np.array([len(sentences) for sentences in documents_sentences], dtype=np.int64)
+        n = int(sizes.sum())
+        self.iterations = 0
+        if not n:
+            summarizer.similarity_pairs = 0
+            return [[] for _ in documents_sentences]
+
+        graph = summarizer.similarity_matrix(documents_sentences)
+        document_of = np.repeat(np.arange(len(sizes)), sizes)
+        document_sizes = sizes[document_of].astype(np.float64)
+
+        # Column stochastic transition matrix, sentences without edges jump to a random sentence of their document
+        out_weights = np.asarray(graph.sum(axis=1)).ravel()
+        dangling = out_weights == 0
+        inverse_weights = np.zeros(n)
+        inverse_weights[~dangling] = 1.0 / out_weights[~dangling]
+        transition = graph.T.tocsr()
+
+        ranks = 1.0 / document_sizes
+        teleport = (1.0 - self.damping) / document_sizes
+        for iteration in range(1, self.max_iter + 1):
+            summarizer.check_deadline()
+            dangling_mass = np.bincount(document_of, weights=ranks * dangling, minlength=len(sizes))
+            new_ranks = teleport + self.damping * (transition.dot(ranks * inverse_weights)
+                                                   + dangling_mass[document_of] / document_sizes)
+            change = np.bincount(document_of, weights=np.abs(new_ranks - ranks), minlength=len(sizes))
+            ranks = new_ranks
+            if change.max() < self.tol:
+                break
+        self.iterations = iteration
+
+        scores = ranks.tolist()
+        documents_scores = []
+        start = 0
+        for size in sizes:
+            documents_scores.append(scores[start:start + size])
+            start += size
+        return documents_scores
+
+
+class LSARanker(Ranker):
+
+    """
+     Latent Semantic Analysis: the sentence x term matrix A is reduced to its top components with a randomized
+     truncated SVD, A ~ U S V^T, and the rank of sentence i is the length of its row in U S, ie how strongly it
+     expresses the main topics of the document. Sentences which share no word but use words of the same topic
+     get related this way (needs NumPy and SciPy).
+
+        components - Number of topics kept (integer)
+        oversampling - Extra random vectors of the randomized SVD, more is more accurate (integer)
+        power_iterations - Power iterations of the randomized SVD, more is more accurate (integer)
+        seed - Seed of the random projection, the same seed gives the same ranks (integer)
+
+     The randomized SVD only multiplies the sparse matrix by a few dense vectors and decomposes a small dense
+     matrix, so its cost is O(nnz(A) * (components + oversampling)).
+    """
+
+    name = 'lsa'
+
+    def __init__(self, components=3, oversampling=10, power_iterations=2, seed=1):
+        self.components = components
+        self.oversampling = oversampling
+        self.power_iterations = power_iterations
+        self.seed = seed
+
+    def scores(self, summarizer, sentences):
+        if not sentences:
+            summarizer.similarity_pairs = 0
+            return []
+        incidence = summarizer.incidence_matrix([sentences]).astype(np.float64)
+        summarizer.similarity_pairs = 0
+        n, terms = incidence.shape
+        rank = min(self.components, n, terms)
+        if not rank:
+            return [0.0] * n
+
+        u, singular_values = self.randomized_svd(incidence, rank)
+        return np.sqrt(((u * singular_values) ** 2).sum(axis=1)).tolist()
+
+    def randomized_svd(self, matrix, rank):
+
+        """
+         The top rank left singular vectors and singular values of a sparse matrix (tuple of numpy arrays)
+        """
+        generator = np.random.RandomState(self.seed)
+        width = min(rank + self.oversampling, min(matrix.shape))
+        samples = matrix.dot(generator.standard_normal((matrix.shape[1], width)))
+        basis = np.linalg.qr(samples)[0]
+        for _ in range(self.power_iterations):
+            basis = np.linalg.qr(matrix.T.dot(basis))[0]
+            basis = np.linalg.qr(matrix.dot(basis))[0]
+        small = np.asarray(matrix.T.dot(basis)).T
+        u, singular_values, _ = np.linalg.svd(small, full_matrices=False)
+        return basis.dot(u[:, :rank]), singular_values[:rank]
+
+
+RANKERS = {'degree': DegreeRanker, 'pagerank': PageRankRanker, 'lsa': LSARanker}
+
+
 ##//////////////////////////////////////////////////////
 ## Document Summarizer
 ##//////////////////////////////////////////////////////
 
 class DocumentSummarizer(object):
 
+    # Rows scored between two deadline checks by the sparse engine
+    DEADLINE_BLOCK_ROWS = 1024
+
+    # Sentences of a 'first' tier summary without summary_sentences
+    FALLBACK_SENTENCES = 3
+
+    def __init__(self, ranking_engine='auto', tokenizer=None, rank_cache=None, rank_store=None, metrics=None,
+                 minhash=None, approximate_threshold=5000, frequent_term_cap=1000, ranker=None, threads=1,
+                 parallel_threshold=2000, summary_sentences=None, summary_characters=None, sparse_threshold=200,
+                 duplicates='exact', simhash_distance=5, time_budget=None, max_rank_sentences=None,
+                 max_rank_characters=None):
+
+        """
+         ranking_engine - Engine used by rank_sentences (string)
+                'pairwise' - scores every pair of sentences one by one with get_sentences_similarity_score
+                'sparse'   - builds a sentence x term incidence matrix and scores all pairs with one sparse
+                             matrix product (needs NumPy and SciPy)
+                'inverted' - builds a term -> sentences index and only scores the pairs which share a term
+                'minhash'  - approximate ranking which only scores the pairs found by MinHash LSH, with a bound of
+                             the error (see rank_sentences_minhash, needs NumPy and SciPy)
+                'auto'     - 'sparse' for documents of at least sparse_threshold sentences when NumPy and SciPy are
+                             installed, 'inverted' otherwise. Both give the ranks of 'pairwise'.
+
+         tokenizer - Tokenizer used to split sentences and words, a new one is created by default (Tokenizer)
+
+         rank_cache - If given, prepared documents are cached so repeated documents are not ranked again (RankCache)
+
+         rank_store - If given, documents found in it by id use the precomputed ranks (RankStore)
+
+         metrics - If given, every highlight_doc call is timed and a MetricsRecord is sent to it. Can be a sink with an
+                   emit(record) method (Ex: HistogramRegistry, StatsdSink) or a function taking the record.
+                   Without it highlight_doc does no extra work.
+
+         minhash - Settings of the approximate ranking, MinHashLSH() by default (MinHashLSH)
+
+         approximate_threshold - Documents with more sentences than this are ranked with the 'minhash' engine whatever
+                                 ranking_engine is, when NumPy and SciPy are installed. None to always use
+                                 ranking_engine. benchmark.py --check-threshold checks that minhash is faster there
+                                 (integer)
+
+         frequent_term_cap - The 'inverted' and 'sparse' engines do not list the sentence pairs of terms found in more
+                             sentences than this, see rank_sentences_inverted and incidence_degree_scores (integer)
+
+         ranker - How sentences are ranked, a Ranker or the name of one (string)
+                'degree'   - sum of the similarity scores with every other sentence, computed by ranking_engine (default)
+                'pagerank' - PageRank of the sentence in the similarity graph, see PageRankRanker
+                'lsa'      - weight of the sentence in the main topics of the document, see LSARanker
+
+         threads - Number of threads scoring the sentence pairs of one document with the sparse engine and the pagerank
+                   ranker. The rows of the similarity matrix are split into blocks computed in parallel; SciPy and
+                   NumPy release the GIL in their kernels. The ranks are identical to one thread (integer)
+
+         parallel_threshold - Documents with fewer sentences than this are scored in one block (integer)
+
+         summary_sentences - Maximum number of sentences in a summary, None for one per paragraph (integer)
+
+         summary_characters - Maximum number of characters in a summary, None for no limit (integer)
+
+         sparse_threshold - With the 'auto' engine, documents (or batches, see rank_documents) with fewer sentences
+                            are ranked with the 'inverted' engine, which does not need to import NumPy and SciPy (integer)
+
+         duplicates - How repeated sentences (Ex: "Highly recommend!") are ranked by the 'sparse' and 'inverted' engines
+                      of the degree ranker, see duplicate_groups (string)
+                'exact'   - sentences with the same tokens are ranked once and weighted by their number of copies,
+                            the ranks are the same up to floating point rounding (default)
+                'simhash' - near duplicates within simhash_distance SimHash bits are ranked like the first one too
+                None      - every sentence is ranked on its own
+
+         simhash_distance - Maximum number of different SimHash bits of near duplicates (integer)
+
+         time_budget - Seconds prepare_document (and highlight_doc) may spend on a document which is not in the rank_cache
+                       or rank_store, None for no limit. The ranking loops check the deadline, see prepare_document (float)
+
+         max_rank_sentences - Documents with more sentences are ranked approximately ('pruned' tier), None for no limit (integer)
+
+         max_rank_characters - Only the first max_rank_characters of longer documents are read and their first sentences
+                               are the summary ('first' tier), None for no limit (integer)
+        """
+        if duplicates not in (None, 'exact', 'simhash'):
+            raise ValueError("Unknown duplicates mode: %s" % duplicates)
+        if ranking_engine not in ('auto', 'pairwise', 'sparse', 'inverted', 'minhash'):
+            raise ValueError("Unknown ranking engine: %s" % ranking_engine)
+        if ranking_engine in ('sparse', 'minhash') and not load_scipy():
+            raise ImportError("The '%s' ranking engine needs NumPy and SciPy" % ranking_engine)
+        self.ranking_engine = ranking_engine
+        if ranker is None or ranker in RANKERS:
+            ranker = RANKERS[ranker or 'degree']()
+        elif not hasattr(ranker, 'scores'):
+            raise ValueError("Unknown ranker: %s" % ranker)
+        if ranker.name in ('pagerank', 'lsa') and not load_scipy():
+            raise ImportError("The '%s' ranker needs NumPy and SciPy" % ranker.name)
+        self.ranker = ranker
+        self.tokenizer = tokenizer if tokenizer is not None else Tokenizer()
+        self.rank_cache = rank_cache
+        self.rank_store = rank_store
+        self._highlighters = {}
+        self.metrics = metrics if metrics is None or hasattr(metrics, 'emit') else CallbackSink(metrics)
+
+        self.minhash = minhash if minhash is not None else MinHashLSH()
+        self.approximate_threshold = approximate_threshold
+        self.frequent_term_cap = frequent_term_cap
+        self.threads = threads
+        self.parallel_threshold = parallel_threshold
+        self._thread_pool = None
+        self.summary_sentences = summary_sentences
+        self.summary_characters = summary_characters
+        self.sparse_threshold = sparse_threshold
+        self.duplicates = duplicates
+        self.simhash_distance = simhash_distance
+        self.time_budget = time_budget
+        self.max_rank_sentences = max_rank_sentences
+        self.max_rank_characters = max_rank_characters
+
+        # Deadline (timer() value) of the document being prepared, see check_deadline
+        self.deadline = None
+
+        # Tier of the last prepared document: 'exact', 'pruned', 'lead' or 'first', see prepare_document
+        self.summary_tier = None
+
+        # Number of sentence pairs scored by the last rank_sentences call
+        self.similarity_pairs = 0
+
+        # Error estimate of the last approximate ranking, None after an exact ranking (dictionary)
+        self.ranking_error = None
+
     def read_document(self, file_name):
 
         """
@@ -75,8 +821,8 @@ class DocumentSummarizer(object):
 
           Document/File content (string)
         """
-        with open(file_name) as myfile:
-            document="".join(line for line in myfile)
+        with open(file_name, encoding='utf-8') as myfile:
+            document=myfile.read()
 
         return document
 
@@ -88,25 +834,14 @@ class DocumentSummarizer(object):
          The method removes all stop words from the text. More words can be added to the list
            
 
-         text - Document or Paragraph or Sentence(string)
+         text - Words of a Document or Paragraph or Sentence (list)
 
         Returns:
 
         A list of words which are not stop words (list)
         """
 
-         # a list of stop words to be removed
-        stop_words =  ['a','able','about','across','after','all','almost','also','am','among','an','and','any','are','as','at','be','because','been','but','by','can','cannot','could','dear','did','do','does','either','else','ever','every',
-                        'for','from','get','got','had','has','have','he','her','hers','him','his',
-                        'how','however','i','if','in','into','is','it','its','just','least','let',
-                        'like','likely','may','me','might','most','must','my','neither','no','nor',
-                        'not','of','off','often','on','only','or','other','our','own','rather','said',
-                        'say','says','she','should','since','so','some','than','that','the','their',
-                        'them','then','there','these','they','this','tis','to','too','twas','us',
-                        'wants','was','we','were','what','when','where','which','while','who',
-                        'whom','why','will','with','would','yet','you','your']
-
-        return [w for w in text if w.lower() not in stop_words]
+        return self.tokenizer.remove_stop_words(text)
 
  
     
@@ -124,23 +859,7 @@ class DocumentSummarizer(object):
         A list of sentences (list)
         """
 
-        sentenceEnders = re.compile(r"""
-            # Split sentences on whitespace between them.
-            (?:               # Group for two positive lookbehinds.
-              (?<=[.!?])      # Either an end of sentence punct,
-            | (?<=[.!?]['"])  # or end of sentence punct and quote.
-            )                 # End group of two positive lookbehinds.
-            (?<!  Mr\.   )    # Don't end sentence on "Mr."
-            (?<!  Mrs\.  )    # Don't end sentence on "Mrs."
-            (?<!  Jr\.   )    # Don't end sentence on "Jr."
-            (?<!  Dr\.   )    # Don't end sentence on "Dr."
-            (?<!  Prof\. )    # Don't end sentence on "Prof."
-            (?<!  Sr\.   )    # Don't end sentence on "Sr."
-            \s+               # Split on whitespace between sentences.
-            """, 
-            re.IGNORECASE | re.VERBOSE)
-        sentenceList = sentenceEnders.split(paragraph)
-        return sentenceList
+        return self.tokenizer.split_sentences(paragraph)
 
 
     def generate_sentences(self, content):
@@ -169,6 +888,54 @@ class DocumentSummarizer(object):
 
         return content.split("\n\n")
 
+
+    def sentence_offsets(self, doc):
+        """
+         The method splits the document into paragraphs and sentences without copying them. Every sentence is
+         described by its start and end offset in doc and the id of its paragraph, in document order.
+         Paragraphs are split one by one, like best_paragraph_sentences does.
+
+        Args:
+
+        doc - Document (string)
+
+        Returns:
+
+        (starts, ends, paragraph_ids) - one entry per sentence (tuple of array)
+        """
+        starts = array.array('l')
+        ends = array.array('l')
+        paragraph_ids = array.array('l')
+        offset = 0
+        deadline = self.deadline
+        for paragraph_id, paragraph in enumerate(self.paragragh_generator(doc)):
+            # The first paragraph is always split, so a 'first' tier summary is not empty
+            if deadline is not None and paragraph_id and timer() > deadline:
+                raise DeadlineExceeded("Time budget spent while splitting sentences", (starts, ends, paragraph_ids))
+            for start, end in self.tokenizer.sentence_spans(paragraph, offset):
+                starts.append(start)
+                ends.append(end)
+                paragraph_ids.append(paragraph_id)
+            offset += len(paragraph) + 2
+        return starts, ends, paragraph_ids
+
+
+    def compact_document(self, doc):
+        """
+         The method splits and ranks a document into a CompactDocument
+
+        Args:
+
+        doc - Document (string)
+
+        Returns:
+
+        The ranked document (CompactDocument)
+        """
+        starts, ends, paragraph_ids = self.sentence_offsets(doc)
+        scores = self.sentence_scores([doc[start:end] for start, end in zip(starts, ends)])
+        return CompactDocument(doc, starts, ends, paragraph_ids, scores)
+
     def format_sentence(self, sentence):
         """
          Format a sentence - remove all non-alphabetic chars from the sentence
@@ -185,10 +952,26 @@ class DocumentSummarizer(object):
 
         """
 
-        sentence = re.sub(r'\W+', '', sentence)
-        return sentence
+        return NON_WORD_PATTERN.sub('', sentence)
 
     
+    def sentence_tokens(self, sentence):
+
+        """
+         The method returns the set of words of a sentence after removing stop words.
+         Both ranking engines use it so that they score exactly the same tokens. The set is memoized by the tokenizer.
+
+        Args:
+
+        sentence - A sentence in the document (string)
+
+        Returns:
+
+        Lower cased words of the sentence which are not stop words (frozenset)
+        """
+        return self.tokenizer.tokens(sentence)
+
+
     def get_sentences_similarity_score(self, sentence1, sentence2):
 
         """
@@ -212,8 +995,28 @@ class DocumentSummarizer(object):
         """
 
         # split the sentence into words/tokens and remove stop words
-        s1 = set(self.remove_stop_words(sentence1))
-        s2 = set(self.remove_stop_words(sentence2))
+        s1 = self.sentence_tokens(sentence1)
+        s2 = self.sentence_tokens(sentence2)
+
+        return self.tokens_similarity_score(s1, s2)
+
+
+    def tokens_similarity_score(self, s1, s2):
+
+        """
+         The similarity score of get_sentences_similarity_score for two sentences which are already tokenized
+
+        Args:
+
+        s1 - Tokens of a sentence (set)
+
+        s2 - Tokens of some other sentence (set)
+
+        Returns:
+
+        Similarity score between the sentences (Decimal)
+
+        """
 
         # If there is not intersection, just return 0
         if (len(s1) + len(s2)) == 0:
@@ -229,7 +1032,7 @@ class DocumentSummarizer(object):
     def rank_sentences(self, sentences):
 
         """
-        The method calculates the rank for every sentence in the dcoument and stores it in the form of a graph/ 2D matrix
+        The method calculates the rank for every sentence in the dcoument using the configured ranking engine
 
         Args:
 
@@ -240,241 +1043,2882 @@ class DocumentSummarizer(object):
         A dictionary containing Key =Sentence and Value= Rank(Sentence)  (Dictionary)
 
         """
+        return self.build_ranks_dictionary(sentences, self.sentence_scores(sentences))
 
-        # Calculate the intersection of every two sentences
-        n = len(sentences)
-        rank_graph = [[0 for x in xrange(n)] for x in xrange(n)]
-
-        # Below code can be compactly written in one line. For readability written like C or C++ 
-        for i in range(0, n):
-            for j in range(0, n):
-                rank_graph[i][j] = self.get_sentences_similarity_score(sentences[i], sentences[j])
-
-        # Build the dictionary of sentences
-        # Score of a sentence =  Sum of all intersection counts
-        sentences_ranks_dictionary = {}
-        for i in range(0, n):
-            score = 0
-            for j in range(0, n):
-                if i == j:
-                    continue
-                score += rank_graph[i][j]
-            sentences_ranks_dictionary[self.format_sentence(sentences[i])] = score
-        return sentences_ranks_dictionary
 
-    
-    def select_best_sentences(self, paragraph, sentences_ranks_dictionary, number_of_sentences=1):
+    def sentence_scores(self, sentences):
 
         """
-        The method generates first N(number_of_sentences) high rank sentences for a given paragraph using  sentences_ranks_dictionary.
+        The method calculates the rank of every sentence using the configured ranker
 
         Args:
 
-        paragraph - A Paragraph in the gievn document(string)
+        sentences - A list of all sentences
 
-        sentences_ranks_dictionary - It contains every sentence and its rank of the entire document (Dictionary). Key= sentence, Value= Rank
+        Returns:
 
-        number_of_sentences- It specifies the number of high rank sentences(sorted in decreasing order of rank) required in a given parageaph.
-                             It also controls the final summary length. (Integer) 
+        Rank of every sentence, in the same order as sentences (list)
 
+        """
+        # Token sets are memoized per document
+        self.tokenizer.clear()
+        self.ranking_error = None
+        return self.ranker.scores(self, sentences)
 
-        Returns:
 
-        A list of first N(number_of_sentences) rank sentences in a given paragraph (list)
+    def degree_scores(self, sentences):
 
         """
+        The method calculates the degree rank of every sentence (see DegreeRanker) using the configured ranking engine
 
-        # Split the paragraph into sentences
-        sentences = self.generate_sentences(paragraph)
+        Args:
 
-        # Skip Short paragrahs as this might not give enough information
-        if len(sentences) < 2:
-            return []
+        sentences - A list of all sentences
 
-        sentences_rank_for_given_paragrah={}
+        Returns:
 
-        # # If senetences in this paragraph is found in  sentences_ranks_dictionary add it to local sentences_rank_for_given_paragrah dictionary
-        # # use formatted sentence as key in dictionary 
-        
-        # for s in sentences:
-        #     strip_s = self.format_sentence(s)
-        #     if strip_s:
-        #         if sentences_ranks_dictionary[strip_s] > max_value:
-        #             max_value = sentences_ranks_dictionary[strip_s]
-        #             best_sentence = s
-        #             sentences_rank_for_given_paragrah[strip_s]=sentences_ranks_dictionary[strip_s]
+        Rank of every sentence, in the same order as sentences (list)
 
+        """
+        engine = self.engine_for(len(sentences))
+        if engine == 'minhash':
+            return self.minhash_scores(sentences)
+        if engine == 'pairwise':
+            return self.pairwise_scores(sentences)
+        unique, group_of, multiplicity = self.collapse_duplicates(sentences)
+        if engine == 'inverted':
+            scores = self.inverted_scores(unique, multiplicity)
+        elif not sentences:
+            self.similarity_pairs = 0
+            return []
+        else:
+            scores = self.sparse_scores([unique], [multiplicity])[0]
+        return scores if group_of is None else [scores[group] for group in group_of]
 
-        # # Get first high N (number_of_sentences) rank sentences from local hash
-        # # If number_of_sentences==1 it will return the highest rank sentence
-        # high_rank_sentences= list(sorted(sentences_rank_for_given_paragrah, key= lambda x:sentences_rank_for_given_paragrah[x], reverse=True))
 
+    def collapse_duplicates(self, sentences):
 
-        # BELOW IS THE COMPACT AND ONE LINER CODE FOR ABOVE CODE SNIPPET
+        """
+        The method groups the duplicate sentences of a document (see duplicate_groups and the duplicates option), so
+        every group is ranked once, weighted by its number of sentences
 
-        sentences_rank_for_given_paragrah={ s :sentences_ranks_dictionary[self.format_sentence(s)] for s in sentences if self.format_sentence(s) in sentences_ranks_dictionary}
-        high_rank_sentences= list(sorted(sentences_rank_for_given_paragrah, key= lambda x:sentences_rank_for_given_paragrah[x], reverse=True))
+        Args:
 
-        # Get only required number of sentences
-        high_rank_sentences= high_rank_sentences[0:number_of_sentences]
-        
-        return high_rank_sentences
+        sentences - A list of all sentences
 
+        Returns:
 
-    def add_highligt_tags_to_summary(self, summary,query, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
+        (unique, group_of, multiplicity): the first sentence of every group, the group of every sentence and the number
+        of sentences of every group. group_of and multiplicity are None when there is nothing to collapse (tuple)
 
         """
-        The method takes start and end tags with default values and adds tags to review summary. 
-        The user can pass any highlight tags like <b> </b> etc, so that the code works for any tags.
-
-        Args:
-
-        summary - Review summary generated after appylying ranking algortihm(string)
+        if self.duplicates is None:
+            return sentences, None, None
+        max_distance = self.simhash_distance if self.duplicates == 'simhash' else None
+        representatives, group_of, multiplicity = duplicate_groups([self.sentence_tokens(s) for s in sentences], max_distance)
+        if len(representatives) == len(sentences):
+            return sentences, None, None
+        return [sentences[i] for i in representatives], group_of, multiplicity
 
-        query­- The search query(string)
 
-        start_tag- Starting tag with default value [[HIGHLIGHT]] (string) 
+    def engine_for(self, number_of_sentences):
 
-        end_tag- Ending tag with default value [[ENDHIGHLIGHT]] (string)
+        """
+        The method returns the ranking engine used for a document with the given number of sentences:
+        'pairwise', 'sparse', 'inverted' or 'minhash' (string)
+        """
+        if self.ranking_engine == 'minhash' or (self.approximate_threshold is not None
+                                                and number_of_sentences > self.approximate_threshold and load_scipy()):
+            return 'minhash'
+        if self.ranking_engine == 'auto':
+            return 'sparse' if number_of_sentences >= self.sparse_threshold and load_scipy() else 'inverted'
+        return self.ranking_engine
 
-        Returns:
 
-        The final summary with Highlight tags added to query terms (string)
+    def rank_documents(self, documents_sentences):
 
         """
-        # split query into words after removing stop words
-        query_words_list= self.remove_stop_words(query.split())
+        The method ranks the sentences of many documents. With the sparse engine all documents share one sparse
+        matrix product: every document gets its own token columns, so the product is block diagonal and no pair
+        of sentences from different documents is scored. The ranks are the same as rank_sentences gives for every
+        document alone, but small documents don't pay the fixed cost of a matrix product each.
 
-        # add tags to induvidual words
-        for word in query_words_list:
-            summary=summary.replace(word, start_tag+word+ end_tag )
+        Args:
 
-        # this is to remove consecutive tags if added above. Ex: [[HIGHLIGHT]] deep [[ENDHIGHLIGHT]][[HIGHLIGHT]] dish [[ENDHIGHLIGHT]]'
-        summary=summary.replace(end_tag+" "+start_tag, ' ')
+        documents_sentences - The list of sentences of every document (list)
 
-        return summary
+        Returns:
 
+        A ranks dictionary for every document, see rank_sentences (list)
 
-    
-    def summary_generator(self, doc,query, sentences_ranks_dictionary):
         """
-        The method generates the required review summary. 
-        The lenght of it is controlled by the argument(number_of_sentences) in get_high_rank_sentences method
+        return [self.build_ranks_dictionary(sentences, scores)
+                for sentences, scores in zip(documents_sentences, self.documents_scores(documents_sentences))]
 
 
-        Args:
+    def documents_scores(self, documents_sentences):
 
-        doc­ - Document/review to be shortnened(string)
+        """
+        The method calculates the ranks of rank_documents as lists of scores
 
-        query­- The search query(string)
+        Args:
 
-        sentences_ranks_dictionary- Contains ranks of formatted and trimmed sentences (dictionary)
+        documents_sentences - The list of sentences of every document (list)
 
         Returns:
 
-        The most relevant summary (string)
+        The list of scores of every document, see sentence_scores (list)
 
         """
+        self.tokenizer.clear()
+        self.ranking_error = None
+        return self.ranker.documents_scores(self, documents_sentences)
 
 
-        summary=[]
-        best_sentences_containing_query_words=[]
+    def degree_documents_scores(self, documents_sentences):
 
+        """
+        The degree ranks of many documents (see DegreeRanker). With the sparse engine they share one matrix product,
+        the 'auto' engine uses it when all documents together have at least sparse_threshold sentences.
+        """
+        if self.ranking_engine == 'auto':
+            shared = sum(len(sentences) for sentences in documents_sentences) >= self.sparse_threshold and load_scipy()
+        else:
+            shared = self.ranking_engine == 'sparse'
+        if not shared or any(self.engine_for(len(sentences)) == 'minhash' for sentences in documents_sentences):
+            return [self.sentence_scores(sentences) for sentences in documents_sentences]
+        collapsed = [self.collapse_duplicates(sentences) for sentences in documents_sentences]
+        documents_scores = self.sparse_scores([unique for unique, _, _ in collapsed],
+                                              [multiplicity for _, _, multiplicity in collapsed])
+        return [scores if group_of is None else [scores[group] for group in group_of]
+                for scores, (_, group_of, _) in zip(documents_scores, collapsed)]
 
 
-        # Split the document content into paragraphs using below helper method
-        paragraphs = self.paragragh_generator(doc)
+    def rank_sentences_pairwise(self, sentences):
 
+        """
+        The method calculates the rank for every sentence in the dcoument and stores it in the form of a graph/ 2D matrix.
+        This is the original per pair implementation, kept as the reference for the faster engines.
 
-        # split the query into words after removing stop words
-        query_words_list= self.remove_stop_words(query.split())
-        query_string_length= len(query)
+        Args:
 
+        sentences - A list of all sentences
 
-      
-        # Add first N high rank sentences from each paragraph
-        # Here N is controlled by arugument to get_high_rank_sentences method
-        # Here N=1, the highest rank sentence in each paragraph
-        for p in paragraphs:
-            sentences_list = self.select_best_sentences(p, sentences_ranks_dictionary, 1)
+        Returns:
 
-            for sentence in sentences_list:
-                if sentence:
-                    # get best sentence containing whole query or induvidual query word
-                    if sentence.find(query)!=-1 or  len(set(query_words_list) & set(sentence.strip().split())) > 0 :
-                        print "--With words--"
-                        best_sentences_containing_query_words.append(sentence)
-                    else:
-                        # If query words not found add it to another list summary
-                        summary.append(sentence) 
-                
+        A dictionary containing Key =Sentence and Value= Rank(Sentence)  (Dictionary)
 
-        
-        # Add best sentence with query terms first and append summary list
-        # Set is used to include only unique sentences
-        final_summary= list(set(best_sentences_containing_query_words+summary))
-        final_summary= ("").join(final_summary)
+        """
+        return self.build_ranks_dictionary(sentences, self.pairwise_scores(sentences))
+
+
+    def pairwise_scores(self, sentences):
+
+        """
+        The scores of rank_sentences_pairwise, in the same order as sentences (list)
+        """
+
+        # Calculate the intersection of every two sentences
+        n = len(sentences)
+        self.similarity_pairs = n * n
+        rank_graph = [[0 for x in range(n)] for x in range(n)]
+
+        # Below code can be compactly written in one line. For readability written like C or C++ 
+        for i in range(0, n):
+            self.check_deadline()
+            for j in range(0, n):
+                rank_graph[i][j] = self.get_sentences_similarity_score(sentences[i], sentences[j])
+
+        # Score of a sentence =  Sum of all intersection counts
+        scores = []
+        for i in range(0, n):
+            score = 0
+            for j in range(0, n):
+                if i == j:
+                    continue
+                score += rank_graph[i][j]
+            scores.append(score)
+        return scores
+
+
+    def rank_sentences_sparse(self, sentences):
+
+        """
+        The method calculates the same ranks as rank_sentences_pairwise, but tokenizes every sentence only once.
+
+            1. Build a sparse sentence x term incidence matrix X (CSR)
+            2. X * X.T gives the number of common tokens for every pair of sentences in one product
+            3. Normalize the non zero overlaps with (|s1| + |s2|) / 2 and sum them per row, skipping the diagonal
+
+        Pairs without common tokens are never stored, so the cost follows the real overlap of the sentences.
+
+        Args:
+
+        sentences - A list of all sentences
+
+        Returns:
+
+        A dictionary containing Key =Sentence and Value= Rank(Sentence)  (Dictionary)
+
+        """
+        if not sentences:
+            self.similarity_pairs = 0
+            return {}
+        return self.build_ranks_dictionary(sentences, self.sparse_scores([sentences])[0])
+
+
+    def sparse_scores(self, documents_sentences, multiplicities=None):
+
+        """
+        The method computes the rank of every sentence of one or more documents with one sparse matrix product.
+        Tokens of different documents get different columns, so sentences of different documents never overlap.
+        Tokens found in more than frequent_term_cap sentences are not part of the product, see incidence_degree_scores.
+
+        Args:
+
+        documents_sentences - The list of sentences of every document (list)
+
+        multiplicities - Number of copies of every sentence of every document, None for one copy (list, optional)
+
+        Returns:
+
+        The list of scores of every document (list)
+
+        """
+        incidence = self.incidence_matrix(documents_sentences)
+        if multiplicities is None or all(multiplicity is None for multiplicity in multiplicities):
+            scores = self.incidence_degree_scores(incidence).tolist()
+        else:
+            copies = np.array(sum([multiplicity or [1] * len(sentences) for sentences, multiplicity
+                                   in zip(documents_sentences, multiplicities)], []), dtype=np.float64)
+            # Every other copy of a sentence is similar to it with score 1 (0 without tokens)
+            tokenized = (np.diff(incidence.indptr) > 0).astype(np.float64)
+            scores = (self.incidence_degree_scores(incidence, copies=copies) + (copies - 1) * tokenized).tolist()
+
+        documents_scores = []
+        start = 0
+        for sentences in documents_sentences:
+            documents_scores.append(scores[start:start + len(sentences)])
+            start += len(sentences)
+        return documents_scores
+
+
+    def incidence_matrix(self, documents_sentences):
+
+        """
+        The method builds the sentence x term incidence matrix of one or more documents: row i has a 1 in the column
+        of every token of sentence i. Tokens of different documents get different columns.
+
+        Args:
+
+        documents_sentences - The list of sentences of every document (list)
+
+        Returns:
+
+        Incidence matrix with a row per sentence, in document order (scipy.sparse.csr_matrix)
+
+        """
+        # Map every (document, token) to a column and build the CSR arrays row by row
+        vocabulary = {}
+        indices = []
+        indptr = [0]
+        for document, sentences in enumerate(documents_sentences):
+            for sentence in sentences:
+                for token in self.sentence_tokens(sentence):
+                    indices.append(vocabulary.setdefault((document, token), len(vocabulary)))
+                indptr.append(len(indices))
+
+        return sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, len(vocabulary)))
+
+
+    def similarity_pairs_scores(self, documents_sentences):
+
+        """
+        The method scores every pair of sentences which share a token with one sparse matrix product
+
+        Args:
+
+        documents_sentences - The list of sentences of every document (list)
+
+        Returns:
+
+        (rows, cols, scores, n) - the similarity score of sentence rows[k] with sentence cols[k] is scores[k], rows
+        sorted and columns sorted within a row, and the number of sentences (tuple)
+
+        """
+        return self.incidence_pairs_scores(self.incidence_matrix(documents_sentences))
+
+
+    def incidence_pairs_scores(self, incidence, weights=None, lengths=None):
+
+        """
+        The method scores every pair of rows of an incidence matrix which share a column. Without weights a pair
+        scores |common| / ((|s1| + |s2|) / 2) like get_sentences_similarity_score. With weights every column counts
+        its weight instead of 1, in the common columns and in the lengths.
+
+        Args:
+
+        incidence - Sentence x term incidence matrix (scipy.sparse.csr_matrix)
+
+        weights - Weight of every column (numpy array, optional)
+
+        lengths - Length of every row, by default the (weighted) number of its columns (numpy array, optional)
+
+        Returns:
+
+        (rows, cols, scores, n), see similarity_pairs_scores (tuple)
+
+        """
+        n = incidence.shape[0]
+        if weights is None:
+            if lengths is None:
+                lengths = np.diff(incidence.indptr).astype(np.float64)
+            transposed = incidence.T.tocsr()
+        else:
+            if lengths is None:
+                lengths = incidence.dot(weights)
+            transposed = incidence.dot(sparse.diags(weights)).T.tocsr()
+
+        def score_block(bounds):
+            start, end = bounds
+            # Sorted columns keep the summation order of the pairwise engine, so the ranks are identical
+            overlaps = incidence[start:end].dot(transposed).tocsr()
+            overlaps.sort_indices()
+            overlaps = overlaps.tocoo()
+            rows = overlaps.row + start
+            off_diagonal = rows != overlaps.col
+            rows = rows[off_diagonal]
+            cols = overlaps.col[off_diagonal]
+            return overlaps.nnz, rows, cols, 2.0 * overlaps.data[off_diagonal] / (lengths[rows] + lengths[cols])
+
+        blocks = self.row_blocks(n)
+        if len(blocks) == 1 and self.deadline is not None:
+            # Smaller blocks, so the deadline is checked while the document is scored
+            results = []
+            for start in range(0, max(n, 1), self.DEADLINE_BLOCK_ROWS):
+                self.check_deadline()
+                results.append(score_block((start, min(n, start + self.DEADLINE_BLOCK_ROWS))))
+        elif len(blocks) == 1:
+            results = [score_block(blocks[0])]
+        else:
+            # Blocks are computed in parallel and concatenated in row order, so the result does not depend on timing
+            results = self.thread_pool().map(score_block, blocks)
+
+        self.similarity_pairs = sum(result[0] for result in results)
+        return (np.concatenate([result[1] for result in results]), np.concatenate([result[2] for result in results]),
+                np.concatenate([result[3] for result in results]), n)
+
+
+    def incidence_degree_scores(self, incidence, weights=None, copies=None):
+
+        """
+        The method sums the scores of incidence_pairs_scores of every row. Columns found in more than frequent_term_cap
+        rows would list n^2 pairs, so they are left out of the matrix product and their part of the scores is added
+        per length instead, like the 'inverted' engine does (see frequent_term_scores). The ranks are the same up to
+        floating point rounding.
+
+        Args:
+
+        incidence - Sentence x term incidence matrix (scipy.sparse.csr_matrix)
+
+        weights - Weight of every column (numpy array, optional)
+
+        copies - Number of copies of every row, every pair is counted once per copy of the other row. The other
+                 copies of a row itself are not counted (numpy array, optional)
+
+        Returns:
+
+        The score of every row (numpy array)
+
+        """
+        n = incidence.shape[0]
+        lengths = np.diff(incidence.indptr).astype(np.float64) if weights is None else incidence.dot(weights)
+        cap = self.frequent_term_cap
+        frequent = np.array([], dtype=np.int64)
+        if cap is not None:
+            frequent = np.flatnonzero(np.bincount(incidence.indices, minlength=incidence.shape[1]) > cap)
+
+        listed = incidence
+        if len(frequent):
+            kept = np.ones(incidence.shape[1], dtype=bool)
+            kept[frequent] = False
+            listed = incidence[:, np.flatnonzero(kept)]
+            if weights is not None:
+                weights, frequent_weights = weights[kept], weights[frequent]
+        rows, cols, pair_scores, _ = self.incidence_pairs_scores(listed, weights, lengths)
+        pairs = self.similarity_pairs
+        scores = np.bincount(rows, weights=pair_scores if copies is None else pair_scores * copies[cols],
+                             minlength=n).astype(np.float64, copy=False)
+
+        if len(frequent):
+            columns = incidence[:, frequent].tocsc()
+            for k in range(len(frequent)):
+                self.check_deadline()
+                ids = columns.indices[columns.indptr[k]:columns.indptr[k + 1]]
+                row_lengths = lengths[ids]
+                row_copies = copies[ids] if copies is not None else np.ones(len(ids))
+                # Sum of the copies of the rows of every length, which score alike with a given row
+                unique_lengths, inverse = np.unique(row_lengths, return_inverse=True)
+                length_counts = np.bincount(inverse, weights=row_copies)
+                column_scores = np.empty(len(ids))
+                block = max(1, (1 << 20) // len(unique_lengths))
+                for start in range(0, len(ids), block):
+                    column_scores[start:start + block] = (
+                        length_counts / ((row_lengths[start:start + block, None] + unique_lengths) / 2)).sum(axis=1)
+                # Minus the row itself, and its other copies which the caller counts
+                scores[ids] += (frequent_weights[k] if weights is not None else 1) * (column_scores - row_copies / row_lengths)
+                pairs += len(ids) * len(unique_lengths)
+        self.similarity_pairs = pairs
+        return scores
+
+
+    def check_deadline(self):
+
+        """
+        The method raises DeadlineExceeded when the deadline of the document being prepared has passed
+        """
+        if self.deadline is not None and timer() > self.deadline:
+            raise DeadlineExceeded("Time budget spent while ranking sentences")
+
+
+    def row_blocks(self, n):
+
+        """
+        The (start, end) rows of the blocks of a similarity matrix of n sentences, one block per thread (list)
+        """
+        if self.threads <= 1 or n < self.parallel_threshold:
+            return [(0, n)]
+        size = -(-n // self.threads)
+        return [(start, min(n, start + size)) for start in range(0, n, size)]
+
+
+    def thread_pool(self):
+
+        """
+        The pool of threads used by similarity_pairs_scores, created on first use (multiprocessing.pool.ThreadPool)
+        """
+        if self._thread_pool is None:
+            import multiprocessing.pool
+            self._thread_pool = multiprocessing.pool.ThreadPool(self.threads)
+        return self._thread_pool
+
+
+    def similarity_matrix(self, documents_sentences):
+
+        """
+        The weighted graph of sentences: entry (i, j) is the similarity score of sentences i and j, zero on the
+        diagonal and between sentences of different documents (scipy.sparse.csr_matrix)
+        """
+        rows, cols, scores, n = self.similarity_pairs_scores(documents_sentences)
+        return sparse.csr_matrix((scores, (rows, cols)), shape=(n, n))
+
+
+    def rank_sentences_inverted(self, sentences):
+
+        """
+        The method calculates the same ranks as rank_sentences_pairwise without scoring pairs which have no common token.
+
+            1. Build a posting list term -> ids of the sentences containing it (after removing stop words)
+            2. Every pair in a posting list shares that term: count the common terms of every such pair
+            3. Score only the counted pairs, in the same order as the pairwise engine, so the ranks are identical
+
+        The cost follows the number of pairs which really overlap instead of n^2. A term found in more than
+        frequent_term_cap sentences would bring back the n^2 pairs, so its pairs are not listed. Its part of the
+        score, the sum of 1 / ((|s1| + |s2|) / 2) over the other sentences containing it, only depends on their
+        lengths and is added per length instead. Ranks are then equal up to floating point rounding.
+
+        Args:
+
+        sentences - A list of all sentences
+
+        Returns:
+
+        A dictionary containing Key =Sentence and Value= Rank(Sentence)  (Dictionary)
+
+        """
+        return self.build_ranks_dictionary(sentences, self.inverted_scores(sentences))
+
+
+    def inverted_scores(self, sentences, multiplicity=None):
+
+        """
+        The scores of rank_sentences_inverted, in the same order as sentences (list). With multiplicity, the number of
+        copies of every sentence, a sentence is also scored against the other copies of every sentence.
+        """
+        n = len(sentences)
+        token_sets = [self.sentence_tokens(s) for s in sentences]
+        lengths = [len(tokens) for tokens in token_sets]
+        copies = multiplicity if multiplicity is not None else [1] * n
+        # Common tokens of every sentence with its own copies, the tokens of the listed posting lists
+        own = [0] * n
+
+        postings = collections.defaultdict(list)
+        for i, tokens in enumerate(token_sets):
+            for token in tokens:
+                postings[token].append(i)
+
+        common = [{} for _ in range(n)]
+        frequent_scores = [0.0] * n
+        pairs = 0
+        cap = self.frequent_term_cap
+        for ids in postings.values():
+            self.check_deadline()
+            if cap is not None and len(ids) > cap:
+                pairs += self.frequent_term_scores(ids, lengths, frequent_scores, copies)
+                continue
+            for x, i in enumerate(ids):
+                own[i] += 1
+                row = common[i]
+                for j in ids[x + 1:]:
+                    row[j] = row.get(j, 0) + 1
+                    common[j][i] = common[j].get(i, 0) + 1
+
+        scores = []
+        for i in range(n):
+            if i % 256 == 0:
+                self.check_deadline()
+            score = 0
+            if multiplicity is None:
+                for j in sorted(common[i]):
+                    score += common[i][j] / ((lengths[i] + lengths[j]) / 2)
+            else:
+                for j in sorted(common[i]):
+                    score += copies[j] * common[i][j] / ((lengths[i] + lengths[j]) / 2)
+                if copies[i] > 1 and own[i]:
+                    score += (copies[i] - 1) * own[i] / lengths[i]
+            pairs += len(common[i])
+            scores.append(score + frequent_scores[i] if frequent_scores[i] else score)
+        self.similarity_pairs = pairs
+        return scores
+
+
+    def frequent_term_scores(self, ids, lengths, scores, copies=None, weight=1):
+
+        """
+        The method adds to scores the part of the score of every sentence of the posting list ids which comes from a
+        term found in more than frequent_term_cap sentences: weight / ((|s1| + |s2|) / 2) summed over the other
+        sentences containing it, grouped by their length instead of listing the pairs (see rank_sentences_inverted).
+        copies is the number of copies of every sentence. Returns the number of (sentence, length) terms summed (integer)
+        """
+        length_counts = collections.Counter()
+        for j in ids:
+            length_counts[lengths[j]] += copies[j] if copies is not None else 1
+        for i in ids:
+            # Every sentence of the posting list except i itself
+            scores[i] += weight * (sum(count / ((lengths[i] + length) / 2) for length, count in length_counts.items())
+                                   - 1 / lengths[i])
+        return len(ids) * len(length_counts)
+
+
+    def rank_sentences_minhash(self, sentences):
+
+        """
+        The method approximates the ranks of rank_sentences_pairwise for very long documents (needs NumPy and SciPy).
+        MinHash LSH finds the pairs of sentences which probably share many tokens and only those pairs are scored
+        (exactly). The weak overlaps with all other sentences are estimated from a random sample of sample_size
+        sentences, so the cost is O(n * (sample_size + max_candidates)) instead of O(n^2). Without a sample, every
+        pair which is not a candidate may be missing and the bound counts them all.
+
+        The error of every rank is bounded from its sample with the empirical Bernstein inequality: with probability
+        confidence the rank is within its bound of the exact rank. The exact ranks of error_sample sentences are
+        computed too, to measure the error. Both are kept in ranking_error: error_bound (largest bound of a rank),
+        relative_error_bound (the same relative to the largest rank), confidence, sampled_sentences,
+        max_absolute_error, mean_relative_error, candidate_pairs and detection_threshold.
+
+        Args:
+
+        sentences - A list of all sentences
+
+        Returns:
+
+        A dictionary containing Key =Sentence and Value= Rank(Sentence)  (Dictionary)
+
+        """
+        return self.build_ranks_dictionary(sentences, self.minhash_scores(sentences))
+
+
+    def minhash_scores(self, sentences):
+
+        """
+        The scores of rank_sentences_minhash, in the same order as sentences (list)
+        """
+        n = len(sentences)
+        minhash = self.minhash
+        token_sets = [self.sentence_tokens(s) for s in sentences]
+        incidence = self.incidence_matrix([sentences])
+        lengths = np.diff(incidence.indptr).astype(np.float64)
+        tokenized = lengths > 0
+
+        def similarities(rows, cols):
+            # get_sentences_similarity_score of the pairs (rows[k], cols[k]), in blocks which check the deadline
+            scores = np.zeros(len(rows))
+            for start in range(0, len(rows), 1 << 16):
+                self.check_deadline()
+                i, j = rows[start:start + (1 << 16)], cols[start:start + (1 << 16)]
+                common = np.asarray(incidence[i].multiply(incidence[j]).sum(axis=1), dtype=np.float64).ravel()
+                total = lengths[i] + lengths[j]
+                scores[start:start + len(i)] = 2.0 * common / np.where(total > 0, total, 1.0)
+            return scores
+
+        rows, cols = minhash.candidate_pairs(token_sets, self.check_deadline if self.deadline is not None else None)
+        self.similarity_pairs = len(rows)
+        pair_scores = similarities(rows, cols)
+        scores = np.bincount(rows, weights=pair_scores, minlength=n) + np.bincount(cols, weights=pair_scores, minlength=n)
+
+        # Weak overlaps are rarely found by LSH but add up over many pairs. Estimate them from a random sample of the
+        # sentences, shared by all sentences so one sparse product scores them: the sampled pairs which are not
+        # candidates stand for all of them
+        bounds = np.zeros(n)
+        sample_size = minhash.sample_size
+        generator = np.random.RandomState(minhash.seed)
+        if sample_size and n > 1:
+            sample = generator.randint(0, n, sample_size)
+            candidates = rows * n + cols
+            sums = np.zeros(n)
+            squares = np.zeros(n)
+            sampled = incidence[sample].T.tocsr()
+            for start in range(0, n, self.DEADLINE_BLOCK_ROWS):
+                self.check_deadline()
+                overlaps = incidence[start:start + self.DEADLINE_BLOCK_ROWS].dot(sampled).tocoo()
+                i, j = overlaps.row + start, sample[overlaps.col]
+                values = 2.0 * overlaps.data / (lengths[i] + lengths[j])
+                # Candidates are sorted, so a pair is one when searchsorted finds it
+                keys = np.minimum(i, j) * n + np.maximum(i, j)
+                found = np.minimum(np.searchsorted(candidates, keys), max(len(candidates) - 1, 0))
+                values[(i == j) | (candidates[found] == keys if len(candidates) else False)] = 0.0
+                sums += np.bincount(i, weights=values, minlength=n)
+                squares += np.bincount(i, weights=values * values, minlength=n)
+            # A sentence sampled itself counts 0, so n times the mean estimates the sum over the other sentences
+            means = sums / sample_size
+            scores += n * means
+
+            # Empirical Bernstein bound of the mean of sample_size values in [0, 1]
+            if sample_size > 1:
+                log_term = math.log(4 / (1 - minhash.confidence))
+                variances = np.maximum(squares - sample_size * means * means, 0.0) / (sample_size - 1)
+                bounds = n * (np.sqrt(2 * variances * log_term / sample_size) + 7 * log_term / (3 * (sample_size - 1)))
+                bounds[~tokenized] = 0.0
+        elif n > 1:
+            # Without a sample every pair which is not a candidate may be missing, with a score of at most 1
+            bounds = np.where(tokenized, n - 1 - np.bincount(rows, minlength=n) - np.bincount(cols, minlength=n), 0.0)
+
+        # Compare with the exact ranks of a sample of sentences
+        checked = generator.choice(n, min(n, minhash.error_sample), replace=False) if n else np.array([], dtype=np.int64)
+        overlaps = incidence[checked].dot(incidence.T).tocoo()
+        off_diagonal = checked[overlaps.row] != overlaps.col
+        exact = np.bincount(overlaps.row[off_diagonal], minlength=len(checked), weights=2.0 * overlaps.data[off_diagonal]
+                            / (lengths[checked[overlaps.row[off_diagonal]]] + lengths[overlaps.col[off_diagonal]]))
+        errors = np.abs(exact - scores[checked])
+        self.ranking_error = {
+            'error_bound': float(bounds.max()) if n else 0.0,
+            'relative_error_bound': float(bounds.max() / scores.max()) if n and scores.max() > 0 else 0.0,
+            'confidence': minhash.confidence,
+            'sampled_sentences': len(checked),
+            'max_absolute_error': float(errors.max()) if len(checked) else 0.0,
+            'mean_relative_error': float(np.mean(errors[exact > 0] / exact[exact > 0])) if (exact > 0).any() else 0.0,
+            'candidate_pairs': len(rows),
+            'detection_threshold': minhash.threshold(),
+        }
+        return scores.tolist()
+
+
+    def build_ranks_dictionary(self, sentences, scores):
+
+        """
+        The method builds the sentences ranks dictionary from a list of scores
+
+        Args:
+
+        sentences - A list of all sentences
+
+        scores - Rank of every sentence, in the same order as sentences (list)
+
+        Returns:
 
-        return final_summary
+        A dictionary containing Key =Sentence and Value= Rank(Sentence)  (Dictionary)
 
+        """
 
+        # Build the dictionary of sentences
+        sentences_ranks_dictionary = {}
+        for sentence, score in zip(sentences, scores):
+            sentences_ranks_dictionary[self.format_sentence(sentence)] = score
+        return sentences_ranks_dictionary
 
     
-    def highlight_doc(self, doc,query):
+    def select_best_sentences(self, paragraph, sentences_ranks_dictionary, number_of_sentences=1):
+
+        """
+        The method generates first N(number_of_sentences) high rank sentences for a given paragraph using  sentences_ranks_dictionary.
+
+        Args:
+
+        paragraph - A Paragraph in the gievn document(string)
+
+        sentences_ranks_dictionary - It contains every sentence and its rank of the entire document (Dictionary). Key= sentence, Value= Rank
+
+        number_of_sentences- It specifies the number of high rank sentences(sorted in decreasing order of rank) required in a given parageaph.
+                             It also controls the final summary length. (Integer) 
+
+
+        Returns:
+
+        A list of first N(number_of_sentences) rank sentences in a given paragraph (list)
+
+        """
+
+        # Split the paragraph into sentences
+        sentences = self.generate_sentences(paragraph)
+
+        # Skip Short paragrahs as this might not give enough information
+        if len(sentences) < 2:
+            return []
+
+        # Rank of every distinct sentence of the paragraph, formatted once, in paragraph order
+        sentences_rank_for_given_paragrah=collections.OrderedDict()
+        for s in sentences:
+            strip_s = self.format_sentence(s)
+            if strip_s in sentences_ranks_dictionary and s not in sentences_rank_for_given_paragrah:
+                sentences_rank_for_given_paragrah[s] = sentences_ranks_dictionary[strip_s]
+
+        # Get first high N (number_of_sentences) rank sentences without sorting the whole paragraph
+        # Equal ranks keep paragraph order
+        high_rank_sentences= heapq.nlargest(number_of_sentences, sentences_rank_for_given_paragrah, key=sentences_rank_for_given_paragrah.get)
+
+        return high_rank_sentences
 
 
+    def add_highligt_tags_to_summary(self, summary,query, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
+
         """
+        The method takes start and end tags with default values and adds tags to review summary. 
+        The user can pass any highlight tags like <b> </b> etc, so that the code works for any tags.
+        Only whole words are highlighted and query words next to each other get one pair of tags.
 
         Args:
 
-        doc­ - Document to behighlighted(string)
+        summary - Review summary generated after appylying ranking algortihm(string)
 
         query­- The search query(string)
 
+        start_tag- Starting tag with default value [[HIGHLIGHT]] (string) 
+
+        end_tag- Ending tag with default value [[ENDHIGHLIGHT]] (string)
+
         Returns:
 
-        The most relevant summary with the query terms highlighted(string)
+        The final summary with Highlight tags added to query terms (string)
 
         """
+        return self.highlighter(query, start_tag, end_tag).highlight(summary)
 
-        # Split the content into sentences
-        sentences = self.generate_sentences(doc)
 
+    def highlighter(self, query, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
 
-        # Build the sentences dictionary which contains ranks of all sentences
-        sentences_ranks_dictionary = self.rank_sentences(sentences)
+        """
+        The method returns the compiled Highlighter of a query. Highlighters of recent queries are reused.
 
-        # Genereate summary for the document and query using sentences_ranks_dictionary
-        review_summary= self.summary_generator(doc,query,sentences_ranks_dictionary)
+        Args:
 
-        
-        # Highlight the generated summary with highlight tags
-        # Here instead of [[HIGHLIGHT]] tag we can send <b> , <i> tags etc
-        highlighted_review_summary= self.add_highligt_tags_to_summary(review_summary,query,'[[HIGHLIGHT]]','[[ENDHIGHLIGHT]]')
+        query­- The search query(string)
 
+        start_tag- Starting tag (string)
 
-        return highlighted_review_summary
+        end_tag- Ending tag (string)
 
-        
-        
+        Returns:
 
+        Highlighter for the query words which are not stop words (Highlighter)
+
+        """
+        key = (query, start_tag, end_tag)
+        highlighter = self._highlighters.get(key)
+        if highlighter is None:
+            if len(self._highlighters) >= 256:
+                self._highlighters.clear()
+            # split query into words after removing stop words
+            highlighter = Highlighter(self.tokenizer.query_words(query), start_tag, end_tag)
+            self._highlighters[key] = highlighter
+        return highlighter
 
-# Main method
-def main():
 
+    def summary_generator(self, doc,query, sentences_ranks_dictionary):
+        """
+        The method generates the required review summary. 
+        The lenght of it is controlled by the argument(number_of_sentences) in get_high_rank_sentences method
 
-    query ="deep dish pizza"
 
-    # Create a DocumentSummarizer object
-    doc_sum = DocumentSummarizer()
+        Args:
 
-    document= doc_sum.read_document('document.txt')
+        doc­ - Document/review to be shortnened(string)
 
-    
-    # Function signature as mentioned in the question
-    highlighted_review_summary= doc_sum.highlight_doc(document,query)
+        query­- The search query(string)
+
+        sentences_ranks_dictionary- Contains ranks of formatted and trimmed sentences (dictionary)
+
+        Returns:
+
+        The most relevant summary (string)
+
+        """
 
-    print highlighted_review_summary
+
+        best_sentences = self.best_paragraph_sentences(doc, sentences_ranks_dictionary)
+        ranks = [sentences_ranks_dictionary[self.format_sentence(sentence)] for sentence in best_sentences]
+        return self.join_summary(best_sentences, query, ranks)
+
+
+    def best_paragraph_sentences(self, doc, sentences_ranks_dictionary):
+        """
+        The method selects the highest rank sentence of every paragraph. It does not depend on the query,
+        so it can be done once per document (see PreparedDocument).
+
+        Args:
+
+        doc­ - Document/review to be shortnened(string)
+
+        sentences_ranks_dictionary- Contains ranks of formatted and trimmed sentences (dictionary)
+
+        Returns:
+
+        The best sentences in paragraph order (list)
+
+        """
+
+        best_sentences=[]
+
+        # Split the document content into paragraphs using below helper method
+        paragraphs = self.paragragh_generator(doc)
+
+        # Add first N high rank sentences from each paragraph
+        # Here N is controlled by arugument to get_high_rank_sentences method
+        # Here N=1, the highest rank sentence in each paragraph
+        for p in paragraphs:
+            sentences_list = self.select_best_sentences(p, sentences_ranks_dictionary, 1)
+            best_sentences.extend(sentence for sentence in sentences_list if sentence)
+
+        return best_sentences
+
+
+    def join_summary(self, best_sentences, query, ranks=None, sentence_tokens=None):
+        """
+        The method puts the best sentences which contain the query or a query word first and joins them into the summary.
+        Both groups keep document order and a repeated sentence is only added once (the first copy), so the summary is deterministic.
+        With a summary_sentences or summary_characters budget the sentences containing query words are kept first,
+        then the highest rank ones, and the summary is cut to the budget (see summary_budget).
+
+        Args:
+
+        best_sentences - Best sentences of the paragraphs (list)
+
+        query­- The search query(string)
+
+        ranks - Rank of every best sentence, used by the budget (list, optional)
+
+        sentence_tokens - Token set of every best sentence, looked up by the tokenizer when not given (list, optional)
+
+        Returns:
+
+        The most relevant summary (string)
+
+        """
+
+        return ("").join(best_sentences[index] for index in self.summary_order(best_sentences, query, ranks, sentence_tokens))
+
+
+    def summary_order(self, best_sentences, query, ranks=None, sentence_tokens=None):
+        """
+        The method selects and orders the summary sentences of join_summary without joining them
+
+        Returns:
+
+        Indices of the summary sentences in best_sentences, in summary order (list)
+
+        """
+
+        # The query is split into tokens once, after removing stop words
+        query_tokens= self.sentence_tokens(query)
+
+        seen= set()
+        best_sentences_containing_query_words=[]
+        summary=[]
+        for index, sentence in enumerate(best_sentences):
+            tokens= sentence_tokens[index] if sentence_tokens is not None else self.sentence_tokens(sentence)
+
+            # Include only unique sentences, sentences with the same tokens are duplicates unless duplicates is None
+            key= tokens if self.duplicates is not None and tokens else sentence
+            if key in seen:
+                continue
+            seen.add(key)
+
+            # get best sentence containing whole query or induvidual query word
+            if sentence.find(query)!=-1 or not query_tokens.isdisjoint(tokens):
+                best_sentences_containing_query_words.append(index)
+            else:
+                # If query words not found add it to another list summary
+                summary.append(index)
+
+        # Add best sentence with query terms first and append summary list
+        order= best_sentences_containing_query_words + summary
+        if self.summary_sentences is not None or self.summary_characters is not None:
+            order= self.summary_budget(best_sentences, order, len(best_sentences_containing_query_words), ranks)
+
+        return order
+
+
+    def summary_budget(self, best_sentences, order, matching, ranks=None):
+        """
+        The method cuts a summary to summary_sentences sentences and summary_characters characters. The sentences
+        containing query words are kept first, then the others by decreasing rank (summary order without ranks).
+        A sentence longer than the characters left is skipped and a shorter one can still be kept.
+
+        Args:
+
+        best_sentences - Best sentences of the paragraphs (list)
+
+        order - Indices of the summary sentences in summary order (list)
+
+        matching - The first matching indices of order contain query words (integer)
+
+        ranks - Rank of every best sentence (list, optional)
+
+        Returns:
+
+        Indices of the kept sentences, in summary order (list)
+
+        """
+        position = dict((index, p) for p, index in enumerate(order))
+
+        def priority(index):
+            return (position[index] < matching, ranks[index] if ranks is not None else 0, -position[index])
+
+        limit = len(order) if self.summary_sentences is None else self.summary_sentences
+        candidates = heapq.nlargest(limit, order, key=priority)
+        if self.summary_characters is not None:
+            kept = []
+            characters = 0
+            for index in candidates:
+                if characters + len(best_sentences[index]) <= self.summary_characters:
+                    kept.append(index)
+                    characters += len(best_sentences[index])
+            candidates = kept
+
+        kept = set(candidates)
+        return [index for index in order if index in kept]
+
+
+    def prepare_document(self, doc, doc_id=None, record=None, time_budget=None, max_rank_sentences=None,
+                         max_rank_characters=None):
+        """
+        The method does the query independent work of highlight_doc once: it splits the document into sentences,
+        ranks them and selects the best sentence of every paragraph. When the summarizer has a rank_cache,
+        a document which was already prepared is not ranked again. When it has a rank_store which contains
+        doc_id, the stored ranks are used.
+
+        With a time or size budget (given here or to the constructor) the best tier which fits is used:
+            'exact'  - ranked by the summarizer's ranker
+            'pruned' - more than max_rank_sentences sentences: ranked by the approximate 'minhash' engine
+            'lead'   - the time budget was spent while ranking: the first sentence of every paragraph
+            'first'  - longer than max_rank_characters or the time budget was spent while splitting sentences:
+                       the first sentences which were split
+        The ranking loops check the deadline, so a document does not take much longer than time_budget.
+        The tier is kept in the tier of the result and in summary_tier. Only 'exact' documents are cached.
+
+        Args:
+
+        doc­ - Document to be summarized(string)
+
+        doc_id - Id of the document in the rank_store (optional)
+
+        record - If given, stage timings, cache hits and the tier are added to it (MetricsRecord)
+
+        time_budget - Seconds to spend on the document, defaults to the summarizer's time_budget (float)
+
+        max_rank_sentences - Maximum number of sentences ranked exactly, defaults to the summarizer's (integer)
+
+        max_rank_characters - Maximum number of characters read, defaults to the summarizer's (integer)
+
+        Returns:
+
+        The prepared document, which can highlight any query (PreparedDocument)
+
+        """
+        prepared = self.find_prepared_document(doc, doc_id, record)
+        if prepared is not None:
+            self.summary_tier = prepared.tier
+            return prepared
+
+        time_budget = time_budget if time_budget is not None else self.time_budget
+        max_rank_sentences = max_rank_sentences if max_rank_sentences is not None else self.max_rank_sentences
+        max_rank_characters = max_rank_characters if max_rank_characters is not None else self.max_rank_characters
+
+        start = timer()
+        tokenized = ranked = None
+        # End of the prefix which is split when the document is longer than max_rank_characters
+        end = None
+        self.deadline = start + time_budget if time_budget is not None else None
+        try:
+            if max_rank_characters is not None and len(doc) > max_rank_characters:
+                end = max_rank_characters
+                prepared = self.first_sentences_document(doc, self.sentence_offsets(doc[:end]), end)
+            else:
+                # Split the content into sentences and rank them, sentences are kept as offsets into doc
+                starts, ends, paragraph_ids = self.sentence_offsets(doc)
+                tokenized = timer()
+                sentences = [doc[s:e] for s, e in zip(starts, ends)]
+                tier = 'exact' if max_rank_sentences is None or len(sentences) <= max_rank_sentences else 'pruned'
+                try:
+                    scores = self.sentence_scores(sentences) if tier == 'exact' else self.pruned_scores(sentences)
+                    ranked = timer()
+                    prepared = PreparedDocument(self, CompactDocument(doc, starts, ends, paragraph_ids, scores), tier)
+                except DeadlineExceeded:
+                    prepared = self.lead_sentences_document(doc, starts, ends, paragraph_ids)
+        except DeadlineExceeded as e:
+            prepared = self.first_sentences_document(doc, e.offsets, end)
+        finally:
+            self.deadline = None
+        self.summary_tier = prepared.tier
+
+        if record is not None:
+            selected = timer()
+            if tokenized is not None:
+                record.timings['sentence_tokenizer'] = tokenized - start
+            if ranked is not None:
+                record.timings['rank_sentences'] = ranked - tokenized
+                record.timings['select_best_sentences'] = selected - ranked
+            record.counts['similarity_pairs'] = self.similarity_pairs
+            record.counts['tier_' + prepared.tier] = 1
+
+        if self.rank_cache is not None and prepared.tier == 'exact':
+            self.rank_cache.put(doc, prepared)
+        return prepared
+
+
+    def pruned_scores(self, sentences):
+        """
+        The ranks of the 'pruned' tier: the degree ranks of the 'minhash' engine, whatever the ranker is, or of the
+        capped 'inverted' engine when NumPy and SciPy are not installed (list)
+        """
+        self.tokenizer.clear()
+        self.ranking_error = None
+        return self.minhash_scores(sentences) if load_scipy() else self.inverted_scores(sentences)
+
+
+    def lead_sentences_document(self, doc, starts, ends, paragraph_ids):
+        """
+        The 'lead' tier of prepare_document: the first sentence of every paragraph is its best sentence (PreparedDocument)
+        """
+        document = CompactDocument(doc, starts, ends, paragraph_ids, [0.0] * len(starts))
+        return PreparedDocument(self, document, 'lead', document.lead_sentence_ids())
+
+
+    def first_sentences_document(self, doc, offsets, end=None):
+        """
+        The 'first' tier of prepare_document: the first summary_sentences (FALLBACK_SENTENCES by default) sentences
+        of offsets are the best sentences. With end, offsets come from doc[:end] and the sentence reaching end is
+        skipped unless doc has a sentence or paragraph boundary there, so a cut sentence is never shown (PreparedDocument)
+        """
+        starts, ends, paragraph_ids = offsets
+        if end is not None and end < len(doc):
+            while (len(ends) and ends[-1] >= end and not doc.startswith('\n\n', ends[-1])
+                   and not self.tokenizer.sentence_enders.match(doc, ends[-1])):
+                starts, ends, paragraph_ids = starts[:-1], ends[:-1], paragraph_ids[:-1]
+        document = CompactDocument(doc, starts, ends, paragraph_ids, [0.0] * len(starts))
+        return PreparedDocument(self, document, 'first',
+                                document.first_sentence_ids(self.summary_sentences or self.FALLBACK_SENTENCES))
+
+
+    def find_prepared_document(self, doc, doc_id=None, record=None):
+        """
+        The method looks a document up in the rank_store (by doc_id) and in the rank_cache
+
+        Returns:
+
+        The prepared document, or None when it has to be ranked (PreparedDocument)
+
+        """
+        if self.rank_store is not None and doc_id is not None:
+            prepared = self.rank_store.prepare(self, doc_id, doc)
+            if record is not None:
+                record.counts['rank_store_hits' if prepared is not None else 'rank_store_misses'] = 1
+            if prepared is not None:
+                return prepared
+
+        if self.rank_cache is not None:
+            prepared = self.rank_cache.get(doc)
+            if record is not None:
+                record.counts['rank_cache_hits' if prepared is not None else 'rank_cache_misses'] = 1
+            if prepared is not None:
+                return prepared
+
+        return None
+
+
+    def prepare_documents(self, docs, doc_ids=None):
+        """
+        The method prepares many documents at once. The documents which are not in the rank_store or rank_cache
+        are ranked together with rank_documents. A document which fails does not stop the others.
+
+        Args:
+
+        docs - Documents to be summarized (list)
+
+        doc_ids - Ids of the documents in the rank_store (list, optional)
+
+        Returns:
+
+        A PreparedDocument for every document, or the exception raised for it (list)
+
+        """
+        prepared = [None] * len(docs)
+        pending = []
+        for index, doc in enumerate(docs):
+            try:
+                prepared[index] = self.find_prepared_document(doc, doc_ids[index] if doc_ids else None)
+                if prepared[index] is None:
+                    pending.append((index, self.sentence_offsets(doc)))
+            except Exception as e:
+                prepared[index] = e
+
+        documents_sentences = [[docs[index][s:e] for s, e in zip(starts, ends)] for index, (starts, ends, _) in pending]
+        try:
+            scores = self.documents_scores(documents_sentences)
+        except Exception:
+            # Rank the documents one at a time, so only the documents which fail get the exception
+            scores = []
+            for sentences in documents_sentences:
+                try:
+                    scores.append(self.documents_scores([sentences])[0])
+                except Exception as e:
+                    scores.append(e)
+        for (index, offsets), document_scores in zip(pending, scores):
+            if isinstance(document_scores, Exception):
+                prepared[index] = document_scores
+                continue
+            try:
+                prepared[index] = PreparedDocument(self, CompactDocument(docs[index], *offsets, ranks=document_scores))
+                if self.rank_cache is not None:
+                    self.rank_cache.put(docs[index], prepared[index])
+            except Exception as e:
+                prepared[index] = e
+        return prepared
+
+
+    def highlight_doc(self, doc,query, doc_id=None, time_budget=None, max_rank_sentences=None, max_rank_characters=None):
+
+
+        """
+
+        Args:
+
+        doc­ - Document to behighlighted(string)
+
+        query­- The search query(string)
+
+        doc_id - Id of the document in the summarizer's rank_store, if any. Stored ranks are used instead of ranking
+                 the document again
+
+        time_budget, max_rank_sentences, max_rank_characters - Budget of the document, see prepare_document. The tier
+                 used is kept in summary_tier
+
+        Returns:
+
+        The most relevant summary with the query terms highlighted(string)
+
+        """
+        budget = (time_budget, max_rank_sentences, max_rank_characters)
+
+        if self.metrics is not None:
+            return self.highlight_doc_with_metrics(doc, query, doc_id, *budget)
+
+        # Split the content into sentences and rank them. This part does not depend on the query
+        prepared = self.prepare_document(doc, doc_id, None, *budget)
+
+        # Genereate summary for the query and highlight it with highlight tags
+        # Here instead of [[HIGHLIGHT]] tag we can send <b> , <i> tags etc
+        highlighted_review_summary= prepared.highlight(query,'[[HIGHLIGHT]]','[[ENDHIGHLIGHT]]')
+
+
+        return highlighted_review_summary
+
+
+    def highlight_spans(self, doc, query, doc_id=None, time_budget=None, max_rank_sentences=None, max_rank_characters=None):
+
+        """
+        The method summarizes like highlight_doc without building the summary string: the summary sentences and the
+        highlighted query words are (start, end) offsets into doc. SummarySpans.render writes the tagged summary.
+
+        Args:
+
+        doc­ - Document to behighlighted(string)
+
+        query­- The search query(string)
+
+        doc_id, time_budget, max_rank_sentences, max_rank_characters - See highlight_doc
+
+        Returns:
+
+        The summary as offsets into doc (SummarySpans)
+
+        """
+        return self.prepare_document(doc, doc_id, None, time_budget, max_rank_sentences, max_rank_characters).spans(query)
+
+
+    def highlight_doc_with_metrics(self, doc, query, doc_id=None, time_budget=None, max_rank_sentences=None,
+                                   max_rank_characters=None):
+
+        """
+        The method does the same as highlight_doc and sends a MetricsRecord of the call to the summarizer's metrics sink:
+        timings of every stage, number of sentences, paragraphs and similarity pairs, cache hits and sizes in bytes.
+
+        Args:
+
+        doc­ - Document to behighlighted(string)
+
+        query­- The search query(string)
+
+        doc_id - Id of the document (optional)
+
+        time_budget, max_rank_sentences, max_rank_characters - Budget of the document, see prepare_document
+
+        Returns:
+
+        The most relevant summary with the query terms highlighted(string)
+
+        """
+        record = MetricsRecord(doc_id)
+        start = timer()
+        prepared = self.prepare_document(doc, doc_id, record, time_budget, max_rank_sentences, max_rank_characters)
+        prepared_at = timer()
+        review_summary = prepared.summary(query)
+        summarized = timer()
+        highlighted_review_summary = self.add_highligt_tags_to_summary(review_summary, query, '[[HIGHLIGHT]]', '[[ENDHIGHLIGHT]]')
+        highlighted = timer()
+
+        record.timings['summary_generator'] = summarized - prepared_at
+        record.timings['add_highligt_tags_to_summary'] = highlighted - summarized
+        record.timings['total'] = highlighted - start
+        record.counts['sentences'] = len(prepared.document)
+        record.counts['paragraphs'] = prepared.document.paragraph_count
+        record.sizes['document'] = sys.getsizeof(doc)
+        record.sizes['prepared_document'] = prepared.size_in_bytes
+        record.sizes['summary'] = sys.getsizeof(highlighted_review_summary)
+        self.metrics.emit(record)
+
+        return highlighted_review_summary
+
+        
+        
+
+
+##//////////////////////////////////////////////////////
+## Prepared documents
+##//////////////////////////////////////////////////////
+
+class CompactDocument(object):
+
+    """
+     A ranked document as a struct of arrays. The text is stored once and every sentence is an integer id:
+     starts[i] and ends[i] are its offsets in the text, paragraph_ids[i] its paragraph and ranks[i] its rank.
+     Sentence strings are only sliced out when they are needed, and identical sentences keep their own ranks
+     instead of sharing a dictionary key. The columns are arrays, or memoryviews of a RankStore file.
+    """
+
+    __slots__ = ('text', 'starts', 'ends', 'paragraph_ids', 'ranks')
+
+    def __init__(self, text, starts, ends, paragraph_ids, ranks):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.paragraph_ids = paragraph_ids
+        self.ranks = ranks if isinstance(ranks, (array.array, memoryview)) else array.array('d', ranks)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def paragraph_count(self):
+        return self.paragraph_ids[-1] + 1 if len(self.paragraph_ids) else 0
+
+    def sentence(self, sentence_id):
+
+        """
+         The text of a sentence (string)
+        """
+        return self.text[self.starts[sentence_id]:self.ends[sentence_id]]
+
+    def sentences(self):
+
+        """
+         The text of every sentence in document order (list)
+        """
+        text = self.text
+        return [text[start:end] for start, end in zip(self.starts, self.ends)]
+
+    def paragraph_ranges(self):
+
+        """
+         The first and last + 1 sentence id of every paragraph (list of tuple)
+        """
+        ranges = []
+        first = 0
+        paragraph_ids = self.paragraph_ids
+        for i in range(1, len(paragraph_ids) + 1):
+            if i == len(paragraph_ids) or paragraph_ids[i] != paragraph_ids[first]:
+                ranges.append((first, i))
+                first = i
+        return ranges
+
+    def best_sentence_ids(self, number_of_sentences=1):
+
+        """
+         The ids of the number_of_sentences highest rank sentences of every paragraph with at least two sentences,
+         in paragraph order, like select_best_sentences. Empty sentences are skipped and equal ranks keep
+         document order (list)
+        """
+        ranks = self.ranks
+        starts = self.starts
+        ends = self.ends
+        best = []
+        for first, last in self.paragraph_ranges():
+            # Skip Short paragrahs as this might not give enough information
+            if last - first < 2:
+                continue
+            ids = [i for i in range(first, last) if ends[i] > starts[i]]
+            best.extend(heapq.nlargest(number_of_sentences, ids, key=ranks.__getitem__))
+        return best
+
+    def lead_sentence_ids(self):
+
+        """
+         The id of the first sentence of every paragraph with at least two sentences, skipping empty sentences (list)
+        """
+        lead = []
+        for first, last in self.paragraph_ranges():
+            if last - first < 2:
+                continue
+            for i in range(first, last):
+                if self.ends[i] > self.starts[i]:
+                    lead.append(i)
+                    break
+        return lead
+
+    def first_sentence_ids(self, number_of_sentences):
+
+        """
+         The ids of the first number_of_sentences sentences, skipping empty sentences (list)
+        """
+        return [i for i in range(len(self)) if self.ends[i] > self.starts[i]][:number_of_sentences]
+
+    def ranks_dictionary(self, format_sentence):
+
+        """
+         The ranks keyed by formatted sentence, like rank_sentences gives (dictionary)
+        """
+        return dict((format_sentence(self.sentence(i)), self.ranks[i]) for i in range(len(self)))
+
+    @property
+    def size_in_bytes(self):
+        return (sys.getsizeof(self.text)
+                + sum(values.itemsize * len(values) for values in (self.starts, self.ends, self.paragraph_ids, self.ranks)))
+
+
+class PreparedDocument(object):
+
+    """
+     The query independent part of highlight_doc for one document: the ranked document (CompactDocument) and
+     the best sentence of every paragraph. highlight(query) only has to match the query and add the tags,
+     so the same document can answer many queries cheaply.
+
+     tier is how the document was prepared, see DocumentSummarizer.prepare_document. The other tiers give
+     best_ids, the ids of their best sentences, instead of the highest rank sentence of every paragraph.
+    """
+
+    def __init__(self, summarizer, document, tier='exact', best_ids=None):
+        self.summarizer = summarizer
+        self.document = document
+        self.doc = document.text
+        self.tier = tier
+        if best_ids is None:
+            best_ids = document.best_sentence_ids(1)
+        self.best_ids = best_ids
+        self.best_sentences = [document.sentence(i) for i in best_ids]
+        self.best_ranks = [document.ranks[i] for i in best_ids]
+        # Tokens are kept so every query only has to check them
+        self.best_tokens = [summarizer.tokenizer.tokenize(sentence) for sentence in self.best_sentences]
+
+        # Approximate memory held by this document, used by RankCache
+        self.size_in_bytes = (document.size_in_bytes + sum(sys.getsizeof(s) for s in self.best_sentences)
+                              + sum(sys.getsizeof(tokens) for tokens in self.best_tokens))
+
+    @property
+    def sentences(self):
+        return self.document.sentences()
+
+    @property
+    def paragraphs(self):
+        return self.summarizer.paragragh_generator(self.doc)
+
+    @property
+    def sentences_ranks_dictionary(self):
+        return self.document.ranks_dictionary(self.summarizer.format_sentence)
+
+    def summary(self, query):
+
+        """
+         The summary of the document for the query, without highlight tags (string)
+        """
+        return self.summarizer.join_summary(self.best_sentences, query, self.best_ranks, self.best_tokens)
+
+    def highlight(self, query, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
+
+        """
+         The summary of the document for the query with the query terms highlighted (string)
+        """
+        return self.summarizer.add_highligt_tags_to_summary(self.summary(query), query, start_tag, end_tag)
+
+    def spans(self, query):
+
+        """
+         The summary of the document for the query as offsets into the document (SummarySpans)
+        """
+        order = self.summarizer.summary_order(self.best_sentences, query, self.best_ranks, self.best_tokens)
+        document = self.document
+        sentences = [(document.starts[self.best_ids[index]], document.ends[self.best_ids[index]]) for index in order]
+        highlighter = self.summarizer.highlighter(query)
+        highlights = []
+        for start, end in sentences:
+            highlights.extend(highlighter.spans(self.doc, start, end))
+        return SummarySpans(self.doc, sentences, highlights)
+
+
+class SummarySpans(object):
+
+    """
+     A highlighted summary as (start, end) offsets into its document instead of a new string: sentences are the
+     summary sentences in summary order and highlights the highlighted runs, in the same order. Callers which render
+     the summary themselves (Ex: HTML) use the offsets, render() writes the tagged summary to a file or io buffer
+     piece by piece. It gives the text of highlight_doc.
+    """
+
+    __slots__ = ('text', 'sentences', 'highlights')
+
+    def __init__(self, text, sentences, highlights):
+        self.text = text
+        self.sentences = sentences
+        self.highlights = highlights
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def segments(self):
+
+        """
+         (start, end, highlighted) offsets of the pieces of the summary, in summary order (generator)
+        """
+        highlights = self.highlights
+        h = 0
+        for start, end in self.sentences:
+            position = start
+            while h < len(highlights) and highlights[h][1] <= end and highlights[h][0] >= start:
+                highlight_start, highlight_end = highlights[h]
+                if highlight_start > position:
+                    yield position, highlight_start, False
+                yield highlight_start, highlight_end, True
+                position = highlight_end
+                h += 1
+            if end > position:
+                yield position, end, False
+
+    def render(self, output=None, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
+
+        """
+         Writes the summary with highlight tags to output, any object with a write(string) method (Ex: a file opened
+         in text mode, io.StringIO). Only one piece of the document is sliced at a time.
+
+        Returns:
+
+        None, or the summary (string) when output is None
+        """
+        if output is None:
+            import io
+            output = io.StringIO()
+            self.render(output, start_tag, end_tag)
+            return output.getvalue()
+        text = self.text
+        write = output.write
+        for start, end, highlighted in self.segments():
+            if highlighted:
+                write(start_tag)
+                write(text[start:end])
+                write(end_tag)
+            else:
+                write(text[start:end])
+
+    def to_dict(self):
+
+        """
+         The offsets as lists, Ex: for JSON (dictionary)
+        """
+        return {'sentences': [list(span) for span in self.sentences], 'highlights': [list(span) for span in self.highlights]}
+
+
+class RankCache(object):
+
+    """
+     LRU cache of PreparedDocument keyed by the SHA-1 of the document content. The least recently used
+     documents are evicted when there are more than max_entries documents or they hold more than max_bytes.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_in_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(doc):
+
+        """
+         Cache key of a document (string)
+        """
+        if not isinstance(doc, bytes):
+            doc = doc.encode('utf-8')
+        return hashlib.sha1(doc).hexdigest()
+
+    def get(self, doc):
+
+        """
+         The PreparedDocument of doc, or None when it is not cached
+        """
+        key = self.key(doc)
+        with self._lock:
+            prepared = self._entries.pop(key, None)
+            if prepared is None or prepared.doc != doc:
+                if prepared is not None:
+                    self._entries[key] = prepared
+                self.misses += 1
+                return None
+            # Move it to the most recently used end
+            self._entries[key] = prepared
+            self.hits += 1
+            return prepared
+
+    def put(self, doc, prepared):
+
+        """
+         Add the PreparedDocument of doc and evict the least recently used documents if needed
+        """
+        if prepared.size_in_bytes > self.max_bytes:
+            return
+        key = self.key(doc)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_in_bytes -= old.size_in_bytes
+            self._entries[key] = prepared
+            self.size_in_bytes += prepared.size_in_bytes
+            while len(self._entries) > self.max_entries or self.size_in_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_in_bytes -= evicted.size_in_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_in_bytes = 0
+
+
+##//////////////////////////////////////////////////////
+## Incremental ranking
+##//////////////////////////////////////////////////////
+
+class IncrementalRanker(object):
+
+    """
+     Keeps the ranks of a document which grows or changes paragraph by paragraph, without ranking the whole
+     document again. Every sentence keeps its token set and running score (sum of its similarity scores with
+     all other sentences, as in rank_sentences).
+
+        append_paragraph - scores the k new sentences against the n others, O(k * n)
+        remove_paragraph - subtracts the scores of its sentences from the others, O(k * n)
+        edit_paragraph   - remove and insert at the same position
+
+     The best sentence of a paragraph is only selected again when the score of one of its sentences changed.
+    """
+
+    def __init__(self, summarizer=None):
+        self.summarizer = summarizer if summarizer is not None else DocumentSummarizer()
+        self.paragraphs = []
+        self._next_id = 0
+        self._texts = {}
+        self._tokens = {}
+        self._scores = {}
+        self._paragraph_sentences = {}
+        self._paragraph_texts = {}
+        self._best = {}
+        self._dirty = set()
+
+    @classmethod
+    def from_document(cls, doc, summarizer=None):
+
+        """
+         An IncrementalRanker holding the paragraphs of a document (IncrementalRanker)
+        """
+        ranker = cls(summarizer)
+        for paragraph in ranker.summarizer.paragragh_generator(doc):
+            ranker.append_paragraph(paragraph)
+        return ranker
+
+    def _add(self, paragraph):
+        summarizer = self.summarizer
+        sentence_ids = []
+        for sentence in summarizer.generate_sentences(paragraph):
+            sentence_id = self._next_id
+            self._next_id += 1
+            self._texts[sentence_id] = sentence
+            self._tokens[sentence_id] = summarizer.tokenizer.tokens(sentence)
+            self._scores[sentence_id] = 0
+            sentence_ids.append(sentence_id)
+
+        # Score every new sentence against all the others, every pair of new sentences once
+        new_ids = set(sentence_ids)
+        for new_id in sentence_ids:
+            tokens = self._tokens[new_id]
+            for other_id, other_tokens in self._tokens.items():
+                if other_id in new_ids and other_id >= new_id:
+                    continue
+                score = summarizer.tokens_similarity_score(tokens, other_tokens)
+                if score:
+                    self._scores[new_id] += score
+                    self._scores[other_id] += score
+                    self._dirty.add(other_id)
+        self._dirty.update(sentence_ids)
+        summarizer.tokenizer.clear()
+        return sentence_ids
+
+    def _remove(self, sentence_ids):
+        summarizer = self.summarizer
+        removed = set(sentence_ids)
+        for old_id in sentence_ids:
+            tokens = self._tokens.pop(old_id)
+            del self._texts[old_id]
+            del self._scores[old_id]
+            self._dirty.discard(old_id)
+            for other_id, other_tokens in self._tokens.items():
+                if other_id in removed:
+                    continue
+                score = summarizer.tokens_similarity_score(tokens, other_tokens)
+                if score:
+                    self._scores[other_id] -= score
+                    self._dirty.add(other_id)
+
+    def append_paragraph(self, paragraph):
+
+        """
+         Add a paragraph at the end of the document
+
+        Returns:
+
+        Id of the paragraph (integer)
+        """
+        return self.insert_paragraph(len(self.paragraphs), paragraph)
+
+    def insert_paragraph(self, position, paragraph):
+
+        """
+         Add a paragraph before the paragraph at position (integer)
+
+        Returns:
+
+        Id of the paragraph (integer)
+        """
+        paragraph_id = self._next_id
+        self._next_id += 1
+        self._paragraph_sentences[paragraph_id] = self._add(paragraph)
+        self._paragraph_texts[paragraph_id] = paragraph
+        self.paragraphs.insert(position, paragraph_id)
+        return paragraph_id
+
+    def remove_paragraph(self, paragraph_id):
+
+        """
+         Remove a paragraph and subtract its contributions from the other sentences
+        """
+        self.paragraphs.remove(paragraph_id)
+        self._remove(self._paragraph_sentences.pop(paragraph_id))
+        del self._paragraph_texts[paragraph_id]
+        self._best.pop(paragraph_id, None)
+
+    def edit_paragraph(self, paragraph_id, paragraph):
+
+        """
+         Replace the text of a paragraph
+
+        Returns:
+
+        Id of the new paragraph (integer)
+        """
+        position = self.paragraphs.index(paragraph_id)
+        self.remove_paragraph(paragraph_id)
+        return self.insert_paragraph(position, paragraph)
+
+    def sentences(self):
+
+        """
+         Sentences of the document in order (list)
+        """
+        return [self._texts[i] for p in self.paragraphs for i in self._paragraph_sentences[p]]
+
+    def ranks_dictionary(self):
+
+        """
+         The ranks of all sentences, as rank_sentences returns them (Dictionary)
+        """
+        ids = [i for p in self.paragraphs for i in self._paragraph_sentences[p]]
+        return self.summarizer.build_ranks_dictionary([self._texts[i] for i in ids], [self._scores[i] for i in ids])
+
+    def best_sentences(self):
+
+        """
+         The highest rank sentence of every paragraph, as best_paragraph_sentences returns them. Only the paragraphs
+         with a changed score are selected again (list)
+        """
+        dirty = self._dirty
+        for paragraph_id in self.paragraphs:
+            sentence_ids = self._paragraph_sentences[paragraph_id]
+            if paragraph_id in self._best and dirty.isdisjoint(sentence_ids):
+                continue
+            best = None
+            # Skip Short paragrahs as this might not give enough information
+            if len(sentence_ids) >= 2:
+                best_id = max(sentence_ids, key=lambda i: (self._scores[i], -i))
+                if self._texts[best_id]:
+                    best = (self._texts[best_id], self._scores[best_id])
+            self._best[paragraph_id] = best
+        dirty.clear()
+        return [self._best[p][0] for p in self.paragraphs if self._best[p]]
+
+    def document(self):
+
+        """
+         The current text of the document (string)
+        """
+        return '\n\n'.join(self._paragraph_texts[p] for p in self.paragraphs)
+
+    def summary(self, query):
+
+        """
+         The summary for the query, without highlight tags (string)
+        """
+        best_sentences = self.best_sentences()
+        ranks = [self._best[p][1] for p in self.paragraphs if self._best[p]]
+        return self.summarizer.join_summary(best_sentences, query, ranks)
+
+    def highlight(self, query, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
+
+        """
+         The summary for the query with the query terms highlighted (string)
+        """
+        return self.summarizer.add_highligt_tags_to_summary(self.summary(query), query, start_tag, end_tag)
+
+
+##//////////////////////////////////////////////////////
+## Streaming
+##//////////////////////////////////////////////////////
+
+def stream_sentences(stream, tokenizer=None, block_size=1 << 16):
+
+    """
+     The method reads a document from a file object block by block and yields its sentences as soon as they are
+     complete, with the id of their paragraph. The sentences are the same as splitting every paragraph of the whole
+     text with split_sentences, but only the unfinished sentence is kept in memory.
+
+    Args:
+
+    stream - File object with a read(size) method
+
+    tokenizer - Tokenizer whose sentence_enders split the sentences (Tokenizer)
+
+    block_size - Characters read at once (integer)
+
+    Returns:
+
+    Generator of (paragraph_id, sentence) tuples
+    """
+    tokenizer = tokenizer if tokenizer is not None else Tokenizer()
+    paragraph_id = 0
+    buffer = None
+    while True:
+        block = stream.read(block_size)
+        buffer = block if buffer is None else buffer + block
+
+        # Whole paragraphs
+        cut = buffer.find('\n\n')
+        while cut != -1:
+            for sentence in tokenizer.split_sentences(buffer[:cut]):
+                yield paragraph_id, sentence
+            paragraph_id += 1
+            buffer = buffer[cut + 2:]
+            cut = buffer.find('\n\n')
+
+        if not block:
+            for sentence in tokenizer.split_sentences(buffer):
+                yield paragraph_id, sentence
+            return
+
+        # Sentences of the unfinished paragraph which are followed by text can't change any more
+        last = None
+        for match in tokenizer.sentence_enders.finditer(buffer):
+            if match.end() < len(buffer):
+                last = match
+        if last is not None:
+            for sentence in tokenizer.split_sentences(buffer[:last.start()]):
+                yield paragraph_id, sentence
+            buffer = buffer[last.end():]
+
+
+class StreamingSummarizer(object):
+
+    """
+     Summarizes documents too long to be held in memory, like multi-megabyte transcripts, from a file object.
+
+     A sentence is only compared with the window sentences before and after it, so its rank is the degree rank
+     of rank_sentences restricted to that window (the same rank when the window is longer than the document).
+     Only the token sets of the last window sentences and the best sentence so far of the paragraphs which are
+     not finished are kept, so memory is bounded by the window instead of the document size. The best sentence of
+     a paragraph is emitted as soon as the window of its last sentence is closed.
+
+        summarizer - Summarizer whose tokenizer, similarity score and join_summary are used (DocumentSummarizer)
+        window - Number of sentences before and after a sentence which it is compared with (integer)
+        block_size - Characters read at once (integer)
+    """
+
+    def __init__(self, summarizer=None, window=50, block_size=1 << 16):
+        self.summarizer = summarizer if summarizer is not None else DocumentSummarizer()
+        self.window = window
+        self.block_size = block_size
+
+    def best_sentences(self, stream):
+
+        """
+         The best sentence of every paragraph with at least two sentences, in paragraph order, like
+         best_paragraph_sentences gives. Generator, sentences are yielded while the stream is read.
+        """
+        summarizer = self.summarizer
+        tokenizer = summarizer.tokenizer
+
+        # Open sentences: [paragraph id, sentence, tokens, score], compared with every new sentence
+        open_sentences = collections.deque()
+        # Paragraphs which are not emitted yet: [paragraph id, number of sentences, best sentence, best score]
+        paragraphs = collections.deque()
+
+        def close(entry):
+            paragraph_id, sentence, _, score = entry
+            # Every paragraph before this one has all its sentences closed
+            while paragraphs[0][0] < paragraph_id:
+                for best in emit(paragraphs.popleft()):
+                    yield best
+            paragraph = paragraphs[0]
+            if sentence and (paragraph[2] is None or score > paragraph[3]):
+                paragraph[2] = sentence
+                paragraph[3] = score
+
+        def emit(paragraph):
+            # Skip Short paragrahs as this might not give enough information
+            if paragraph[1] >= 2 and paragraph[2] is not None:
+                yield paragraph[2]
+
+        for paragraph_id, sentence in stream_sentences(stream, tokenizer, self.block_size):
+            if not paragraphs or paragraphs[-1][0] != paragraph_id:
+                paragraphs.append([paragraph_id, 0, None, 0])
+            paragraphs[-1][1] += 1
+
+            tokens = tokenizer.tokenize(sentence)
+            entry = [paragraph_id, sentence, tokens, 0]
+            for other in open_sentences:
+                score = summarizer.tokens_similarity_score(tokens, other[2])
+                if score:
+                    other[3] += score
+                    entry[3] += score
+            open_sentences.append(entry)
+
+            if len(open_sentences) > self.window:
+                for best in close(open_sentences.popleft()):
+                    yield best
+
+        while open_sentences:
+            for best in close(open_sentences.popleft()):
+                yield best
+        while paragraphs:
+            for best in emit(paragraphs.popleft()):
+                yield best
+
+    def summary(self, stream, query):
+
+        """
+         The summary of the streamed document for the query, without highlight tags (string)
+        """
+        return self.summarizer.join_summary(list(self.best_sentences(stream)), query)
+
+    def highlight(self, stream, query, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
+
+        """
+         The summary of the streamed document for the query with the query terms highlighted (string)
+        """
+        return self.summarizer.add_highligt_tags_to_summary(self.summary(stream, query), query, start_tag, end_tag)
+
+
+##//////////////////////////////////////////////////////
+## Corpus summarization
+##//////////////////////////////////////////////////////
+
+class CorpusIndex(object):
+
+    """
+     Many documents summarized together, Ex: all reviews of a business. Sentences are ranked across documents,
+     so a sentence similar to sentences of many reviews ranks high.
+
+     The index is built once while documents are added: one vocabulary of term ids shared by all documents, the
+     document frequency of every term, and the term ids of every sentence (CSR arrays: the terms of sentence i
+     are term_indices[term_indptr[i]:term_indptr[i + 1]]). rank() then scores only the pairs of sentences
+     which share a term, with the sparse engine when NumPy and SciPy are installed and an inverted index
+     otherwise, instead of ranking one concatenated document.
+
+     With idf=True the common terms of two sentences count their inverse document frequency
+     log((1 + documents) / (1 + document frequency)) + 1 instead of 1, and so do the lengths of the sentences,
+     so words found in every review matter less:
+
+        sim(s1, s2) = sum(idf(w) for w in s1 and s2) / ((sum(idf(w) for w in s1) + sum(idf(w) for w in s2)) / 2)
+
+        summarizer - Summarizer whose tokenizer, sentence splitting, threads and join_summary are used (DocumentSummarizer)
+    """
+
+    def __init__(self, summarizer=None):
+        self.summarizer = summarizer if summarizer is not None else DocumentSummarizer()
+        self.vocabulary = {}
+        self.document_frequency = array.array('l')
+        self.doc_ids = []
+        self.documents = []
+        self.term_indices = array.array('l')
+        self.term_indptr = array.array('l', [0])
+        self.sentence_documents = array.array('l')
+        self.ranked = False
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def from_documents(cls, documents, summarizer=None):
+
+        """
+         An index of documents, an iterable of (doc_id, doc) tuples (CorpusIndex)
+        """
+        corpus = cls(summarizer)
+        for doc_id, doc in documents:
+            corpus.add_document(doc_id, doc)
+        return corpus
+
+    def add_document(self, doc_id, doc):
+
+        """
+         Add a document to the index. Its sentences are ranked by the next rank() call.
+        """
+        starts, ends, paragraph_ids = self.summarizer.sentence_offsets(doc)
+        tokenizer = self.summarizer.tokenizer
+        vocabulary = self.vocabulary
+        document_frequency = self.document_frequency
+        document_index = len(self.documents)
+        document_terms = set()
+        for start, end in zip(starts, ends):
+            for token in tokenizer.tokenize(doc[start:end]):
+                term = vocabulary.get(token)
+                if term is None:
+                    term = vocabulary[token] = len(vocabulary)
+                    document_frequency.append(0)
+                self.term_indices.append(term)
+                document_terms.add(term)
+            self.term_indptr.append(len(self.term_indices))
+            self.sentence_documents.append(document_index)
+        for term in document_terms:
+            document_frequency[term] += 1
+
+        self.doc_ids.append(doc_id)
+        self.documents.append(CompactDocument(doc, starts, ends, paragraph_ids, [0.0] * len(starts)))
+        self.ranked = False
+
+    def idf(self):
+
+        """
+         Inverse document frequency of every term id (list)
+        """
+        documents = len(self.documents)
+        return [math.log((1.0 + documents) / (1.0 + frequency)) + 1.0 for frequency in self.document_frequency]
+
+    def rank(self, idf=False):
+
+        """
+         The method ranks every sentence of the corpus against the sentences of all documents and stores the ranks
+         in the documents
+
+        Args:
+
+        idf - Weight the common terms by their inverse document frequency (boolean)
+
+        Returns:
+
+        Rank of every sentence of the corpus, document after document (list)
+        """
+        summarizer = self.summarizer
+        n = len(self.sentence_documents)
+        engine = summarizer.ranking_engine
+        if (engine == 'sparse' or engine in ('auto', 'minhash') and n >= summarizer.sparse_threshold) and load_scipy():
+            incidence = sparse.csr_matrix(
+                (np.ones(len(self.term_indices)), np.array(self.term_indices, dtype=np.int64),
+                 np.array(self.term_indptr, dtype=np.int64)), shape=(n, len(self.vocabulary)))
+            # Terms found in more than frequent_term_cap sentences are added per length, not as pairs
+            scores = summarizer.incidence_degree_scores(incidence, np.array(self.idf()) if idf else None).tolist()
+        else:
+            scores = self.inverted_scores(self.idf() if idf else None)
+
+        start = 0
+        for document in self.documents:
+            document.ranks = array.array('d', scores[start:start + len(document)])
+            start += len(document)
+        self.ranked = True
+        return scores
+
+    def inverted_scores(self, weights=None):
+
+        """
+         The ranks of rank() computed with posting lists of term ids, for when SciPy is not installed. Like the
+         'inverted' engine, the pairs of terms found in more than frequent_term_cap sentences are not listed (list)
+        """
+        n = len(self.sentence_documents)
+        indices = self.term_indices
+        indptr = self.term_indptr
+        postings = collections.defaultdict(list)
+        lengths = []
+        for i in range(n):
+            terms = indices[indptr[i]:indptr[i + 1]]
+            for term in terms:
+                postings[term].append(i)
+            lengths.append(sum(weights[term] for term in terms) if weights is not None else len(terms))
+
+        common = [{} for _ in range(n)]
+        frequent_scores = [0.0] * n
+        pairs = 0
+        cap = self.summarizer.frequent_term_cap
+        for term, ids in postings.items():
+            weight = weights[term] if weights is not None else 1
+            if cap is not None and len(ids) > cap:
+                # Sentences are grouped by length, with idf weights lengths are rarely equal so this saves less
+                pairs += self.summarizer.frequent_term_scores(ids, lengths, frequent_scores, weight=weight)
+                continue
+            for x, i in enumerate(ids):
+                row = common[i]
+                for j in ids[x + 1:]:
+                    row[j] = row.get(j, 0) + weight
+                    common[j][i] = common[j].get(i, 0) + weight
+
+        scores = []
+        for i in range(n):
+            score = 0
+            for j in sorted(common[i]):
+                score += common[i][j] / ((lengths[i] + lengths[j]) / 2)
+            pairs += len(common[i])
+            scores.append(score + frequent_scores[i] if frequent_scores[i] else score)
+        self.summarizer.similarity_pairs = pairs
+        return scores
+
+    def prepared_document(self, index):
+
+        """
+         The document at index with its corpus ranks, which can summarize it alone for any query (PreparedDocument)
+        """
+        if not self.ranked:
+            self.rank()
+        return PreparedDocument(self.summarizer, self.documents[index])
+
+    def best_sentences(self, number_of_sentences=10):
+
+        """
+         The number_of_sentences highest rank sentences of the whole corpus, equal ranks in corpus order, without
+         repeating a sentence
+
+        Returns:
+
+        List of (doc_id, sentence) tuples, highest rank first (list)
+        """
+        if not self.ranked:
+            self.rank()
+        candidates = []
+        for index, document in enumerate(self.documents):
+            for i in range(len(document)):
+                if document.ends[i] > document.starts[i]:
+                    candidates.append((document.ranks[i], -len(candidates), index, i))
+
+        best = []
+        seen = set()
+        for _, _, index, i in heapq.nlargest(len(candidates), candidates):
+            sentence = self.documents[index].sentence(i)
+            if sentence not in seen:
+                seen.add(sentence)
+                best.append((self.doc_ids[index], sentence))
+                if len(best) == number_of_sentences:
+                    break
+        return best
+
+    def summary(self, query, number_of_sentences=10):
+
+        """
+         One summary of the corpus for the query from its best sentences, without highlight tags (string)
+        """
+        best = self.best_sentences(number_of_sentences)
+        return self.summarizer.join_summary([sentence for _, sentence in best], query)
+
+    def highlight(self, query, number_of_sentences=10, start_tag='[[HIGHLIGHT]]', end_tag='[[ENDHIGHLIGHT]]'):
+
+        """
+         One summary of the corpus for the query with the query terms highlighted (string)
+        """
+        return self.summarizer.add_highligt_tags_to_summary(self.summary(query, number_of_sentences), query, start_tag, end_tag)
+
+
+##//////////////////////////////////////////////////////
+## Rank store
+##//////////////////////////////////////////////////////
+
+class RankStore(object):
+
+    """
+     Precomputed sentence ranks of a corpus, memory mapped from a file so servers don't rank documents at all.
+
+     File layout (little endian):
+
+        header  - magic 'RNKS', version (uint32), offset of the index (uint64)
+        data    - for every document the columns of its CompactDocument: start offsets, end offsets and
+                  paragraph ids of the sentences (uint32 each), then their ranks (float32)
+        index   - JSON object {key: [data offset, number of sentences, SHA-1 of the document]}, the key of a
+                  document is its id as JSON, so the ids 1 and "1" are different documents
+
+     The offsets are character offsets into the document, so the same text must be given at query time.
+     A document whose text changed (different SHA-1) is not found and gets ranked as usual.
+
+     Stored documents are not copied out of the file: their columns are memoryviews of the mapping. The file
+     is unmapped by close() once no stored document is used any more.
+    """
+
+    MAGIC = b'RNKS'
+    VERSION = 3
+    HEADER = struct.Struct('<4sIQ')
+
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        import mmap
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_offset = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("%s is not a rank store" % self.path)
+        self._index = json.loads(self._mmap[index_offset:].decode('utf-8'))
+
+    def __getstate__(self):
+        # Worker processes open the file again instead of pickling the mapping
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._open()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, doc_id):
+        return self._entry(doc_id) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Stored documents still use the mapping, it is unmapped when they are released
+            pass
+        self._mmap = None
+
+    @staticmethod
+    def key(doc_id):
+
+        """
+         Index key of a document id: the id as JSON, so ids of different types don't collide (string)
+        """
+        return json.dumps(doc_id, sort_keys=True)
+
+    def _entry(self, doc_id):
+        try:
+            return self._index.get(self.key(doc_id))
+        except TypeError:
+            # Ids which are not JSON serializable can't be stored
+            return None
+
+    def _read_array(self, typecode, start, end):
+        values = memoryview(self._mmap)[start:end].cast(typecode)
+        if sys.byteorder != 'little':
+            values = array.array(typecode, values.tobytes())
+            values.byteswap()
+        return values
+
+    def get(self, doc_id, doc):
+
+        """
+         The stored sentences and ranks of a document, or None when doc_id is not in the store or its text changed
+
+        Args:
+
+        doc_id - Id of the document
+
+        doc - Document text (string)
+
+        Returns:
+
+        (sentences, ranks) - sentences of the document (list) and their ranks (list of float)
+        """
+        document = self.document(doc_id, doc)
+        if document is None:
+            return None
+        return document.sentences(), document.ranks.tolist()
+
+    def document(self, doc_id, doc):
+
+        """
+         The stored document, or None when doc_id is not in the store or its text changed (CompactDocument)
+        """
+        entry = self._entry(doc_id)
+        if entry is None or entry[2] != RankCache.key(doc):
+            return None
+        offset, n = entry[0], entry[1]
+        columns = self._read_array('I', offset, offset + 12 * n)
+        ranks = self._read_array('f', offset + 12 * n, offset + 16 * n)
+        return CompactDocument(doc, columns[:n], columns[n:2 * n], columns[2 * n:], ranks)
+
+    def prepare(self, summarizer, doc_id, doc):
+
+        """
+         A PreparedDocument built from the stored ranks, or None when the document is not in the store
+        """
+        document = self.document(doc_id, doc)
+        if document is None:
+            return None
+        return PreparedDocument(summarizer, document)
+
+    @classmethod
+    def build(cls, path, documents, summarizer=None):
+
+        """
+         The method ranks every document of a corpus and writes the rank store file
+
+        Args:
+
+        path - File name of the store (string)
+
+        documents - Iterable of (doc_id, doc) tuples
+
+        summarizer - Summarizer used to rank the documents (DocumentSummarizer)
+
+        Returns:
+
+        The number of documents written (integer)
+
+        Raises ValueError when a doc_id is repeated and TypeError when it is not JSON serializable
+        """
+        if summarizer is None:
+            summarizer = DocumentSummarizer()
+        index = {}
+        with open(path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0))
+            for doc_id, doc in documents:
+                key = cls.key(doc_id)
+                if key in index:
+                    raise ValueError("Document id %s is repeated" % key)
+                document = summarizer.compact_document(doc)
+
+                # Columns of the document: all starts, all ends, all paragraph ids, then all ranks
+                columns = array.array('I', document.starts.tolist() + document.ends.tolist() + document.paragraph_ids.tolist())
+                ranks = array.array('f', document.ranks)
+                if sys.byteorder != 'little':
+                    columns.byteswap()
+                    ranks.byteswap()
+
+                index[key] = [f.tell(), len(document), RankCache.key(doc)]
+                f.write(columns.tobytes())
+                f.write(ranks.tobytes())
+
+            index_offset = f.tell()
+            f.write(json.dumps(index).encode('utf-8'))
+            f.seek(0)
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, index_offset))
+        return len(index)
+
+
+##//////////////////////////////////////////////////////
+## Metrics
+##//////////////////////////////////////////////////////
+
+class MetricsRecord(object):
+
+    """
+     Metrics of one highlight_doc call
+
+        timings - seconds per stage: sentence_tokenizer, rank_sentences, select_best_sentences, summary_generator,
+                  add_highligt_tags_to_summary, total. Stages skipped because of a cache or rank store hit are missing
+        counts  - sentences, paragraphs, similarity_pairs, rank_cache_hits/misses, rank_store_hits/misses and
+                  tier_exact, tier_pruned, tier_lead or tier_first (see DocumentSummarizer.prepare_document)
+        sizes   - bytes of the document, the prepared document and the summary
+    """
+
+    __slots__ = ('doc_id', 'timings', 'counts', 'sizes')
+
+    def __init__(self, doc_id=None):
+        self.doc_id = doc_id
+        self.timings = {}
+        self.counts = {}
+        self.sizes = {}
+
+    def items(self):
+
+        """
+         (kind, name, value) of every metric, kind being 'timing', 'count' or 'size' (generator)
+        """
+        for kind, values in (('timing', self.timings), ('count', self.counts), ('size', self.sizes)):
+            for name, value in values.items():
+                yield kind, name, value
+
+
+class CallbackSink(object):
+
+    """
+     Sends every MetricsRecord to a function
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, record):
+        self.callback(record)
+
+
+class Histogram(object):
+
+    """
+     Histogram with logarithmic buckets (about 9% wide), so it uses constant memory for any number of values
+    """
+
+    GROWTH = 2 ** 0.125
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self._buckets = collections.defaultdict(int)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self._buckets[int(math.floor(math.log(value, self.GROWTH))) if value > 0 else None] += 1
+
+    def percentile(self, fraction):
+
+        """
+         Approximate percentile, the upper bound of the bucket holding it (float)
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = self._buckets.get(None, 0)
+        if seen >= rank:
+            return 0.0
+        for bucket in sorted(b for b in self._buckets if b is not None):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(self.maximum, self.GROWTH ** (bucket + 1))
+        return self.maximum
+
+    def summary(self):
+        return {'count': self.count, 'sum': self.total, 'min': self.minimum, 'max': self.maximum,
+                'p50': self.percentile(0.5), 'p99': self.percentile(0.99)}
+
+
+class HistogramRegistry(object):
+
+    """
+     In process metrics sink. Keeps a Histogram of every timing, count and size, named '<kind>.<name>'
+     (Ex: timing.rank_sentences). The slowest calls are kept with their doc_id to find pathological documents.
+    """
+
+    def __init__(self, slowest=10):
+        self.histograms = collections.defaultdict(Histogram)
+        self.slowest = []
+        self._keep_slowest = slowest
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        with self._lock:
+            for kind, name, value in record.items():
+                self.histograms[kind + '.' + name].add(value)
+            total = record.timings.get('total')
+            if total is not None and self._keep_slowest:
+                self.slowest.append((total, record.doc_id, record.counts.get('sentences')))
+                self.slowest.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest[self._keep_slowest:]
+
+    def snapshot(self):
+
+        """
+         Summary (count, sum, min, max, p50, p99) of every histogram (dictionary)
+        """
+        with self._lock:
+            return dict((name, histogram.summary()) for name, histogram in self.histograms.items())
+
+
+class StatsdSink(object):
+
+    """
+     Sends every MetricsRecord to a StatsD daemon over UDP, in one packet. Timings are sent in milliseconds (|ms),
+     sizes and the counts measured per document (sentences, paragraphs, similarity_pairs) as histograms (|h, or
+     size_type), and only the events such as cache hits or tiers as counters (|c). Network errors are ignored so
+     metrics never break summarization.
+    """
+
+    # Counts of MetricsRecord which are measures of the document, not events to be added up
+    MEASURED_COUNTS = frozenset(['sentences', 'paragraphs', 'similarity_pairs'])
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='summarizer', size_type='h'):
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        # 'h' for daemons with histograms, 'g' or 'ms' for the others
+        self.size_type = size_type
+        import socket
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __getstate__(self):
+        return {'host': self.host, 'port': self.port, 'prefix': self.prefix, 'size_type': self.size_type}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def format(self, record):
+
+        """
+         StatsD lines of a record (list)
+        """
+        lines = []
+        for kind, name, value in record.items():
+            if kind == 'timing':
+                lines.append('%s.%s:%.3f|ms' % (self.prefix, name, value * 1000))
+            elif kind == 'size' or name in self.MEASURED_COUNTS:
+                lines.append('%s.%s.%s:%d|%s' % (self.prefix, kind, name, value, self.size_type))
+            else:
+                lines.append('%s.%s.%s:%d|c' % (self.prefix, kind, name, value))
+        return lines
+
+    def emit(self, record):
+        try:
+            self._socket.sendto('\n'.join(self.format(record)).encode('ascii'), (self.host, self.port))
+        except (OSError, UnicodeError):
+            pass
+
+
+##//////////////////////////////////////////////////////
+## Batch summarization
+##//////////////////////////////////////////////////////
+
+# Result of one document of a batch. summary is None and error holds the reason when the document failed
+BatchResult = collections.namedtuple('BatchResult', ['doc_id', 'summary', 'error'])
+
+# DocumentSummarizer of the current worker process, created once by init_batch_worker
+_worker_summarizer = None
+
+
+def init_batch_worker(summarizer_options):
+
+    """
+     Pool initializer: creates the DocumentSummarizer reused by summarize_chunk in a worker process
+    """
+    global _worker_summarizer
+    _worker_summarizer = DocumentSummarizer(**summarizer_options)
+
+
+def _error_message(e):
+    return '%s: %s' % (type(e).__name__, e)
+
+
+def _well_formed(task):
+    return isinstance(task, (tuple, list)) and len(task) == 3
+
+
+def _summarize_one(summarizer, task):
+    doc_id = task[0] if isinstance(task, (tuple, list)) and task else None
+    try:
+        if not _well_formed(task):
+            raise ValueError("A task should be a (doc_id, doc, query) tuple, not %r" % (task,))
+        doc_id, doc, query = task
+        return BatchResult(doc_id, summarizer.highlight_doc(doc, query, doc_id), None)
+    except Exception as e:
+        # One malformed document should not stop the whole batch
+        return BatchResult(doc_id, None, _error_message(e))
+
+
+def summarize_chunk(tasks, summarizer=None):
+
+    """
+     The method summarizes a chunk of (doc_id, doc, query) tasks. The documents are ranked together (see
+     DocumentSummarizer.rank_documents) and a failing document only fails its own result.
+
+    Args:
+
+    tasks - List of (doc_id, doc, query) tuples
+
+    summarizer - Summarizer to use, by default the one of the worker process (DocumentSummarizer)
+
+    Returns:
+
+    A BatchResult for every task (list)
+    """
+    if summarizer is None:
+        summarizer = _worker_summarizer
+    if not all(_well_formed(task) for task in tasks):
+        # A task which is not a (doc_id, doc, query) tuple only fails its own result
+        results = iter(summarize_chunk([task for task in tasks if _well_formed(task)], summarizer))
+        return [next(results) if _well_formed(task) else _summarize_one(summarizer, task) for task in tasks]
+    if (summarizer.metrics is not None or len(tasks) == 1 or summarizer.time_budget is not None
+            or summarizer.max_rank_sentences is not None or summarizer.max_rank_characters is not None):
+        # Metrics are recorded and budgets are spent per highlight_doc call
+        return [_summarize_one(summarizer, task) for task in tasks]
+
+    prepared_documents = summarizer.prepare_documents([doc for _, doc, _ in tasks], [doc_id for doc_id, _, _ in tasks])
+    results = []
+    for (doc_id, doc, query), prepared in zip(tasks, prepared_documents):
+        if isinstance(prepared, Exception):
+            results.append(BatchResult(doc_id, None, _error_message(prepared)))
+            continue
+        try:
+            results.append(BatchResult(doc_id, prepared.highlight(query), None))
+        except Exception as e:
+            results.append(BatchResult(doc_id, None, _error_message(e)))
+    return results
+
+
+def _chunks(documents, chunksize):
+    chunk = []
+    for task in documents:
+        chunk.append(task)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def summarize_batch(documents, workers=None, chunksize=16, ordered=True, **summarizer_options):
+
+    """
+     The method summarizes many documents on a pool of worker processes. Every worker creates one
+     DocumentSummarizer and reuses it for all its documents. Documents are sent to the workers in chunks,
+     the documents of a chunk are ranked together, and only the summaries are sent back, so every document is pickled once. At most 2 chunks per worker
+     are in flight, so the input iterable can be a stream of any length.
+
+    Args:
+
+    documents - Iterable of (doc_id, doc, query) tuples
+
+    workers - Number of worker processes, defaults to the number of CPUs. With 1 the documents are
+              summarized in the calling process (integer)
+
+    chunksize - Number of documents sent to a worker at once (integer)
+
+    ordered - If True results come back in input order, otherwise as soon as they are ready (boolean)
+
+    summarizer_options - Keyword arguments for DocumentSummarizer (Ex: ranking_engine='pairwise')
+
+    Returns:
+
+    A generator of BatchResult(doc_id, summary, error). A failed document has summary None and the error
+    message in error, the other documents are not affected.
+    """
+    import multiprocessing
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if chunksize < 1:
+        raise ValueError("chunksize should be at least 1")
+
+    if workers <= 1:
+        summarizer = DocumentSummarizer(**summarizer_options)
+        for chunk in _chunks(documents, chunksize):
+            for result in summarize_chunk(chunk, summarizer):
+                yield result
+        return
+
+    # The pool reads tasks in a background thread. The semaphore keeps it at most max_pending chunks
+    # ahead of the consumer, so a long input stream is never loaded into memory
+    max_pending = 2 * workers
+    slots = threading.Semaphore(max_pending)
+    stopped = threading.Event()
+
+    def feed():
+        for chunk in _chunks(documents, chunksize):
+            slots.acquire()
+            if stopped.is_set():
+                return
+            yield chunk
+
+    pool = multiprocessing.Pool(workers, init_batch_worker, (summarizer_options,))
+    try:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        for chunk_results in mapper(summarize_chunk, feed()):
+            slots.release()
+            for result in chunk_results:
+                yield result
+        pool.close()
+    finally:
+        # Unblock the feeder if the consumer stopped early
+        stopped.set()
+        slots.release()
+        pool.terminate()
+        pool.join()
+
+
+##//////////////////////////////////////////////////////
+## Corpus streams
+##//////////////////////////////////////////////////////
+
+TSV_ESCAPES = {'\\n': '\n', '\\t': '\t', '\\r': '\r', '\\\\': '\\'}
+TSV_ESCAPE_PATTERN = re.compile(r'\\[ntr\\]')
+
+def _gunzip_lines(stream, block_size=1 << 16):
+    # The gzip stream is decompressed block by block. It may have several members (Ex: cat a.gz b.gz), the data
+    # after the end of a member is the start of the next one
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    pending = b''
+    for block in iter(lambda: stream.read(block_size), b''):
+        while block:
+            if decompressor.eof:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            pending += decompressor.decompress(block)
+            block = decompressor.unused_data
+        lines = pending.split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+    pending += decompressor.flush()
+    if pending:
+        yield pending
+
+
+def read_lines(path='-', compressed=None):
+
+    """
+     The method reads a file or stdin line by line without loading it into memory
+
+    Args:
+
+    path - File name, or '-' for stdin (string)
+
+    compressed - If True the input is gzip compressed. By default it is True for names ending with .gz (boolean)
+
+    Returns:
+
+    A generator of lines (bytes)
+    """
+    if compressed is None:
+        compressed = path.endswith('.gz')
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        lines = _gunzip_lines(stream) if compressed else stream
+        for line in lines:
+            yield line
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def read_records(lines, input_format='jsonl', default_query=''):
+
+    """
+     The method parses a stream of corpus records. Malformed records are reported on stderr and skipped.
+
+        jsonl - one {"id": ..., "text": ..., "query": ...} object per line
+        tsv   - id<TAB>text<TAB>query per line, with \\n, \\t, \\r and \\\\ escaped in the text
+
+     id defaults to the line number and query to default_query.
+
+    Args:
+
+    lines - Iterable of lines (bytes)
+
+    input_format - 'jsonl' or 'tsv' (string)
+
+    default_query - Query for records which have none (string)
+
+    Returns:
+
+    A generator of (doc_id, text, query) tuples
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            if input_format == 'jsonl':
+                record = json.loads(line)
+                doc_id, text, query = record.get('id', line_number), record['text'], record.get('query') or default_query
+                if not isinstance(text, str):
+                    raise ValueError("text should be a string")
+            else:
+                fields = line.decode('utf-8').rstrip('\r\n').split('\t')
+                text = TSV_ESCAPE_PATTERN.sub(lambda m: TSV_ESCAPES[m.group(0)], fields[1])
+                doc_id, query = fields[0], (fields[2] if len(fields) > 2 and fields[2] else default_query)
+        except (ValueError, KeyError, IndexError, AttributeError) as e:
+            sys.stderr.write('Skipping malformed record on line %d: %s\n' % (line_number, e))
+            continue
+        yield doc_id, text, query
+
+
+def write_results(results, path='-', compressed=None):
+
+    """
+     The method writes batch results as JSON lines, {"id": ..., "summary": ...} or {"id": ..., "error": ...}
+
+    Args:
+
+    results - Iterable of BatchResult
+
+    path - File name, or '-' for stdout (string)
+
+    compressed - If True the output is gzip compressed. By default it is True for names ending with .gz (boolean)
+    """
+    if compressed is None:
+        compressed = path.endswith('.gz')
+    stream = sys.stdout.buffer if path == '-' else open(path, 'wb')
+    if compressed:
+        import gzip
+    output = gzip.GzipFile(fileobj=stream, mode='wb') if compressed else stream
+    try:
+        for result in results:
+            if result.error is None:
+                record = {'id': result.doc_id, 'summary': result.summary}
+            else:
+                record = {'id': result.doc_id, 'error': result.error}
+            output.write((json.dumps(record) + '\n').encode('utf-8'))
+    finally:
+        if output is not stream:
+            output.close()
+        if stream is sys.stdout.buffer:
+            stream.flush()
+        else:
+            stream.close()
+
+
+# Main method
+def main(argv=None):
+
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Generate highlighted summaries for a stream of documents. Reads JSONL or TSV records '
+                    '{id, text, query} and writes JSONL records {id, summary} or {id, error}.')
+    parser.add_argument('input', nargs='?', default='-', help="Corpus file, '-' for stdin (default)")
+    parser.add_argument('-o', '--output', default='-', help="Output file, '-' for stdout (default)")
+    parser.add_argument('-f', '--format', choices=['jsonl', 'tsv'], default='jsonl', help='Input format (default jsonl)')
+    parser.add_argument('-q', '--query', default='', help='Query for records which have none')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Number of worker processes (default 1)')
+    parser.add_argument('--chunksize', type=int, default=16, help='Documents sent to a worker at once (default 16)')
+    parser.add_argument('--unordered', action='store_true', help='Write results as soon as they are ready')
+    parser.add_argument('--gzip-input', action='store_true', default=None, help='Input is gzip compressed (default for .gz)')
+    parser.add_argument('--gzip-output', action='store_true', default=None, help='Compress the output (default for .gz)')
+    parser.add_argument('--rank-store', help='Use the precomputed ranks of this rank store for the records found in it')
+    parser.add_argument('--build-rank-store', metavar='PATH', help='Rank the corpus and write a rank store instead of summaries')
+    parser.add_argument('--document', help='Summarize a single plain text file and print the highlighted summary')
+    parser.add_argument('--spans', action='store_true',
+                        help='With --document, print the summary as JSON offsets of its sentences and highlights in the file')
+    parser.add_argument('--ranker', choices=sorted(RANKERS), default='degree', help='How sentences are ranked (default degree)')
+    parser.add_argument('--threads', type=int, default=1, help='Threads ranking one large document (default 1)')
+    parser.add_argument('--max-sentences', type=int, help='Maximum number of sentences in a summary')
+    parser.add_argument('--max-characters', type=int, help='Maximum number of characters in a summary')
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                        help='Time to spend on a document, longer ones fall back to lead or first sentences')
+    parser.add_argument('--max-rank-sentences', type=int, help='Documents with more sentences are ranked approximately')
+    parser.add_argument('--max-rank-characters', type=int, help='Only the first sentences of longer documents are summarized')
+    parser.add_argument('--stream-window', type=int, metavar='N',
+                        help='With --document, read the file as a stream and compare every sentence with the N sentences around it')
+    parser.add_argument('--corpus-summary', type=int, metavar='K',
+                        help='Rank the sentences of all records together and print one summary of the K best ones')
+    parser.add_argument('--idf', action='store_true', help='With --corpus-summary, weight common words by inverse document frequency')
+    args = parser.parse_args(argv)
+
+    if args.document and args.stream_window:
+        streaming = StreamingSummarizer(DocumentSummarizer(summary_sentences=args.max_sentences,
+                                                           summary_characters=args.max_characters), args.stream_window)
+        with open(args.document, encoding='utf-8') as stream:
+            print(streaming.highlight(stream, args.query))
+        return
+
+    if args.document:
+        # Create a DocumentSummarizer object
+        doc_sum = DocumentSummarizer(ranker=args.ranker, threads=args.threads, summary_sentences=args.max_sentences,
+                                     summary_characters=args.max_characters, time_budget=args.time_budget,
+                                     max_rank_sentences=args.max_rank_sentences,
+                                     max_rank_characters=args.max_rank_characters)
+        document= doc_sum.read_document(args.document)
+
+        # The summary is written piece by piece from the offsets of its sentences in the document
+        summary_spans= doc_sum.highlight_spans(document, args.query)
+        if args.spans:
+            print(json.dumps(summary_spans.to_dict()))
+        else:
+            summary_spans.render(sys.stdout)
+            sys.stdout.write('\n')
+        return
+
+    records = read_records(read_lines(args.input, args.gzip_input), args.format, args.query)
+
+    if args.build_rank_store:
+        count = RankStore.build(args.build_rank_store, ((doc_id, text) for doc_id, text, _ in records),
+                                DocumentSummarizer(ranker=args.ranker))
+        sys.stderr.write('Wrote ranks of %d documents to %s\n' % (count, args.build_rank_store))
+        return
+
+    if args.corpus_summary:
+        corpus = CorpusIndex.from_documents(((doc_id, text) for doc_id, text, _ in records),
+                                            DocumentSummarizer(threads=args.threads))
+        corpus.rank(idf=args.idf)
+        print(corpus.highlight(args.query, args.corpus_summary))
+        return
+
+    summarizer_options = {'ranker': args.ranker, 'threads': args.threads, 'summary_sentences': args.max_sentences,
+                          'summary_characters': args.max_characters, 'time_budget': args.time_budget,
+                          'max_rank_sentences': args.max_rank_sentences, 'max_rank_characters': args.max_rank_characters}
+    if args.rank_store:
+        summarizer_options['rank_store'] = RankStore(args.rank_store)
+    results = summarize_batch(records, workers=args.workers, chunksize=args.chunksize, ordered=not args.unordered,
+                              **summarizer_options)
+    write_results(results, args.output, args.gzip_output)
 
 
 if __name__ == '__main__':
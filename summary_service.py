@@ -0,0 +1,358 @@
+# coding=UTF-8
+import argparse
+import functools
+import http.server
+import json
+import multiprocessing
+import queue
+import socketserver
+import threading
+
+import summary_generator
+
+
+"""
+ Local HTTP service for the summarizer, so a long running process answers requests instead of starting
+ Python for every document.
+
+    POST /highlight  {"text": ..., "query": ..., "id": ...}       -> {"id": ..., "summary": ...}
+    POST /batch      {"documents": [{"text", "query", "id"}, ...]} -> {"results": [{"id", "summary"} or {"id", "error"}]}
+    GET  /health     queue depth and documents in flight
+    GET  /metrics    request counts, batch sizes and latency
+
+ Ranking is CPU bound, so it runs on a pool of worker processes. Requests which arrive together are
+ micro-batched: the dispatcher waits up to batch_window seconds for up to max_batch documents and sends
+ them to a worker as one chunk, where they are ranked with one shared sparse matrix product
+ (see DocumentSummarizer.rank_documents).
+
+ Backpressure: at most max_queue documents wait for a worker. When the queue is full new requests get
+ 503 with a Retry-After header instead of piling up. A batch larger than max_queue gets 413.
+
+ Connections are answered by threads (ThreadingMixIn), not an asyncio event loop. The standard library has
+ no asyncio HTTP server, and http.server already parses requests and handles keep-alive. A handler thread only
+ waits on the Event of its PendingResult, because ranking runs in the worker processes. Concurrent requests are
+ bounded by max_queue, since requests over it are rejected at once. So threads cost little here. An event loop
+ would only pay off for many thousands of idle keep-alive connections.
+
+    python summary_service.py --port 8080 --workers 4
+"""
+
+
+class ServiceOverloaded(Exception):
+    pass
+
+
+class PendingResult(object):
+
+    """
+     Result of a submitted document, set by the dispatcher when its batch is done
+    """
+
+    __slots__ = ('_event', 'result', 'submitted')
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.result = None
+        self.submitted = summary_generator.timer()
+
+    def set(self, result):
+        self.result = result
+        self._event.set()
+
+    def wait(self, timeout=None):
+
+        """
+         The BatchResult, or None if it is not ready after timeout seconds
+        """
+        self._event.wait(timeout)
+        return self.result
+
+
+class MicroBatcher(object):
+
+    """
+     Collects submitted documents into batches and summarizes them on a process pool.
+
+        workers - Number of worker processes, defaults to the number of CPUs (integer)
+        max_batch - Maximum number of documents per batch (integer)
+        batch_window - Seconds to wait for more documents after the first one of a batch (float)
+        max_queue - Maximum number of documents waiting for a worker (integer)
+        max_in_flight - Maximum number of batches on the workers, 2 per worker by default (integer)
+        summarizer_options - Keyword arguments for the DocumentSummarizer of every worker
+    """
+
+    def __init__(self, workers=None, max_batch=32, batch_window=0.005, max_queue=1024, max_in_flight=None,
+                 **summarizer_options):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.queue = queue.Queue(max_queue)
+        self.pool = multiprocessing.Pool(self.workers, summary_generator.init_batch_worker, (summarizer_options,))
+        self.slots = threading.Semaphore(max_in_flight or 2 * self.workers)
+
+        self.latency = summary_generator.Histogram()
+        self.batch_sizes = summary_generator.Histogram()
+        self.rejected = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+
+        """
+         Start the dispatcher thread
+        """
+        self._thread = threading.Thread(target=self._dispatch, name='summary-dispatcher')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+        self.pool.terminate()
+        self.pool.join()
+
+    def submit(self, doc_id, doc, query):
+
+        """
+         Queue a document. Raises ServiceOverloaded when the queue is full
+
+        Returns:
+
+        The pending result of the document (PendingResult)
+        """
+        return self.submit_batch([(doc_id, doc, query)])[0]
+
+    def submit_batch(self, tasks):
+
+        """
+         Queue all the (doc_id, doc, query) tasks or none of them. Raises ServiceOverloaded when they
+         don't all fit in the queue, so a rejected request leaves no documents behind to be summarized
+
+        Returns:
+
+        The pending results of the documents in task order (list of PendingResult)
+        """
+        pending = [PendingResult() for _ in tasks]
+        with self._submit_lock:
+            # Only the dispatcher takes documents out, so the free room can't shrink before they are all put
+            if self.queue.qsize() + len(tasks) > self.max_queue:
+                with self._lock:
+                    self.rejected += len(tasks)
+                raise ServiceOverloaded("%d documents are waiting" % self.max_queue)
+            for task, result in zip(tasks, pending):
+                self.queue.put_nowait((tuple(task), result))
+        return pending
+
+    def _dispatch(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = summary_generator.timer() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - summary_generator.timer()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+
+            # Wait for a free worker slot, new requests meanwhile wait in the bounded queue
+            self.slots.acquire()
+            with self._lock:
+                self.in_flight += len(batch)
+            self.batch_sizes.add(len(batch))
+            tasks = [task for task, _ in batch]
+            pending = [result for _, result in batch]
+            self.pool.apply_async(summary_generator.summarize_chunk, (tasks,),
+                                  callback=functools.partial(self._done, pending),
+                                  error_callback=functools.partial(self._failed, tasks, pending))
+
+    def _done(self, pending, results):
+        self.slots.release()
+        now = summary_generator.timer()
+        with self._lock:
+            self.in_flight -= len(pending)
+            for result in pending:
+                self.latency.add(now - result.submitted)
+        for result, batch_result in zip(pending, results):
+            result.set(batch_result)
+
+    def _failed(self, tasks, pending, error):
+
+        """
+         Error callback of a batch which failed as a whole (Ex: a worker died or a result could not be pickled):
+         every document of the batch gets the error, so its request does not wait for request_timeout
+        """
+        message = '%s: %s' % (type(error).__name__, error)
+        self._done(pending, [summary_generator.BatchResult(doc_id, None, message) for doc_id, _, _ in tasks])
+
+    def stats(self):
+
+        """
+         Queue, batching and latency statistics (dictionary)
+        """
+        with self._lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+                'batches': self.batch_sizes.summary(),
+                'latency_seconds': self.latency.summary(),
+            }
+
+
+##//////////////////////////////////////////////////////
+## HTTP
+##//////////////////////////////////////////////////////
+
+class SummaryRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            http.server.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body can't be found in the stream, so the connection can't be reused
+            self.send_json(400, {'error': 'Invalid Content-Length: %s' % self.headers.get('Content-Length')})
+            self.close_connection = True
+            return None
+        if length > self.server.max_body_bytes:
+            self.send_json(413, {'error': 'Request body is larger than %d bytes' % self.server.max_body_bytes})
+            self.close_connection = True
+            return None
+        try:
+            return json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError as e:
+            self.send_json(400, {'error': 'Invalid JSON: %s' % e})
+            return None
+
+    def do_GET(self):
+        batcher = self.server.batcher
+        if self.path == '/health':
+            stats = batcher.stats()
+            overloaded = stats['queue_depth'] >= batcher.max_queue
+            self.send_json(503 if overloaded else 200, {'status': 'overloaded' if overloaded else 'ok',
+                                                        'queue_depth': stats['queue_depth'],
+                                                        'in_flight': stats['in_flight']})
+        elif self.path == '/metrics':
+            self.send_json(200, batcher.stats())
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path not in ('/highlight', '/batch'):
+            self.send_json(404, {'error': 'Not found'})
+            return
+        body = self.read_json()
+        if body is None:
+            return
+        try:
+            records = body['documents'] if self.path == '/batch' else [body]
+            tasks = [(record.get('id'), record['text'], record.get('query') or '') for record in records]
+        except (KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {'error': 'Every document needs a text: %s' % e})
+            return
+
+        batcher = self.server.batcher
+        if len(tasks) > batcher.max_queue:
+            # Retrying would not help, the batch can never fit in the queue
+            self.send_json(413, {'error': 'Batch is larger than %d documents' % batcher.max_queue})
+            return
+        try:
+            pending = batcher.submit_batch(tasks)
+        except ServiceOverloaded as e:
+            self.send_json(503, {'error': str(e)}, {'Retry-After': '1'})
+            return
+
+        results = []
+        for result in pending:
+            batch_result = result.wait(self.server.request_timeout)
+            if batch_result is None:
+                self.send_json(504, {'error': 'Summarization timed out'})
+                return
+            if batch_result.error is None:
+                results.append({'id': batch_result.doc_id, 'summary': batch_result.summary})
+            else:
+                results.append({'id': batch_result.doc_id, 'error': batch_result.error})
+
+        if self.path == '/batch':
+            self.send_json(200, {'results': results})
+        else:
+            self.send_json(422 if 'error' in results[0] else 200, results[0])
+
+
+class SummaryHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+
+    """
+     HTTP server answering every connection in a thread and summarizing on the batcher's process pool
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, batcher, max_body_bytes=10 * 1024 * 1024, request_timeout=60, verbose=False):
+        http.server.HTTPServer.__init__(self, address, SummaryRequestHandler)
+        self.batcher = batcher
+        self.max_body_bytes = max_body_bytes
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='HTTP summarization service')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default 8080)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default number of CPUs)')
+    parser.add_argument('--max-batch', type=int, default=32, help='Documents per batch (default 32)')
+    parser.add_argument('--batch-window-ms', type=float, default=5, help='Milliseconds to wait for a batch to fill (default 5)')
+    parser.add_argument('--max-queue', type=int, default=1024, help='Documents waiting for a worker before 503 (default 1024)')
+    parser.add_argument('--engine', default='auto', help='Ranking engine (default auto)')
+    parser.add_argument('--time-budget-ms', type=float, help='Milliseconds to spend on a document before falling back to lead sentences')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args(argv)
+
+    time_budget = args.time_budget_ms / 1000 if args.time_budget_ms is not None else None
+    batcher = MicroBatcher(args.workers, args.max_batch, args.batch_window_ms / 1000, args.max_queue,
+                           ranking_engine=args.engine, time_budget=time_budget).start()
+    server = SummaryHTTPServer((args.host, args.port), batcher, verbose=args.verbose)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == '__main__':
+    main()
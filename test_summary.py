@@ -1,8 +1,21 @@
 import unittest
+import gzip
+import io
+import os
+import shutil
+import socket
+import tempfile
 import time
 import warnings 
 import re
 import summary_generator
+import summary_service
+import benchmark
+import json
+import http.client
+import threading
+import urllib.error
+import urllib.request
 
 """
 	Test class to cover unit tests on all methods of summary_generator class 
@@ -58,6 +71,15 @@ class TestDocumentSummarizer(unittest.TestCase):
 
 		self.assertEqual(1.0, self.doc_sum.get_sentences_similarity_score(sent1,sent2), "Wrong similarity score!!")
 
+	def test_sentence_tokens(self):
+		# Sentences should be compared word by word, not character by character
+		tokens= self.doc_sum.sentence_tokens("The City's tastiest burger, the tastiest!")
+		self.assertEqual(frozenset(["city's", 'tastiest', 'burger']), tokens, "Sentence is not tokenized into words")
+		self.assertTrue(tokens is self.doc_sum.sentence_tokens("The City's tastiest burger, the tastiest!"), "Token set should be memoized")
+
+		self.doc_sum.rank_sentences(self.sentences)
+		self.assertFalse(tokens is self.doc_sum.sentence_tokens("The City's tastiest burger, the tastiest!"), "Token cache should be cleared for a new document")
+
 	def test_rank_sentences(self):
 		# Check if sentences are properly rankes
 		content= self.doc_sum.read_document('tests/test_get_sentences_similarity_score_doc.txt')
@@ -66,6 +88,119 @@ class TestDocumentSummarizer(unittest.TestCase):
 
 		assert len(rank_dict.keys()) !=0, "Failed to rank sentences" 
 
+	@unittest.skipIf(not summary_generator.load_scipy(), "NumPy and SciPy are not installed")
+	def test_rank_sentences_sparse(self):
+		# The sparse engine should give exactly the same ranks as the pairwise engine
+		pairwise_ranks= self.doc_sum.rank_sentences_pairwise(self.sentences)
+		sparse_ranks= self.doc_sum.rank_sentences_sparse(self.sentences)
+
+		self.assertEqual(pairwise_ranks, sparse_ranks, "Sparse ranks differ from pairwise ranks")
+		self.assertEqual({}, self.doc_sum.rank_sentences_sparse([]), "Should have returned empty dictionary")
+
+		# Documents ranked together should get the same ranks as alone
+		other_sentences= self.doc_sum.generate_sentences(self.doc_sum.read_document('tests/test_paragragh_generator_doc.txt'))
+		self.assertEqual([pairwise_ranks, {}, self.doc_sum.rank_sentences_pairwise(other_sentences)], self.doc_sum.rank_documents([self.sentences, [], other_sentences]), "Documents ranked together differ from ranked alone")
+
+		# Frequent terms are left out of the product and added per length, with the same ranks and fewer pairs
+		uncapped= summary_generator.DocumentSummarizer(ranking_engine='sparse', frequent_term_cap=None, duplicates=None)
+		capped= summary_generator.DocumentSummarizer(ranking_engine='sparse', frequent_term_cap=10, duplicates=None)
+		long_sentences= self.doc_sum.generate_sentences(benchmark.CorpusGenerator(vocabulary_size=200, seed=3).document(10, 30))
+		for x, y in zip(uncapped.sentence_scores(long_sentences), capped.sentence_scores(long_sentences)):
+			self.assertAlmostEqual(x, y, 12, "Capped sparse ranks differ from the exact ranks")
+		assert capped.similarity_pairs < uncapped.similarity_pairs, "Frequent term pairs should not be listed"
+
+
+	@unittest.skipIf(not summary_generator.load_scipy(), "NumPy and SciPy are not installed")
+	def test_parallel_ranking(self):
+		# Row blocks ranked on several threads should give exactly the serial ranks
+		generator= benchmark.CorpusGenerator(vocabulary_size=200, seed=3)
+		sentences= self.doc_sum.generate_sentences(generator.document(10, 30))
+		serial= summary_generator.DocumentSummarizer(ranking_engine='sparse')
+		parallel= summary_generator.DocumentSummarizer(ranking_engine='sparse', threads=3, parallel_threshold=10)
+		self.assertEqual(3, len(parallel.row_blocks(len(sentences))), "Document should be split into one block per thread")
+		self.assertEqual(serial.sentence_scores(sentences), parallel.sentence_scores(sentences), "Parallel ranks differ from serial ranks")
+		self.assertEqual(serial.similarity_pairs, parallel.similarity_pairs, "Wrong number of similarity pairs")
+		self.assertEqual(serial.rank_sentences(self.sentences), parallel.rank_sentences(self.sentences), "Small documents should not be split")
+
+		serial= summary_generator.DocumentSummarizer(ranker='pagerank')
+		parallel= summary_generator.DocumentSummarizer(ranker='pagerank', threads=4, parallel_threshold=10)
+		self.assertEqual(serial.sentence_scores(sentences), parallel.sentence_scores(sentences), "Parallel PageRank differs from serial")
+
+	def test_rank_sentences_inverted(self):
+		# The inverted index engine should give exactly the same ranks as the pairwise engine
+		pairwise_ranks= self.doc_sum.rank_sentences_pairwise(self.sentences)
+		doc_sum= summary_generator.DocumentSummarizer(ranking_engine='inverted')
+		self.assertEqual(pairwise_ranks, doc_sum.rank_sentences(self.sentences), "Inverted index ranks differ from pairwise ranks")
+		assert doc_sum.similarity_pairs < len(self.sentences) ** 2, "Pairs without common words should not be scored"
+
+		# Frequent terms are added per sentence length, equal up to rounding
+		doc_sum= summary_generator.DocumentSummarizer(ranking_engine='inverted', frequent_term_cap=2)
+		capped_ranks= doc_sum.rank_sentences(self.sentences)
+		for key in pairwise_ranks:
+			self.assertAlmostEqual(pairwise_ranks[key], capped_ranks[key], places=9)
+
+	@unittest.skipIf(not summary_generator.load_scipy(), "NumPy and SciPy are not installed")
+	def test_rank_sentences_minhash(self):
+		# Approximate ranks should be close to the exact ranks, never too high and within the bound without sampling
+		exact_ranks= self.doc_sum.rank_sentences_pairwise(self.sentences)
+		doc_sum= summary_generator.DocumentSummarizer(ranking_engine='minhash', minhash=summary_generator.MinHashLSH(bands=64, rows=1, sample_size=0))
+		approximate_ranks= doc_sum.rank_sentences(self.sentences)
+
+		self.assertEqual(set(exact_ranks), set(approximate_ranks), "All sentences should be ranked")
+		for key in exact_ranks:
+			assert approximate_ranks[key] <= exact_ranks[key] + 1e-9, "Approximate rank should not be higher than exact rank"
+			assert exact_ranks[key] - approximate_ranks[key] <= doc_sum.ranking_error['error_bound'] + 1e-9, "Approximate rank should be within the error bound"
+		assert doc_sum.ranking_error['mean_relative_error'] < 0.5, "Approximate ranks are too far from exact ranks"
+		assert doc_sum.similarity_pairs < len(self.sentences) ** 2, "Approximate ranking should not score every pair"
+
+		# Sampled ranks get a bound from their sample, and no sentence gets more than max_candidates pairs
+		minhash= summary_generator.MinHashLSH(max_bucket=3)
+		doc_sum= summary_generator.DocumentSummarizer(ranking_engine='minhash', minhash=minhash)
+		sampled_ranks= doc_sum.rank_sentences(self.sentences)
+		assert 0 < doc_sum.ranking_error['error_bound'] < len(self.sentences), "Sampled ranks should get an error bound"
+		rows, cols= minhash.candidate_pairs([self.doc_sum.sentence_tokens(s) for s in self.sentences])
+		assert all(i < j for i, j in zip(rows, cols)), "Candidate pairs should be listed once"
+		for i in range(len(self.sentences)):
+			assert (rows == i).sum() + (cols == i).sum() <= minhash.max_candidates(), "Too many candidates for a sentence"
+
+		# Long documents should switch to approximate ranking automatically
+		doc_sum= summary_generator.DocumentSummarizer(ranking_engine='pairwise', approximate_threshold=5)
+		doc_sum.highlight_doc(self.document, self.query)
+		assert doc_sum.ranking_error is not None, "Long document should be ranked approximately"
+		self.doc_sum.highlight_doc(self.document, self.query)
+		self.assertEqual(None, self.doc_sum.ranking_error, "Short document should be ranked exactly")
+
+	def test_duplicate_sentences(self):
+		# Duplicate sentences should be ranked once, weighted by their copies, with the same ranks
+		boilerplate= [u"Highly recommend!", u"Will be back.", u"highly recommend.", u"Great pizza, highly recommend!"]
+		sentences= sum([[s, boilerplate[i % len(boilerplate)]] for i, s in enumerate(self.sentences)], []) + self.sentences[:5]
+		representatives, group_of, multiplicity= summary_generator.duplicate_groups([self.doc_sum.sentence_tokens(s) for s in boilerplate])
+		self.assertEqual(([0, 1, 3], [0, 1, 0, 2], [2, 1, 1]), (representatives, group_of, multiplicity), "Normalized duplicates should be grouped")
+
+		exact= summary_generator.DocumentSummarizer(ranking_engine='pairwise').sentence_scores(sentences)
+		engines= ['inverted', 'sparse'] if summary_generator.load_scipy() else ['inverted']
+		for engine in engines:
+			for cap in (1000, 3):
+				doc_sum= summary_generator.DocumentSummarizer(ranking_engine=engine, frequent_term_cap=cap)
+				for x, y in zip(exact, doc_sum.sentence_scores(sentences)):
+					self.assertAlmostEqual(x, y, 9, "Collapsed ranks differ from the exact ranks with the %s engine" % engine)
+				uncollapsed= summary_generator.DocumentSummarizer(ranking_engine=engine, frequent_term_cap=cap, duplicates=None)
+				uncollapsed.sentence_scores(sentences)
+				assert doc_sum.similarity_pairs < uncollapsed.similarity_pairs, "Duplicates should not be scored again"
+			shared= summary_generator.DocumentSummarizer(ranking_engine=engine).documents_scores([sentences, self.sentences])
+			for x, y in zip(exact, shared[0]):
+				self.assertAlmostEqual(x, y, 9, "Collapsed ranks of a batch differ with the %s engine" % engine)
+
+		# Near duplicates are found by SimHash
+		long_sentence= u"The deep dish pizza crust was thin, crispy and perfectly baked with fresh tomato sauce and basil."
+		near= u"The deep dish pizza crust was thin, crispy and perfectly baked with fresh tomato sauce."
+		token_sets= [self.doc_sum.sentence_tokens(s) for s in (long_sentence, u"Service was slow and the waiter forgot our drinks twice.", near)]
+		self.assertEqual([0, 1, 0], summary_generator.duplicate_groups(token_sets, 4)[1], "Near duplicates should be grouped")
+		self.assertEqual([0, 1, 2], summary_generator.duplicate_groups(token_sets)[1], "Near duplicates are not exact duplicates")
+		self.assertRaises(ValueError, summary_generator.DocumentSummarizer, duplicates='fuzzy')
+
+		# A summary keeps the first copy of sentences which only differ in case and punctuation
+		self.assertEqual(u"Highly recommend!Will be back.", self.doc_sum.join_summary(boilerplate[:3], 'pizza'), "Duplicate sentences should be joined once")
 
 	def test_select_best_sentences(self):
 		#Check if best sentences are returned
@@ -75,6 +210,25 @@ class TestDocumentSummarizer(unittest.TestCase):
 		
 		self.assertEqual(0, len(rank_list), "This should have returnes empty list")
 
+	def test_join_summary(self):
+		# Sentences with query words come first, both groups in document order, without repeated sentences
+		best_sentences= ["A pizza.", "B salad.", "A pizza.", "C pizza!"]
+		ranks= [1, 5, 1, 3]
+		self.assertEqual("A pizza.C pizza!B salad.", self.doc_sum.join_summary(best_sentences, "pizza"), "Summary order should be deterministic")
+
+		# A budget keeps sentences with query words first, then the highest ranks, in summary order
+		doc_sum= summary_generator.DocumentSummarizer(summary_sentences=2)
+		self.assertEqual("B salad.C pizza!", doc_sum.join_summary(best_sentences, "salad", ranks), "Wrong sentences kept by the budget")
+		doc_sum= summary_generator.DocumentSummarizer(summary_characters=17)
+		self.assertEqual("B salad.C pizza!", doc_sum.join_summary(best_sentences, "salad", ranks), "Summary should fit in the characters budget")
+		doc_sum= summary_generator.DocumentSummarizer(summary_sentences=1)
+		summary= doc_sum.highlight_doc(self.document, self.query)
+		self.assertEqual(1, summary.count("[[HIGHLIGHT]]pizza[[ENDHIGHLIGHT]]") + summary.count("[[HIGHLIGHT]]deep dish pizza[[ENDHIGHLIGHT]]"), "Summary should have one sentence")
+
+		content= "Great pizza. Deep dish pizza is great. The wait was long. Great pizza."
+		ranks= self.doc_sum.rank_sentences(self.doc_sum.generate_sentences(content))
+		self.assertEqual(["Great pizza.", "Deep dish pizza is great."], self.doc_sum.select_best_sentences(content, ranks, 2), "Wrong best sentences")
+
 	def test_add_highligt_tags_to_summary(self):
 		# Check if highlight tags are added properly
 		content= self.doc_sum.read_document('tests/test_add_highligt_tags_to_snippet_doc.txt')
@@ -82,11 +236,78 @@ class TestDocumentSummarizer(unittest.TestCase):
 		
 		self.assertEqual('[[HIGHLIGHT]]deep dish pizza pizza[[ENDHIGHLIGHT]]', summary_with_tags, "Higlight tags are not added properly!!")
 
+	@unittest.skipIf(not summary_generator.load_scipy(), "NumPy and SciPy are not installed")
+	def test_rankers(self):
+		# PageRank and LSA rankers should plug into the summarizer, a custom ranker too
+		self.assertEqual(self.sentences_ranks_dictionary, summary_generator.DocumentSummarizer(ranker='degree').rank_sentences(self.sentences), "Degree ranker should be the default")
+		self.assertRaises(ValueError, summary_generator.DocumentSummarizer, ranker='unknown')
+
+		pagerank= summary_generator.PageRankRanker(tol=1e-10)
+		doc_sum= summary_generator.DocumentSummarizer(ranker=pagerank)
+		scores= doc_sum.sentence_scores(self.sentences)
+		self.assertAlmostEqual(1.0, sum(scores), places=9)
+		assert pagerank.iterations < pagerank.max_iter, "PageRank should converge"
+		graph= doc_sum.similarity_matrix([self.sentences]).toarray()
+		n= len(self.sentences)
+		for i in range(n):
+			expected= (1 - pagerank.damping) / n + pagerank.damping * sum(graph[j][i] / graph[j].sum() * scores[j] for j in range(n) if graph[j].sum())
+			expected+= pagerank.damping * sum(scores[j] / n for j in range(n) if not graph[j].sum())
+			self.assertAlmostEqual(expected, scores[i], places=8)
+		other_sentences= self.doc_sum.generate_sentences(self.doc_sum.read_document('tests/test_paragragh_generator_doc.txt'))
+		batched= doc_sum.documents_scores([other_sentences, self.sentences])
+		for expected, score in zip(scores, batched[1]):
+			self.assertAlmostEqual(expected, score, places=8)
+
+		lsa= summary_generator.LSARanker(components=2)
+		doc_sum= summary_generator.DocumentSummarizer(ranker=lsa)
+		incidence= doc_sum.incidence_matrix([self.sentences]).astype(float)
+		u, singular_values= lsa.randomized_svd(incidence, 2)
+		exact= summary_generator.np.linalg.svd(incidence.toarray(), compute_uv=False)
+		for expected, value in zip(exact[:2], singular_values):
+			assert abs(expected - value) < 0.01 * expected, "Randomized SVD is not accurate"
+		self.assertEqual(doc_sum.sentence_scores(self.sentences), doc_sum.sentence_scores(self.sentences), "LSA ranks should be deterministic")
+		self.assertEqual([], doc_sum.sentence_scores([]), "Empty document should have no ranks")
+
+		class LengthRanker(summary_generator.Ranker):
+			def scores(self, summarizer, sentences):
+				return [len(sentence) for sentence in sentences]
+		doc_sum= summary_generator.DocumentSummarizer(ranker=LengthRanker())
+		content= "Short one. The longest sentence of the paragraph.\n\nTiny. A longer sentence."
+		self.assertEqual(["The longest sentence of the paragraph.", "A longer sentence."], doc_sum.prepare_document(content).best_sentences, "Custom ranker is not used")
+
+	def test_highlighter(self):
+		# Only whole words should be highlighted, without nested tags, for any tags
+		summary= "Deep dish pizza at the pizzeria, deep dish pizzas and deep-dish pizza."
+		self.assertEqual("Deep <b>dish pizza</b> at the pizzeria, <b>deep dish</b> pizzas and <b>deep</b>-<b>dish pizza</b>.", self.doc_sum.add_highligt_tags_to_summary(summary, "deep dish pizza", '<b>', '</b>'), "Highlight tags are not added properly!!")
+
+		highlighter= summary_generator.Highlighter(['pizza', 'pizz', 'pizzeria'], '[', ']', ignore_case=True)
+		self.assertEqual("[Pizza] at the [pizzeria], [pizz]", highlighter.highlight("Pizza at the pizzeria, pizz"), "Overlapping query words are not highlighted properly")
+		self.assertEqual([(0, 5), (13, 21), (23, 27)], highlighter.spans("Pizza at the pizzeria, pizz"), "Wrong highlight spans")
+		self.assertEqual("no query words", self.doc_sum.add_highligt_tags_to_summary("no query words", "the"), "Text without query words should not change")
+
+	def test_summary_spans(self):
+		# Spans should render the summary of highlight_doc without building it
+		for query in (self.query, "deep dish pizza", "xyz"):
+			summary_spans= self.doc_sum.highlight_spans(self.document, query)
+			self.assertEqual(self.doc_sum.highlight_doc(self.document, query), summary_spans.render(), "Rendered spans differ from highlight_doc")
+			output= io.StringIO()
+			self.assertEqual(None, summary_spans.render(output, '<b>', '</b>'), "Render should write to the output")
+			self.assertEqual(self.doc_sum.add_highligt_tags_to_summary(self.doc_sum.prepare_document(self.document).summary(query), query, '<b>', '</b>'), output.getvalue(), "Wrong tags")
+
+		summary_spans= self.doc_sum.highlight_spans(self.document, 'pizza')
+		self.assertEqual(self.doc_sum.prepare_document(self.document).summary('pizza'), "".join(self.document[start:end] for start, end in summary_spans.sentences), "Sentence spans should point into the document")
+		self.assertEqual(['pizza'] * len(summary_spans.highlights), [self.document[start:end].lower() for start, end in summary_spans.highlights], "Highlight spans should point into the document")
+		self.assertEqual(summary_spans.render(), "".join(('[[HIGHLIGHT]]%s[[ENDHIGHLIGHT]]' if highlighted else '%s') % self.document[start:end] for start, end, highlighted in summary_spans.segments()), "Segments should cover the summary")
+		self.assertEqual({'sentences': [list(span) for span in summary_spans.sentences], 'highlights': [list(span) for span in summary_spans.highlights]}, json.loads(json.dumps(summary_spans.to_dict())), "Spans should be JSON serializable")
+
+		# Fallback tiers give spans too
+		self.assertEqual(self.doc_sum.highlight_doc(self.document, 'pizza', time_budget=0), self.doc_sum.highlight_spans(self.document, 'pizza', time_budget=0).render(), "Wrong spans of the first sentences")
+
 	def test_summary_generator(self):
 		# Check if summary can be generated as expected
 		content= self.doc_sum.read_document('tests/test_summary_generator_doc.txt')
 		query= "deep dish pizza"
-		required_summary="My family and I waited about an hour before we were seated.You're gonna be talking pretty loudly to each other the whole time but it might be worth it for some great pizza."
+		required_summary="My family and I ordered our pizza before we sat, and we only had to wait about an additional 15 minutes after we were seated for our food.You're gonna be talking pretty loudly to each other the whole time but it might be worth it for some great pizza."
 		sentences = self.doc_sum.generate_sentences(content)
 		sentences_ranks_dictionary = self.doc_sum.rank_sentences(sentences)
 		generated_summary= self.doc_sum.summary_generator(content,query,sentences_ranks_dictionary)
@@ -97,7 +318,7 @@ class TestDocumentSummarizer(unittest.TestCase):
 		# Check if Highlighted summary can be generated as expected
 		content= self.doc_sum.read_document('tests/test_summary_generator_doc.txt')
 		query= "deep dish pizza"
-		required_summary="My family and I waited about an hour before we were seated.You're gonna be talking pretty loudly to each other the whole time but it might be worth it for some great [[HIGHLIGHT]]pizza[[ENDHIGHLIGHT]]."
+		required_summary="My family and I ordered our [[HIGHLIGHT]]pizza[[ENDHIGHLIGHT]] before we sat, and we only had to wait about an additional 15 minutes after we were seated for our food.You're gonna be talking pretty loudly to each other the whole time but it might be worth it for some great [[HIGHLIGHT]]pizza[[ENDHIGHLIGHT]]."
 		sentences = self.doc_sum.generate_sentences(content)
 		sentences_ranks_dictionary = self.doc_sum.rank_sentences(sentences)
 		generated_summary= self.doc_sum.summary_generator(content,query,sentences_ranks_dictionary)
@@ -105,6 +326,438 @@ class TestDocumentSummarizer(unittest.TestCase):
 
 		self.assertEqual(required_summary,highlighted_summary, "Summary generated is not appropriate")
 
+	def test_prepare_document(self):
+		# A prepared document should answer any query like highlight_doc
+		content= self.doc_sum.read_document('tests/test_summary_generator_doc.txt')
+		prepared= self.doc_sum.prepare_document(content)
+
+		for query in ("deep dish pizza", "cheese", "wait"):
+			self.assertEqual(self.doc_sum.highlight_doc(content, query), prepared.highlight(query), "Prepared document summary differs from highlight_doc")
+		self.assertEqual(2, len(prepared.paragraphs), "Paragraphs are not stored")
+
+	def test_compact_document(self):
+		# Sentences should be kept as offsets with their own rank, also when the same sentence appears twice
+		content= "Great pizza. Great pizza. The wait was long.\n\nThe crust was thin. Great pizza."
+		document= self.doc_sum.compact_document(content)
+		self.assertEqual(["Great pizza.", "Great pizza.", "The wait was long.", "The crust was thin.", "Great pizza."], document.sentences(), "Wrong sentence offsets")
+		self.assertEqual([0, 0, 0, 1, 1], list(document.paragraph_ids), "Wrong paragraph ids")
+		self.assertEqual(5, len(document.ranks), "Identical sentences should keep their own rank")
+		self.assertEqual([0, 4], document.best_sentence_ids(), "Wrong best sentences")
+
+		ranks= self.doc_sum.rank_sentences(self.sentences)
+		prepared= self.doc_sum.prepare_document(self.document)
+		self.assertEqual(self.doc_sum.best_paragraph_sentences(self.document, ranks), prepared.best_sentences, "Best sentences differ from the ranks dictionary")
+		self.assertEqual(ranks, prepared.sentences_ranks_dictionary, "Ranks differ from rank_sentences")
+
+	def test_rank_cache(self):
+		# Repeated documents should not be ranked again, and old documents should be evicted
+		cache= summary_generator.RankCache(max_entries=2)
+		doc_sum= summary_generator.DocumentSummarizer(rank_cache=cache)
+		documents= [self.document, self.doc_sum.read_document('tests/test_paragragh_generator_doc.txt'), self.doc_sum.read_document('tests/test_remove_stop_words_doc.txt')]
+
+		prepared= doc_sum.prepare_document(documents[0])
+		self.assertTrue(prepared is doc_sum.prepare_document(documents[0]), "Cached document should be reused")
+		self.assertEqual((1, 1), (cache.hits, cache.misses), "Wrong cache statistics")
+
+		doc_sum.prepare_document(documents[1])
+		doc_sum.prepare_document(documents[2])
+		self.assertEqual(2, len(cache), "Least recently used document should be evicted")
+		self.assertEqual(None, cache.get(documents[0]), "Least recently used document should be evicted")
+
+		small_cache= summary_generator.RankCache(max_bytes=prepared.size_in_bytes)
+		small_cache.put(documents[0], prepared)
+		small_cache.put(documents[2], doc_sum.prepare_document(documents[2]))
+		self.assertEqual(1, len(small_cache), "Cache should be limited by size in bytes")
+
+	def test_incremental_ranker(self):
+		# Appending, removing and editing paragraphs should give the same ranks and summary as ranking again
+		paragraphs= self.document.split("\n\n")
+		ranker= summary_generator.IncrementalRanker.from_document(self.document, self.doc_sum)
+		self.assertEqual(self.doc_sum.highlight_doc(self.document, self.query), ranker.highlight(self.query), "Incremental summary differs from highlight_doc")
+
+		def assert_same_ranks(document):
+			# Paragraphs are split into sentences one by one, also when a paragraph does not end with a full stop
+			sentences= sum([self.doc_sum.generate_sentences(p) for p in document.split("\n\n")], [])
+			expected_ranks= self.doc_sum.rank_sentences(sentences)
+			ranks= ranker.ranks_dictionary()
+			self.assertEqual(set(expected_ranks), set(ranks), "Wrong sentences")
+			for key in expected_ranks:
+				self.assertAlmostEqual(expected_ranks[key], ranks[key], places=9)
+			expected_summary= self.doc_sum.add_highligt_tags_to_summary(self.doc_sum.summary_generator(document, self.query, expected_ranks), self.query)
+			self.assertEqual(expected_summary, ranker.highlight(self.query), "Incremental summary differs from summary_generator")
+
+		added= ranker.append_paragraph("The deep dish pizza was great. We will order pizza again.")
+		assert_same_ranks(self.document + "\n\nThe deep dish pizza was great. We will order pizza again.")
+
+		ranker.remove_paragraph(added)
+		assert_same_ranks(self.document)
+
+		ranker.edit_paragraph(ranker.paragraphs[0], "Thin crust pizza. Deep dish is better. The wait was long.")
+		edited= "Thin crust pizza. Deep dish is better. The wait was long.\n\n" + paragraphs[1]
+		self.assertEqual(edited, ranker.document(), "Paragraph is not edited")
+		assert_same_ranks(edited)
+
+	def test_streaming_summarizer(self):
+		# A streamed document should give the best sentences of the whole document, read block by block
+		paragraph_sentences= sum([[(i, sentence) for sentence in self.doc_sum.generate_sentences(p)] for i, p in enumerate(self.document.split("\n\n"))], [])
+		with open('document.txt', encoding='utf-8') as stream:
+			self.assertEqual(paragraph_sentences, list(summary_generator.stream_sentences(stream, block_size=7)), "Sentences are not split while reading")
+
+		streaming= summary_generator.StreamingSummarizer(self.doc_sum, window=1000, block_size=16)
+		with open('document.txt', encoding='utf-8') as stream:
+			self.assertEqual(self.doc_sum.prepare_document(self.document).best_sentences, list(streaming.best_sentences(stream)), "Streamed summary differs from the whole document")
+		with open('document.txt', encoding='utf-8') as stream:
+			self.assertEqual(self.doc_sum.highlight_doc(self.document, self.query), streaming.highlight(stream, self.query), "Streamed summary differs from highlight_doc")
+
+		# With a small window the best sentence of a paragraph comes before the end of the stream
+		class CountingStream(object):
+			def __init__(self, text):
+				self.stream= io.StringIO(text)
+				self.read_characters= 0
+			def read(self, size):
+				block= self.stream.read(size)
+				self.read_characters+= len(block)
+				return block
+		text= u"\n\n".join([u"Deep dish pizza %d is great. The pizza crust is thin. We waited." % i for i in range(200)])
+		stream= CountingStream(text)
+		best= summary_generator.StreamingSummarizer(self.doc_sum, window=4, block_size=64).best_sentences(stream)
+		self.assertEqual(u"The pizza crust is thin.", next(best), "Wrong best sentence")
+		assert stream.read_characters < len(text) / 10, "Best sentence should be emitted before the stream is read"
+		self.assertEqual(199, len(list(best)), "Every paragraph should have a best sentence")
+
+	def test_corpus_index(self):
+		# Sentences of a corpus should be ranked like one document made of all its sentences
+		documents= [('review', self.document), (7, self.doc_sum.read_document('tests/test_paragragh_generator_doc.txt')), ('short', u"Deep dish pizza is great. We waited.")]
+		sentences= sum([self.doc_sum.compact_document(doc).sentences() for _, doc in documents], [])
+		expected= self.doc_sum.pairwise_scores(sentences)
+		engines= ['inverted', 'sparse'] if summary_generator.load_scipy() else ['inverted']
+		for engine in engines:
+			corpus= summary_generator.CorpusIndex.from_documents(documents, summary_generator.DocumentSummarizer(ranking_engine=engine))
+			self.assertEqual(3, len(corpus), "Every document should be indexed")
+			self.assertEqual(expected, corpus.rank(), "Wrong corpus ranks with the %s engine" % engine)
+			self.assertEqual(2, corpus.document_frequency[corpus.vocabulary["pizza"]], "Pizza is in the review and the short document")
+
+			best= corpus.best_sentences(3)
+			ranked= sorted(range(len(sentences)), key=lambda i: -expected[i])
+			self.assertEqual([sentences[i] for i in ranked[:3]], [sentence for _, sentence in best], "Wrong corpus best sentences")
+			self.assertEqual(corpus.summarizer.join_summary([sentence for _, sentence in best], self.query), corpus.summary(self.query, 3), "Wrong corpus summary")
+			self.assertEqual(corpus.prepared_document(2).best_sentences, [u"Deep dish pizza is great."], "Wrong best sentence of a document")
+
+		# Words found in every document count less with IDF weights
+		documents= [(1, u"Pizza crust. Garlic bread."), (2, u"Pizza oven."), (3, u"Pizza dough. Garlic knots.")]
+		corpus= summary_generator.CorpusIndex.from_documents(documents)
+		idf= corpus.idf()
+		self.assertEqual(1.0, idf[corpus.vocabulary['pizza']], "Word of every document should have the lowest weight")
+		assert idf[corpus.vocabulary['garlic']] > 1.0, "Rarer words should weigh more"
+		plain= corpus.rank()
+		weighted= corpus.rank(idf=True)
+		self.assertEqual([1.0, 0.5, 1.0, 1.0, 0.5], plain, "Wrong ranks without IDF")
+		assert weighted[1] / weighted[0] > plain[1] / plain[0], "Sentences sharing rarer words should gain with IDF"
+		if summary_generator.load_scipy():
+			sparse_corpus= summary_generator.CorpusIndex.from_documents(documents, summary_generator.DocumentSummarizer(ranking_engine='sparse'))
+			for x, y in zip(weighted, sparse_corpus.rank(idf=True)):
+				self.assertAlmostEqual(x, y, 12, "IDF ranks differ between engines")
+
+		# Terms found in more than frequent_term_cap sentences should not list their pairs and give the same ranks
+		for engine in engines:
+			capped= summary_generator.CorpusIndex.from_documents(documents, summary_generator.DocumentSummarizer(ranking_engine=engine, frequent_term_cap=1))
+			for expected_ranks, idf_weights in ((plain, False), (weighted, True)):
+				for x, y in zip(expected_ranks, capped.rank(idf=idf_weights)):
+					self.assertAlmostEqual(x, y, 12, "Capped terms give different ranks with the %s engine" % engine)
+			uncapped= summary_generator.CorpusIndex.from_documents(documents, summary_generator.DocumentSummarizer(ranking_engine=engine, frequent_term_cap=None))
+			uncapped.rank(idf=True)
+			assert capped.summarizer.similarity_pairs < uncapped.summarizer.similarity_pairs, "Frequent terms should not be listed as pairs with the %s engine" % engine
+
+	def test_rank_store(self):
+		# Stored ranks should give the same summaries without ranking the documents again
+		documents= [('review', self.document), (7, self.doc_sum.read_document('tests/test_paragragh_generator_doc.txt')), ('empty', '')]
+		directory= tempfile.mkdtemp()
+		try:
+			path= os.path.join(directory, 'ranks.bin')
+			self.assertEqual(3, summary_generator.RankStore.build(path, documents), "All documents should be stored")
+
+			with summary_generator.RankStore(path) as store:
+				doc_sum= summary_generator.DocumentSummarizer(rank_store=store)
+				doc_sum.sentence_scores= None
+				for doc_id, doc in documents:
+					self.assertEqual(self.doc_sum.highlight_doc(doc, self.query), doc_sum.highlight_doc(doc, self.query, doc_id), "Stored ranks give a different summary")
+
+				sentences, ranks= store.get('review', self.document)
+				self.assertEqual(self.sentences, sentences, "Sentences are not stored properly")
+				for sentence, rank in zip(sentences, ranks):
+					self.assertAlmostEqual(self.sentences_ranks_dictionary[self.doc_sum.format_sentence(sentence)], rank, places=5)
+				self.assertEqual(None, store.get('review', self.document + ' Edited.'), "Edited document should not use stored ranks")
+				self.assertFalse('missing' in store, "Unknown document should not be found")
+				self.assertEqual(memoryview, type(store.document('review', self.document).ranks), "Stored ranks should not be copied")
+
+			# Ids of different types are different documents
+			summary_generator.RankStore.build(path, [(1, self.document), ('1', 'Other text. Second sentence.')])
+			with summary_generator.RankStore(path) as store:
+				self.assertEqual(self.document, store.document(1, self.document).text, "Integer id should find its document")
+				self.assertEqual(None, store.document('1', self.document), "String id should not find the integer id document")
+				self.assertFalse(object() in store, "Ids which can't be stored should not be found")
+			self.assertRaises(ValueError, summary_generator.RankStore.build, path, [(1, self.document), (1, self.document)])
+		finally:
+			shutil.rmtree(directory)
+
+	def test_time_budget(self):
+		# A document which fits the budget should be ranked exactly
+		self.assertEqual(self.doc_sum.highlight_doc(self.document, self.query), self.doc_sum.highlight_doc(self.document, self.query, time_budget=60), "Budget should not change the summary")
+		self.assertEqual('exact', self.doc_sum.summary_tier, "Document should be ranked exactly")
+
+		# More sentences than max_rank_sentences are ranked approximately
+		approximate= summary_generator.DocumentSummarizer(ranking_engine='minhash' if summary_generator.load_scipy() else 'inverted').highlight_doc(self.document, self.query)
+		self.assertEqual(approximate, self.doc_sum.highlight_doc(self.document, self.query, max_rank_sentences=5), "Wrong pruned summary")
+		self.assertEqual('pruned', self.doc_sum.summary_tier, "Long document should be pruned")
+
+		# When the budget is spent while ranking, the first sentence of every paragraph is the summary
+		class SlowRanker(summary_generator.Ranker):
+			name= 'slow'
+			def scores(self, summarizer, sentences):
+				time.sleep(0.05)
+				summarizer.check_deadline()
+				return [0.0] * len(sentences)
+		records= []
+		doc_sum= summary_generator.DocumentSummarizer(ranker=SlowRanker(), rank_cache=summary_generator.RankCache(), metrics=records.append)
+		lead= [p.strip() for p in self.document.split("\n\n") if len(self.doc_sum.generate_sentences(p)) > 1]
+		summary= doc_sum.highlight_doc(self.document, 'xyz', time_budget=0.02)
+		self.assertEqual('lead', doc_sum.summary_tier, "Ranking should stop at the deadline")
+		self.assertEqual("".join(self.doc_sum.generate_sentences(p)[0] for p in lead), summary, "Lead sentences should be the summary")
+		self.assertEqual(1, records[0].counts['tier_lead'], "Tier should be recorded")
+		self.assertEqual(0, len(doc_sum.rank_cache), "Degraded summaries should not be cached")
+		self.assertEqual(None, doc_sum.deadline, "Deadline should be cleared")
+
+		# Long documents and spent budgets give the first sentences
+		first= self.doc_sum.generate_sentences(self.document.split("\n\n")[0])
+		self.assertEqual("".join(first[:3]), self.doc_sum.highlight_doc(self.document, 'xyz', time_budget=0), "Wrong summary without time")
+		self.assertEqual('first', self.doc_sum.summary_tier, "Spent budget should give the first sentences")
+		cut= self.document.index(first[1]) + len(first[1]) + 5
+		self.assertEqual("".join(first[:2]), self.doc_sum.highlight_doc(self.document, 'xyz', max_rank_characters=cut), "Cut sentence should be skipped")
+		for complete in (cut - 5, cut - 4):
+			self.assertEqual("".join(first[:2]), self.doc_sum.highlight_doc(self.document, 'xyz', max_rank_characters=complete), "Complete sentence before the cut should be kept")
+		second_paragraph= self.document.index("\n\n") + 10
+		self.assertEqual("".join(first[:3]), self.doc_sum.highlight_doc(self.document, 'xyz', time_budget=0, max_rank_characters=second_paragraph), "Spent budget should keep the sentences before the cut")
+		self.assertEqual('first', self.doc_sum.summary_tier, "Long document should give the first sentences")
+
+	def test_metrics(self):
+		# Every stage should be timed and counted when metrics are enabled, without changing the summary
+		records= []
+		registry= summary_generator.HistogramRegistry()
+		doc_sum= summary_generator.DocumentSummarizer(ranking_engine='pairwise', metrics=records.append)
+		self.assertEqual(self.doc_sum.highlight_doc(self.document, self.query), doc_sum.highlight_doc(self.document, self.query, 'review'), "Metrics should not change the summary")
+
+		record= records[0]
+		self.assertEqual('review', record.doc_id, "Document id is not recorded")
+		self.assertEqual(set(['sentence_tokenizer', 'rank_sentences', 'select_best_sentences', 'summary_generator', 'add_highligt_tags_to_summary', 'total']), set(record.timings), "All stages should be timed")
+		self.assertEqual(len(self.sentences), record.counts['sentences'], "Wrong number of sentences")
+		self.assertEqual(len(self.sentences) ** 2, record.counts['similarity_pairs'], "Wrong number of similarity pairs")
+
+		doc_sum= summary_generator.DocumentSummarizer(rank_cache=summary_generator.RankCache(), metrics=registry)
+		for _ in range(3):
+			doc_sum.highlight_doc(self.document, self.query)
+		snapshot= registry.snapshot()
+		self.assertEqual(3, snapshot['timing.total']['count'], "Every call should be recorded")
+		self.assertEqual(1, snapshot['timing.rank_sentences']['count'], "Cached documents should not be ranked")
+		self.assertEqual(2, snapshot['count.rank_cache_hits']['count'], "Cache hits are not recorded")
+		self.assertEqual(3, len(registry.slowest), "Slowest calls are not kept")
+
+	def test_statsd_sink(self):
+		# Metrics should be sent as one StatsD packet
+		receiver= socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		receiver.bind(('127.0.0.1', 0))
+		receiver.settimeout(5)
+		try:
+			sink= summary_generator.StatsdSink('127.0.0.1', receiver.getsockname()[1], 'test')
+			record= summary_generator.MetricsRecord()
+			record.timings['total']= 0.0125
+			record.counts['sentences']= 4
+			record.counts['rank_cache_hits']= 1
+			record.sizes['summary']= 120
+			sink.emit(record)
+			expected= [b'test.total:12.500|ms', b'test.count.sentences:4|h', b'test.count.rank_cache_hits:1|c', b'test.size.summary:120|h']
+			self.assertEqual(set(expected), set(receiver.recv(4096).split(b'\n')), "Wrong StatsD packet")
+		finally:
+			receiver.close()
+
+	def test_summarize_batch(self):
+		# Check if a batch is summarized in order and a bad document does not stop the batch
+		content= self.doc_sum.read_document('tests/test_summary_generator_doc.txt')
+		expected_summary= self.doc_sum.highlight_doc(content, self.query)
+		documents= [(i, None if i == 3 else content, self.query) for i in range(10)]
+
+		for workers in (1, 2):
+			results= list(summary_generator.summarize_batch(iter(documents), workers=workers, chunksize=3))
+			self.assertEqual(list(range(10)), [r.doc_id for r in results], "Results are not in input order")
+			self.assertEqual([expected_summary]*9, [r.summary for r in results if r.doc_id != 3], "Batch summary differs from highlight_doc")
+			self.assertEqual(None, results[3].summary, "Failed document should not have a summary")
+			assert results[3].error, "Failed document should report its error"
+
+		results= summary_generator.summarize_batch(iter(documents), workers=2, chunksize=1, ordered=False)
+		self.assertEqual(list(range(10)), sorted(r.doc_id for r in results), "Unordered batch lost documents")
+
+		# A task which is not a (doc_id, doc, query) tuple should only fail its own result
+		malformed= documents[:2] + [(2, content), None] + documents[4:6]
+		for workers in (1, 2):
+			results= list(summary_generator.summarize_batch(iter(malformed), workers=workers, chunksize=3))
+			self.assertEqual([0, 1, 2, None, 4, 5], [r.doc_id for r in results], "Malformed tasks should keep their place")
+			self.assertEqual([expected_summary]*4, [r.summary for r in results if r.error is None], "Other tasks of the chunk should be summarized")
+			assert results[2].error and results[3].error, "Malformed tasks should report their error"
+
+		# A document failing while the chunk is ranked together should not fail the other documents of the chunk
+		class PoisonRanker(summary_generator.Ranker):
+			def scores(self, summarizer, sentences):
+				if any('poison' in sentence for sentence in sentences):
+					raise ValueError('poisoned document')
+				return [float(len(sentence)) for sentence in sentences]
+		doc_sum= summary_generator.DocumentSummarizer(ranker=PoisonRanker())
+		results= summary_generator.summarize_chunk([(1, content, self.query), (2, 'A poison sentence. Another one.', self.query), (3, content, self.query)], doc_sum)
+		self.assertEqual([None, None], [results[0].error, results[2].error], "Other documents of the chunk should be summarized")
+		assert 'poisoned document' in results[1].error, "Failed document should report its error"
+
+	def test_read_records(self):
+		# Check if JSONL and TSV corpus records are parsed and malformed lines are skipped
+		jsonl_lines= [b'{"id": "r1", "text": "Deep dish.", "query": "pizza"}\n', b'not json\n', b'\n', b'{"text": "Thin crust."}\n']
+		records= list(summary_generator.read_records(jsonl_lines, 'jsonl', 'crust'))
+		self.assertEqual([('r1', 'Deep dish.', 'pizza'), (4, 'Thin crust.', 'crust')], records, "JSONL records are not parsed properly")
+
+		tsv_lines= [b'r1\tFirst.\\n\\nSecond\\tpart.\tpizza\n', b'r2\tOnly text.\n', b'bad\n']
+		records= list(summary_generator.read_records(tsv_lines, 'tsv', 'crust'))
+		self.assertEqual([('r1', 'First.\n\nSecond\tpart.', 'pizza'), ('r2', 'Only text.', 'crust')], records, "TSV records are not parsed properly")
+
+	def test_gunzip_lines(self):
+		# Check if a gzip stream is read back line by line
+		buffer= io.BytesIO()
+		with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed:
+			compressed.write(b'first line\nsecond line\nlast')
+		buffer.seek(0)
+		self.assertEqual([b'first line\n', b'second line\n', b'last'], list(summary_generator._gunzip_lines(buffer, block_size=7)), "Gzip lines are not read properly")
+
+		# Members of concatenated gzip files (Ex: cat a.gz b.gz) should all be read
+		buffer= io.BytesIO(gzip.compress(b'first file\nend of ') + gzip.compress(b'first\nsecond file\n'))
+		for block_size in (7, 1 << 16):
+			buffer.seek(0)
+			self.assertEqual([b'first file\n', b'end of first\n', b'second file\n'], list(summary_generator._gunzip_lines(buffer, block_size=block_size)), "Every gzip member should be read")
+
+	def test_benchmark(self):
+		# The synthetic corpus should be reproducible and every stage should be reported
+		self.assertEqual(benchmark.CorpusGenerator(seed=3).document(2, 4), benchmark.CorpusGenerator(seed=3).document(2, 4), "Same seed should give the same document")
+		self.assertEqual(3, len(benchmark.CorpusGenerator(seed=3).document(3, 4).split("\n\n")), "Wrong number of paragraphs")
+
+		report= benchmark.run_benchmark(documents=2, paragraphs=2, sentences=3, vocabulary=50)
+		self.assertEqual(sorted(benchmark.STAGES + ['total']), sorted(report['stages'].keys()), "All stages should be timed")
+		assert report['throughput']['sentences_per_second'] > 0, "Throughput should be reported"
+
+	def test_golden_outputs(self):
+		# Every engine and summary selection should keep the golden ranks and summaries of the pairwise engine
+		with open('tests/golden_ranks.json', encoding='utf-8') as f:
+			golden= json.load(f)
+		self.assertEqual(benchmark.GOLDEN_SIZES, [document['sentences'] for document in golden['documents']], "Golden file should cover every size")
+		for result in benchmark.check_golden(golden):
+			assert result['ok'], "%(backend)s differs from the golden outputs of %(sentences)d sentences: error %(error)g, same summary %(summary_equal)s" % result
+		self.assertEqual(0.5, benchmark.relative_error([1.0, 1.0], [2.0, 1.5]), "Wrong relative error")
+
+	def test_scaling(self):
+		# The number of scored pairs should grow like n^2 for the pairwise engine and slower for a capped inverted index
+		self.assertAlmostEqual(2.0, benchmark.growth_exponent([10, 100, 1000], [3e2, 3e4, 3e6]), 9, "Wrong growth exponent")
+		report= benchmark.scaling(['inverted', 'pairwise'], [50, 100, 200, 400], repeat=3, frequent_term_cap=20)
+		self.assertAlmostEqual(2.0, report['pairwise']['pairs_exponent'], 9, "Pairwise engine should score every pair")
+		assert report['inverted']['pairs_exponent'] < 1.5, "Capped inverted index should not score every pair"
+		# Ranking time should grow like the scored pairs, within the COMPLEXITY_BOUNDS
+		self.assertAlmostEqual(2.0, report['pairwise']['time_exponent'], delta=0.5, msg="Pairwise ranking time should grow like n^2")
+		for engine in ('inverted', 'pairwise'):
+			assert report[engine]['ok'], "%s ranking time grows like n^%.2f, over its bound %.1f" % (engine, report[engine]['time_exponent'], report[engine]['bound'])
+		self.assertEqual([50, 100, 200, 400], report['inverted']['sizes'], "Every size should be ranked")
+
+		# The threshold check should compare the exact engine with minhash on a document just above the threshold
+		threshold= benchmark.check_threshold(200, 'inverted', repeat=1)
+		self.assertEqual(('inverted', 'minhash', 201), (threshold['exact_engine'], threshold['approximate_engine'], threshold['sentences']), "Wrong engines compared")
+		self.assertEqual(threshold['approximate_seconds'] < threshold['exact_seconds'], threshold['ok'], "Threshold is ok only when minhash is faster")
+		if summary_generator.load_scipy():
+			threshold= benchmark.check_threshold(summary_generator.DocumentSummarizer().approximate_threshold)
+			assert threshold['ok'], "Minhash should be faster than the %(exact_engine)s engine at the default threshold: %(approximate_seconds).2fs against %(exact_seconds).2fs" % threshold
+
+	def test_cold_start(self):
+		# A new interpreter should summarize a small document without importing NumPy and SciPy
+		report= benchmark.cold_start(runs=1)
+		self.assertFalse(report['scipy_imported'], "Small documents should not import SciPy")
+		assert report['first_call_seconds']['p50'] > 0, "First call latency should be measured"
+		assert report['importtime']['summary_generator_us'] > 0, "Import time should be measured"
+		self.assertFalse('numpy' in [name for name, _ in report['importtime']['slowest_imports_us']], "NumPy should be imported lazily")
+
+	def test_summary_service(self):
+		# The HTTP service should give the same summaries as highlight_doc
+		batcher= summary_service.MicroBatcher(workers=1, batch_window=0.05).start()
+		server= summary_service.SummaryHTTPServer(('127.0.0.1', 0), batcher, max_body_bytes=100000)
+		thread= threading.Thread(target=server.serve_forever)
+		thread.start()
+		url= 'http://127.0.0.1:%d' % server.server_address[1]
+
+		def post(path, body):
+			try:
+				response= urllib.request.urlopen(urllib.request.Request(url + path, json.dumps(body).encode('utf-8'), {'Content-Type': 'application/json'}))
+				return response.getcode(), json.loads(response.read())
+			except urllib.error.HTTPError as e:
+				return e.code, json.loads(e.read())
+
+		try:
+			self.assertEqual((200, {'id': 'r1', 'summary': self.doc_sum.highlight_doc(self.document, self.query)}), post('/highlight', {'id': 'r1', 'text': self.document, 'query': self.query}), "Wrong service summary")
+
+			status, body= post('/batch', {'documents': [{'id': 1, 'text': self.document, 'query': 'cheese'}, {'id': 2, 'text': None}]})
+			self.assertEqual(200, status, "Batch should succeed")
+			self.assertEqual(self.doc_sum.highlight_doc(self.document, 'cheese'), body['results'][0]['summary'], "Wrong batch summary")
+			assert body['results'][1]['error'], "Failed document should report its error"
+
+			self.assertEqual(400, post('/highlight', {'query': 'no text'})[0], "Document without text should be rejected")
+			self.assertEqual(413, post('/highlight', {'text': 'x' * 200000})[0], "Large body should be rejected")
+			self.assertEqual(413, post('/batch', {'documents': [{'text': 'x'}] * (batcher.max_queue + 1)})[0], "Batch larger than the queue should be rejected")
+			for length in ('abc', '-5'):
+				connection= http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=30)
+				connection.putrequest('POST', '/highlight')
+				connection.putheader('Content-Length', length)
+				connection.endheaders()
+				self.assertEqual(400, connection.getresponse().status, "Invalid Content-Length should be rejected")
+				connection.close()
+			self.assertEqual('ok', json.loads(urllib.request.urlopen(url + '/health').read())['status'], "Service should be healthy")
+			self.assertEqual(3, json.loads(urllib.request.urlopen(url + '/metrics').read())['latency_seconds']['count'], "Latency should be recorded")
+		finally:
+			server.shutdown()
+			server.server_close()
+			thread.join()
+			batcher.close()
+
+	def test_micro_batcher_backpressure(self):
+		# Documents should be rejected when the queue is full
+		batcher= summary_service.MicroBatcher(workers=1, max_queue=2)
+		try:
+			pending= [batcher.submit(1, self.document, self.query), batcher.submit(2, self.document, self.query)]
+			self.assertRaises(summary_service.ServiceOverloaded, batcher.submit, 3, self.document, self.query)
+			self.assertEqual(1, batcher.stats()['rejected'], "Rejected documents should be counted")
+
+			# A batch which does not fit as a whole should not leave any of its documents queued
+			batcher.queue.get_nowait()
+			self.assertRaises(summary_service.ServiceOverloaded, batcher.submit_batch, [(3, self.document, self.query), (4, self.document, self.query)])
+			self.assertEqual(1, batcher.queue.qsize(), "Rejected batch should not queue any document")
+			self.assertEqual(3, batcher.stats()['rejected'], "Every document of a rejected batch should be counted")
+			pending[:1]= batcher.submit_batch([(1, self.document, self.query)])
+
+			# Queued documents are summarized together once the dispatcher runs
+			batcher.start()
+			self.assertEqual([None, None], [result.wait(30).error for result in pending], "Queued documents should be summarized")
+			self.assertEqual(1, batcher.stats()['batches']['count'], "Queued documents should be one batch")
+			self.assertEqual(None, batcher.submit(4, self.document, self.query).wait(30).error, "Document should be accepted again")
+		finally:
+			batcher.close()
+
+		# A batch failing as a whole (here its task can't be sent to a worker) should fail its documents and free its slot
+		batcher= summary_service.MicroBatcher(workers=1, max_in_flight=1, batch_window=0).start()
+		try:
+			result= batcher.submit(lambda: None, self.document, self.query).wait(30)
+			assert result is not None and result.error, "Documents of a failed batch should get an error"
+			self.assertEqual(None, batcher.submit(5, self.document, self.query).wait(30).error, "Failed batch should free its slot")
+			self.assertEqual(0, batcher.stats()['in_flight'], "Failed batch should not stay in flight")
+		finally:
+			batcher.close()
+
 
 
 
@@ -117,10 +770,39 @@ def suite():
 	suite.addTest(TestDocumentSummarizer("test_paragragh_generator"))
 	suite.addTest(TestDocumentSummarizer("test_format_sentence"))
 	suite.addTest(TestDocumentSummarizer("test_get_sentences_similarity_score"))
+	suite.addTest(TestDocumentSummarizer("test_sentence_tokens"))
 	suite.addTest(TestDocumentSummarizer("test_rank_sentences"))
+	suite.addTest(TestDocumentSummarizer("test_rank_sentences_sparse"))
+	suite.addTest(TestDocumentSummarizer("test_parallel_ranking"))
+	suite.addTest(TestDocumentSummarizer("test_rank_sentences_inverted"))
+	suite.addTest(TestDocumentSummarizer("test_rank_sentences_minhash"))
+	suite.addTest(TestDocumentSummarizer("test_duplicate_sentences"))
 	suite.addTest(TestDocumentSummarizer("test_select_best_sentences"))
+	suite.addTest(TestDocumentSummarizer("test_join_summary"))
 	suite.addTest(TestDocumentSummarizer("test_add_highligt_tags_to_summary"))
+	suite.addTest(TestDocumentSummarizer("test_rankers"))
+	suite.addTest(TestDocumentSummarizer("test_highlighter"))
+	suite.addTest(TestDocumentSummarizer("test_summary_spans"))
 	suite.addTest(TestDocumentSummarizer("test_summary_generator"))
+	suite.addTest(TestDocumentSummarizer("test_prepare_document"))
+	suite.addTest(TestDocumentSummarizer("test_compact_document"))
+	suite.addTest(TestDocumentSummarizer("test_rank_cache"))
+	suite.addTest(TestDocumentSummarizer("test_incremental_ranker"))
+	suite.addTest(TestDocumentSummarizer("test_streaming_summarizer"))
+	suite.addTest(TestDocumentSummarizer("test_corpus_index"))
+	suite.addTest(TestDocumentSummarizer("test_rank_store"))
+	suite.addTest(TestDocumentSummarizer("test_time_budget"))
+	suite.addTest(TestDocumentSummarizer("test_metrics"))
+	suite.addTest(TestDocumentSummarizer("test_statsd_sink"))
+	suite.addTest(TestDocumentSummarizer("test_summarize_batch"))
+	suite.addTest(TestDocumentSummarizer("test_read_records"))
+	suite.addTest(TestDocumentSummarizer("test_gunzip_lines"))
+	suite.addTest(TestDocumentSummarizer("test_benchmark"))
+	suite.addTest(TestDocumentSummarizer("test_golden_outputs"))
+	suite.addTest(TestDocumentSummarizer("test_scaling"))
+	suite.addTest(TestDocumentSummarizer("test_cold_start"))
+	suite.addTest(TestDocumentSummarizer("test_summary_service"))
+	suite.addTest(TestDocumentSummarizer("test_micro_batcher_backpressure"))
 
 	return suite
 